@@ -2,7 +2,8 @@
 
     To run the package, please use command:
         python -m data_scraper [-h] [--api API_NAME,str] [--test LOCATION_NAME,str] [--headless BOOLEAN]
-        [--ta NUM_OF_TRIPADVISOR_REVIEWS, int] [--google NUM_OF_GOOGLE_REVIEWS, int]
+        [--ta NUM_OF_TRIPADVISOR_REVIEWS, int] [--google NUM_OF_GOOGLE_REVIEWS, int] [--offline BOOLEAN]
+        [--cache_only BOOLEAN]
 """
 import spacy
 import os
@@ -12,14 +13,15 @@ from datetime import datetime
 from selenium import webdriver
 from .user import User
 from .search_google import define_googlequery, request_urls
-from .scrape_web import scrape_page
+from .scrape_web import scrape_pages
 from .data_cleaning import clean_data
 from .utils import read_json_file, write_output_csv, get_gsheet, logger, str2bool
 from .get_locationinfo import get_locationinfo
+from .quota import QuotaLedger
+from .api_cache import ApiResponseCache
 from . import constants
-from func_timeout import func_timeout, FunctionTimedOut
 
-def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
+def main(api_type, keyword, headless, ta_review_limits, google_review_limits, offline, cache_only):
     """ Main function for data scraping tool 
         
         Calls relevant functions and go through the whole process
@@ -54,6 +56,7 @@ def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
     webdriver_path = os.path.join(parent_path, 'Miscellaneous', 'chromedriver_win32', 'chromedriver.exe')
     misc_path = os.path.join(parent_path, 'Miscellaneous')
     output_path = os.path.join(parent_path, 'Data_scraper', 'output_data')
+    cache_path = os.path.join(parent_path, 'Data_scraper', constants.CACHE_FOLDER_NAME)
     
     # create output data folder
     if not os.path.exists(output_path):
@@ -70,9 +73,19 @@ def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
     logger.info('{} google maps reviews will be scraped per location (based on user input)...'
                 .format(google_review_limits))
 
-    # set up google sheet for API counter
-    logger.info("Getting google sheet....")
-    gsheet = get_gsheet(misc_path)
+    # set up local quota ledger for API counter - synced to google sheet unless running offline
+    if offline:
+        logger.info("Offline mode on. API usage is only tracked in the local quota ledger...")
+        gsheet = None
+    else:
+        logger.info("Getting google sheet....")
+        gsheet = get_gsheet(misc_path)
+    quota_ledger = QuotaLedger(os.path.join(cache_path, constants.QUOTA_LEDGER_NAME), gsheet)
+
+    # set up cache for API responses - venues looked up before do not need to access the API again
+    if cache_only:
+        logger.info('Cache only mode on. APIs will not be accessed and only cached responses are used...')
+    api_cache = ApiResponseCache(os.path.join(cache_path, constants.API_CACHE_NAME), cache_only=cache_only)
     
     # setup webdriver
     # Create a new instance of the driver
@@ -118,23 +131,15 @@ def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
             logger.info('Processing user input to form query list...')
             query_list = define_googlequery(user_class)    
         
-            # get urls based on keywords
+            # get urls based on keywords - queries answered in previous runs are taken from the cache
             logger.info('Searching google for urls...')    
-            urls = request_urls(query_list, user_class, num_result=1, pause_time=1)
+            urls = request_urls(query_list, user_class, num_result=1, pause_time=1, cache_dir=cache_path)
         
             # loop through all url results to get headers and paragraphs for each website
             # store as dictionary, key: header name, value: paragraph associated to header
             logger.info('Scraping all urls found...')
-            websites_data = {}
-            # sometimes beautiful soup hangs - so implement time check
-            # if after 5 secs and still not yet finish scraping the one url, then terminate it
-            for x in urls:
-                try:
-                    websites_data = func_timeout(5, scrape_page, args=(x, websites_data))
-                except FunctionTimedOut:
-                    logger.warning('Timed out when scraping url {}. Skipped...'.format(x))
-                except Exception:
-                    raise ValueError('Web scraping failed...')
+            # urls are fetched concurrently with connect/read timeouts - urls which time out are skipped
+            websites_data = scrape_pages(urls, {})
 
             # go through all the headers collected and run nlp on them to recognise the
             # location entity that we are interested in
@@ -152,8 +157,8 @@ def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
         
     # Access APIS and scrap google maps and tripadvisor to build database
     logger.info('Accessing APIs, tripadvisor and google maps to build database...')
-    terminate_flag = get_locationinfo(scraped_data, location_found, user_class, driver, gsheet, api_type, output_path,
-                                      ta_review_limits, google_review_limits)
+    terminate_flag = get_locationinfo(scraped_data, location_found, user_class, driver, quota_ledger, api_type, output_path,
+                                      ta_review_limits, google_review_limits, api_cache)
 
     # write final data to CSV if the code not terminated - put every n locations in one csv
     if not terminate_flag:
@@ -192,8 +197,9 @@ def main(api_type, keyword, headless, ta_review_limits, google_review_limits):
                 # reset
                 output_dict = {}
     
-    # close webdriver
+    # close webdriver and write out remaining API usage to google sheet
     driver.quit()
+    quota_ledger.close()
 
     # record time taken 
     end = datetime.now()
@@ -225,8 +231,16 @@ if __name__ == "__main__":
                         help='This is to specify the number of reviews per location when scraping google maps website. '
                              'Default is 5.')
 
+    parser.add_argument('--offline', type=str2bool, default=False,
+                        help='Default is False. If set to True, API usage is only tracked in the local quota ledger '
+                             'and is not synced to the google sheet.')
+
+    parser.add_argument('--cache_only', type=str2bool, default=False,
+                        help='Default is False. If set to True, APIs are not accessed and only API responses '
+                             'cached from previous runs are used.')
+
     args = parser.parse_args()
     
     # call main function
-    main(args.api, args.test, args.headless, args.ta, args.google)
+    main(args.api, args.test, args.headless, args.ta, args.google, args.offline, args.cache_only)
     
@@ -14,31 +14,68 @@ import requests
 import json
 import herepy
 from . import constants
-from .utils import read_cell, write_cell, logger
+from .utils import logger
 
-def check_location_foursquare_detail(keyword, place, country, gsheet):
-    """Checks if the name of place given corresponds to a place on the foursquare API
+def _cached_call(api_cache, api, endpoint, query, near, fetch, is_found, is_valid=lambda data: True):
+    """Get api response from the cache if available. Otherwise call the api and store its response
 
-      if valid place, non empty dict will be returned. This includes all details of
-      the place.
-
-      WARNING: THIS IS A PREMIUM PULL - 500 calls limit per day
-    
+       Returns (data, api_called). data is None if the cache is in cache only mode and the response is not cached.
     """
-    # start with regular call to find out the place's place ID first
+    if api_cache is not None:
+        hit, data = api_cache.get(api, endpoint, query, near)
+        if hit:
+            logger.info('    {} {} response found in cache...'.format(api, endpoint))
+            return data, False
+
+        if api_cache.cache_only:
+            logger.info('    {} {} response not found in cache. API not accessed in cache only mode...'
+                        .format(api, endpoint))
+            return None, False
+
+    data = fetch()
+
+    # do not cache errors returned by the api
+    if api_cache is not None and is_valid(data):
+        api_cache.set(api, endpoint, query, near, data, is_found(data))
+
+    return data, True
+
+def _foursquare_ok(data):
+    """Check that foursquare returned a valid response"""
+    return data.get('meta', {}).get('code') == 200
+
+def _foursquare_search(keyword, near, api_cache):
+    """Search foursquare for the venue. Returns (data, api_called)"""
     url = 'https://api.foursquare.com/v2/venues/search'
 
     params = dict(
               client_id = constants.foursquare_client_id,
               client_secret= constants.foursquare_client_secret,
               v='20200819', #version date
-              near='{} {}'.format(place, country),
+              near=near,
               query=keyword,
               limit=1 
               )
 
-    resp = requests.get(url=url, params=params)
-    data = json.loads(resp.text)
+    def fetch():
+        resp = requests.get(url=url, params=params)
+        return json.loads(resp.text)
+
+    return _cached_call(api_cache, 'foursquare', 'venues/search', keyword, near, fetch,
+                        lambda data: bool(data.get('response', {}).get('venues')), _foursquare_ok)
+
+def check_location_foursquare_detail(keyword, place, country, quota_ledger, api_cache=None):
+    """Checks if the name of place given corresponds to a place on the foursquare API
+
+      if valid place, non empty dict will be returned. This includes all details of
+      the place.
+
+      WARNING: THIS IS A PREMIUM PULL - 500 calls limit per day
+    
+    """
+    # start with regular call to find out the place's place ID first
+    data, search_called = _foursquare_search(keyword, '{} {}'.format(place, country), api_cache)
+    detail_called = False
 
     # get place id
     try:
@@ -54,8 +91,15 @@ def check_location_foursquare_detail(keyword, place, country, gsheet):
                 v='20200819'
                 )
 
-      resp = requests.get(url=url, params=params)
-      data = json.loads(resp.text)
+      def fetch():
+          resp = requests.get(url=url, params=params)
+          return json.loads(resp.text)
+
+      data, detail_called = _cached_call(api_cache, 'foursquare_detail', 'venues/detail', place_id, '', fetch,
+                                         lambda data: bool(data.get('response', {}).get('venue')), _foursquare_ok)
+
+      if data is None:
+          raise KeyError(place_id)
     except:
       print ('Place ID not found for keyword: ' + keyword)
       place_id = 'None'
@@ -68,37 +112,24 @@ def check_location_foursquare_detail(keyword, place, country, gsheet):
         result = {}
         logger.info('    Foursquare detail API data not found...')
     
-    # update usage - regular and premium
-    usage = int(read_cell(gsheet, 'foursquare', 'COUNT'))
-    write_cell(gsheet, 'foursquare', 'COUNT', usage + 1)
-
-    usage = int(read_cell(gsheet, 'foursquare_detail', 'COUNT'))
-    write_cell(gsheet, 'foursquare_detail', 'COUNT', usage + 1)    
+    # update usage - regular and premium. Responses from cache do not use the quota
+    if search_called:
+        quota_ledger.increment('foursquare')
+    if detail_called:
+        quota_ledger.increment('foursquare_detail')
     
     return result
 
-def check_location_foursquare(keyword, place, country, gsheet):
+def check_location_foursquare(keyword, place, country, quota_ledger, api_cache=None):
     """Checks if the name of place given corresponds to a place on the foursquare API
 
       if valid place, non empty list with values will be returned
     
     """
-    url = 'https://api.foursquare.com/v2/venues/search'
-
-    params = dict(
-              client_id = constants.foursquare_client_id,
-              client_secret= constants.foursquare_client_secret,
-              v='20200819', #version date
-              near='{} {}'.format(place, country),
-              query=keyword,
-              limit=1 
-              )
-
-    resp = requests.get(url=url, params=params)
-    data = json.loads(resp.text)
+    data, api_called = _foursquare_search(keyword, '{} {}'.format(place, country), api_cache)
 
     # take first item
-    x = data['response']
+    x = data['response'] if data else None
 
     # if no name then return empty list
     result = []
@@ -130,13 +161,13 @@ def check_location_foursquare(keyword, place, country, gsheet):
     else:
         logger.info('    Foursquare API data not found...')
 
-    # update usage
-    usage = int(read_cell(gsheet, 'foursquare', 'COUNT'))
-    write_cell(gsheet, 'foursquare', 'COUNT', usage + 1)
+    # update usage - responses from cache do not use the quota
+    if api_called:
+        quota_ledger.increment('foursquare')
 
     return result
 
-def check_location_here(keyword, place, country, gsheet):
+def check_location_here(keyword, place, country, quota_ledger, api_cache=None):
     """Checks if the name of place given corresponds to a place on the HERE API
 
       if valid place, non empty list with values will be returned
@@ -145,11 +176,15 @@ def check_location_here(keyword, place, country, gsheet):
     keyword = '{} {} {}'.format(keyword, place, country)
 
     # 250k searches limit per month
-    placesApi = herepy.PlacesApi(constants.here_api_key)
-    response = placesApi.onebox_search([50,50], keyword)
+    def fetch():
+        placesApi = herepy.PlacesApi(constants.here_api_key)
+        return placesApi.onebox_search([50,50], keyword).as_dict()
+
+    data, api_called = _cached_call(api_cache, 'here', 'onebox_search', keyword, '', fetch,
+                                    lambda data: bool(data.get('items')))
 
     # take first item
-    x = response.items[0]
+    x = data['items'][0] if data and data.get('items') else None
 
     # no results then return empty list
     result = []
@@ -190,9 +225,9 @@ def check_location_here(keyword, place, country, gsheet):
     else:
         logger.info('    HERE API data not found...')
 
-    # update usage
-    usage = int(read_cell(gsheet, 'here', 'COUNT'))
-    write_cell(gsheet, 'here', 'COUNT', usage + 1)
+    # update usage - responses from cache do not use the quota
+    if api_called:
+        quota_ledger.increment('here')
 
     return result
 
@@ -0,0 +1,74 @@
+""" This module stores the responses of the Foursquare and HERE APIs on disk so that venues which
+    have been looked up before do not need to access the APIs again.
+
+    Responses are stored in a SQLite database keyed by (api, endpoint, normalised query, near).
+    Each endpoint has its own time to live. Responses where the venue is not found are cached
+    as well but they expire sooner. In cache only mode, the APIs are never accessed and venues
+    not found in the cache are treated as not found.
+"""
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from . import constants
+
+
+class ApiResponseCache:
+    def __init__(self, db_path, cache_only=False, ttl=constants.API_CACHE_TTL,
+                 negative_ttl=constants.API_CACHE_NEGATIVE_TTL):
+        """Build API response cache"""
+        self.db_path = db_path
+        self.cache_only = cache_only
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        # create database folder and table
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS responses "
+                         "(api TEXT, endpoint TEXT, query TEXT, near TEXT, response TEXT, found INTEGER, "
+                         "timestamp REAL, PRIMARY KEY (api, endpoint, query, near))")
+
+    @contextmanager
+    def _connect(self):
+        """Open a new connection to the cache database"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def normalise(text):
+        """Normalise query so that the same venue written differently shares one cache entry"""
+        return ' '.join(str(text).lower().split())
+
+    def get(self, api, endpoint, query, near=''):
+        """Return (True, response) if a valid response is cached. Otherwise return (False, None)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, found, timestamp FROM responses "
+                               "WHERE api = ? AND endpoint = ? AND query = ? AND near = ?",
+                               (api, endpoint, self.normalise(query), self.normalise(near))).fetchone()
+
+        if row is None:
+            return False, None
+
+        response, found, timestamp = row
+        ttl = self.ttl[endpoint] if found else self.negative_ttl
+
+        if time.time() - timestamp > ttl:
+            return False, None
+
+        return True, json.loads(response)
+
+    def set(self, api, endpoint, query, near, response, found):
+        """Store response of the api. found is False if the venue was not found"""
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses (api, endpoint, query, near, response, found, timestamp) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (api, endpoint, self.normalise(query), self.normalise(near), json.dumps(response),
+                          int(found), time.time()))
@@ -19,6 +19,25 @@ TMP_LOCFOUND_NAME = 'TMP_LOCFOUND'
 TMP_LOCSCRAPED_NAME = 'TMP_LOCSCRAPED'
 NUM_LOC_PER_CSV = 10.0
 
+# website scraping info
+# timeout is (connect, read) in seconds, delay is the minimum seconds between two requests to the same domain
+SCRAPE_MAX_WORKERS = 16
+SCRAPE_TIMEOUT = (3.05, 5)
+SCRAPE_RETRIES = 2
+SCRAPE_BACKOFF = 0.5
+SCRAPE_DOMAIN_DELAY = 1.0
+
+# google search info
+# cached results expire after the ttl (in seconds), rate limit is the maximum number of queries per minute
+CACHE_FOLDER_NAME = 'cache'
+SEARCH_CACHE_NAME = 'google_search_cache'
+SEARCH_CACHE_TTL = 7 * 24 * 60 * 60
+SEARCH_MAX_WORKERS = 4
+SEARCH_RATE_LIMIT = 20
+
+# number of headers per batch when running NLP on the headers
+NER_BATCH_SIZE = 256
+
 # latitude and longitude bounds (lat, long) of singapore (hardcoded for now)
 COORD_BOUNDS = {'singapore': {'latitude': [1.18, 1.48], 'longitude': [103.58, 104.15]}}
 
@@ -31,6 +50,18 @@ GSHEET_DICT = {'sheet': 'Sheet1',
                'foursquare_detail': {'DATE': 'FOURSQUARE_DETAIL_DATE', 'COUNT': 'FOURSQUARE_DETAIL_COUNT'},
                'here': {'DATE': 'HERE_DATE', 'COUNT': 'HERE_COUNT'}}
 
+# local quota ledger info - usage is synced to the google sheet every sync interval (in seconds)
+QUOTA_LEDGER_NAME = 'api_quota.db'
+QUOTA_SYNC_INTERVAL = 60
+
+# API response cache info - time to live (in seconds) of the responses for each endpoint
+# responses where the venue is not found expire after the negative ttl
+API_CACHE_NAME = 'api_responses.db'
+API_CACHE_TTL = {'venues/search': 30 * 24 * 60 * 60,
+                 'venues/detail': 14 * 24 * 60 * 60,
+                 'onebox_search': 30 * 24 * 60 * 60}
+API_CACHE_NEGATIVE_TTL = 3 * 24 * 60 * 60
+
 # default user profile from User class
 DEFAULT_USER = {'place':'singapore',
                'country':'singapore',
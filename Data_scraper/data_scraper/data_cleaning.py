@@ -1,53 +1,70 @@
 """ This module cleans the data scrape from the websites to get the location
     name. It returns a location_data dictionary.
 """
+from . import constants
 from .utils import logger
 
+def find_loc_entities(headers, nlp_loc, batch_size=constants.NER_BATCH_SIZE):
+    """ Run NLP on the headers to extract the 'LOC' entities of each header
+
+        Headers are deduplicated first and then run through the NLP model in batches with only the
+        entity recogniser enabled. Returns a dictionary of header: list of 'LOC' entities found.
+    """
+    unique_headers = list(dict.fromkeys(headers))
+
+    # only keep the entity recogniser running
+    pipe_exceptions = ["ner", "trf_wordpiecer", "trf_tok2vec"]
+    other_pipes = [pipe for pipe in nlp_loc.pipe_names if pipe not in pipe_exceptions]
+
+    header_ents = {}
+    for header, data in zip(unique_headers, nlp_loc.pipe(unique_headers, batch_size=batch_size,
+                                                          disable=other_pipes)):
+        header_ents[header] = [ent.text for ent in data.ents if ent.label_ == 'LOC']
+
+    return header_ents
+
 def clean_data(website_data, nlp_loc, user_class):
-    """ Go through the headers obtained from all websites and store the valid 
+    """ Go through the headers obtained from all websites and store the valid
         location to dictionary
-    
+
         For each header, run NLP to extract the 'LOC' entity from the header.
         The code will run through some basic filtering on the entity extracted.
-        
+
         Valid entity will be stored in the dictionary together with the paragraph
         and website associated to the header.
     """
     # get attributes from user class
     place = user_class.place
     country = user_class.country
-    
+
     count = 0
     location_data = {}
 
+    # split into words - using nlp loc model. Run all headers from all websites in one go
+    header_ents = find_loc_entities([key for website in website_data for key in website_data[website]], nlp_loc)
+
     # go through all keys and find out which one to discard
     # if useful key, setup dictionary to store API data later
     for website in website_data:
         results = website_data[website]
-        
+
         for key in results:
-            # split into words - using nlp loc model
-            data = nlp_loc(key)
-    
-            # go through object to find entity with label LOC
-            for ent in data.ents:
-    
-                if ent.label_ == 'LOC':
-                    keyword = ent.text.strip()
-                    # ensure text not place or country
-                    flag = True
-                    if ent.text.lower().strip() == place or ent.text.lower().strip() == country:
-                        flag = False
-    
-                    # only select keyword that are not in dictionary and are not place/country
-                    if flag and not keyword in location_data:
-                        location_data[keyword] = {'website': website,
-                                                  'header': key,
-                                                  'paragraph': results[key]}
-                        
-                        count += 1
-    
-    logger.info("A total of {} headers/keywords found....".format(count))   
-        
-    return location_data
+            # go through entities with label LOC found for the header
+            for ent_text in header_ents[key]:
+                keyword = ent_text.strip()
+                # ensure text not place or country
+                flag = True
+                if ent_text.lower().strip() == place or ent_text.lower().strip() == country:
+                    flag = False
 
+                # only select keyword that are not in dictionary and are not place/country
+                if flag and not keyword in location_data:
+                    location_data[keyword] = {'website': website,
+                                              'header': key,
+                                              'paragraph': results[key]}
+
+                    count += 1
+
+    logger.info("A total of {} headers/keywords found....".format(count))
+
+    return location_data
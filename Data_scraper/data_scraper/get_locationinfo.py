@@ -5,53 +5,22 @@
 from . import constants
 from .access_api import check_location_foursquare, check_location_foursquare_detail, check_location_here
 from .gmaps import GoogleMapsLocationInfo, GoogleMapsLocationReview
-from .utils import read_cell, write_cell, logger, write_output_json, check_within_country
+from .utils import logger, write_output_json, check_within_country
 from .extract_ta import extract_ta_data
-from datetime import datetime, date, timezone
 
-def check_limit(gsheet, api_type):
-    """ Check usage limit of the api 
-        
-        if current date in the Googlse sheet already passed the limit date, 
-        update with today's date and reset quota.
-    """
+def check_api_limit(quota_ledger, api_type, api_cache=None):
+    """Check if the api can still be used - limits are not checked if only cached responses are used"""
+    if api_cache is not None and api_cache.cache_only:
+        return True
 
-    # get data from google sheet
-    access_date = read_cell(gsheet, api_type, 'DATE')
-    access_date = datetime.strptime(access_date.replace("'", ""), '%Y-%m-%d %H:%M:%S')
-    usage = int(read_cell(gsheet, api_type, 'COUNT'))
-    
-    # find out how many days since (compare to UTC timezone)
-    current_time = datetime.now(timezone.utc).replace(tzinfo=None)
-    time_between = current_time - access_date
-    
-    # convert to days
-    time_between = time_between.total_seconds() / (60 * 60 * 24)
-    
-    # find out limits and refresh days
-    api_days = constants.API_LIMITS[api_type]['DAY']
-    api_limit = constants.API_LIMITS[api_type]['LIMIT']
+    # special case for foursquare detail - need to check two apis
+    if api_type == 'foursquare_detail':
+        return quota_ledger.check_limits([api_type, 'foursquare'])
 
-    # check if limit is reached
-    if time_between <= api_days and usage < api_limit:
-        flag = True
-    elif time_between > api_days:
-        # get midnight of today's date
-        today = date.today()
-        midnight = datetime.combine(today, datetime.min.time())
-        
-        # if date expired, update with today's date midnight and reset quota
-        write_cell(gsheet, api_type, 'DATE', "'" + str(midnight))
-        write_cell(gsheet, api_type, 'COUNT', 0)
-        flag = True                
-    else:
-        logger.error('API Limit reached for {}.'.format(api_type))
-        flag = False
-        
-    return flag
-    
-def get_locationinfo(scraped_location, location_found, user_class, driver, gsheet, api_type, output_path, ta_review_limits,
-                     google_review_limits):
+    return quota_ledger.check_limit(api_type)
+
+def get_locationinfo(scraped_location, location_found, user_class, driver, quota_ledger, api_type, output_path, ta_review_limits,
+                     google_review_limits, api_cache=None):
     """ Access google, tripadvisor and APIs to build location's information
     
         Steps:
@@ -94,16 +63,9 @@ def get_locationinfo(scraped_location, location_found, user_class, driver, gshee
                 try:
                     logger.info("{}. Valid location. Keyword {} found to be {}. Building location's database now....".format(count, keyword, place_name))
                     
-                    # check if api limit is reached          
-                    # special case for foursquare detail
-                    if api_type == 'foursquare_detail':               
-                        # need to check two apis
-                        flag_1 = check_limit(gsheet, api_type)
-                        flag_2 = check_limit(gsheet, 'foursquare')
-                        flag = flag_1 == flag_2
-                    else:
-                        flag = check_limit(gsheet, api_type)
-                        
+                    # check if api limit is reached
+                    flag = check_api_limit(quota_ledger, api_type, api_cache)
+
                     # continue getting data from api if limit not yet reached
                     if flag:
                         # build database for location using google maps
@@ -115,11 +77,11 @@ def get_locationinfo(scraped_location, location_found, user_class, driver, gshee
 
                         # get data from api depending on user input
                         if api_type == 'foursquare':
-                            api_data = check_location_foursquare(place_name, place, country, gsheet)
+                            api_data = check_location_foursquare(place_name, place, country, quota_ledger, api_cache)
                         elif api_type == 'foursquare_detail':
-                            api_data = check_location_foursquare_detail(place_name, place, country, gsheet)
+                            api_data = check_location_foursquare_detail(place_name, place, country, quota_ledger, api_cache)
                         elif api_type == 'here':
-                            api_data = check_location_here(place_name, place, country, gsheet)
+                            api_data = check_location_here(place_name, place, country, quota_ledger, api_cache)
 
                         # get reviews and suggested duration from trip advisor
                         ta_dict = extract_ta_data(place_name, user_class, driver, ta_review_limits)
@@ -0,0 +1,191 @@
+""" This module keeps track of the API usage locally so that we do not need to read and write the
+    google sheet for every API call.
+
+    Counts and the start of the current reset window for each API in constants.API_LIMITS are
+    stored in a SQLite database. Every update runs in an immediate transaction so the database file
+    is locked while it is being written and several scrapers can share the same ledger.
+
+    If a google sheet is provided, the ledger is seeded from the sheet once and the changes are synced
+    back to the sheet in batches by a background thread. Without a google sheet the ledger works offline.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, timezone
+from . import constants
+from .utils import read_cells, write_cells, logger
+
+
+class QuotaLedger:
+    def __init__(self, db_path, gsheet=None, sync_interval=constants.QUOTA_SYNC_INTERVAL):
+        """Build local quota ledger. Sync to google sheet is started if gsheet is provided"""
+        self.db_path = db_path
+        self.gsheet = gsheet
+        self.sync_interval = sync_interval
+
+        # apis with changes not yet written to google sheet
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sync_thread = None
+
+        # create database folder and table
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS quota "
+                         "(api TEXT PRIMARY KEY, window_start TEXT NOT NULL, count INTEGER NOT NULL)")
+
+        # seed missing apis and start syncing
+        self._seed()
+
+        if self.gsheet is not None:
+            self._sync_thread = threading.Thread(target=self._sync_worker, daemon=True)
+            self._sync_thread.start()
+
+    @contextmanager
+    def _connect(self):
+        """Open a new connection - sqlite connections cannot be shared between threads"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _midnight_today():
+        """Get midnight of today's date"""
+        return datetime.combine(date.today(), datetime.min.time())
+
+    def _seed(self):
+        """Add apis which are not in the ledger yet. Take the values from google sheet if available"""
+        with self._connect() as conn:
+            existing = {row[0] for row in conn.execute("SELECT api FROM quota")}
+
+        missing = [api for api in constants.API_LIMITS if api not in existing]
+        if not missing:
+            return
+
+        rows = {api: (str(self._midnight_today()), 0) for api in missing}
+
+        if self.gsheet is not None:
+            logger.info('Seeding quota ledger from google sheet for: {}...'.format(', '.join(missing)))
+            fields = [(api, field) for api in missing for field in ['DATE', 'COUNT']]
+            values = read_cells(self.gsheet, fields)
+            for api in missing:
+                access_date = datetime.strptime(values[(api, 'DATE')].replace("'", ""), '%Y-%m-%d %H:%M:%S')
+                rows[api] = (str(access_date), int(values[(api, 'COUNT')]))
+
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO quota (api, window_start, count) VALUES (?, ?, ?)",
+                             [(api, window_start, count) for api, (window_start, count) in rows.items()])
+
+    def _mark_dirty(self, api_type):
+        """Flag api to be synced to google sheet"""
+        with self._dirty_lock:
+            self._dirty.add(api_type)
+
+    def get_usage(self, api_type):
+        """Return start of the reset window and the usage count of the api"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT window_start, count FROM quota WHERE api = ?", (api_type,)).fetchone()
+
+        if row is None:
+            raise ValueError('API: {} not found in quota ledger. Please check API_LIMITS in constants.py.'.format(api_type))
+
+        return datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S'), row[1]
+
+    def check_limit(self, api_type):
+        """ Check usage limit of the api
+
+            if current date already passed the limit date, update with today's date and reset quota.
+        """
+        # find out limits and refresh days
+        api_days = constants.API_LIMITS[api_type]['DAY']
+        api_limit = constants.API_LIMITS[api_type]['LIMIT']
+
+        with self._connect() as conn:
+            # lock database so that the check and reset are done in one go
+            conn.execute("BEGIN IMMEDIATE")
+            window_start, usage = conn.execute("SELECT window_start, count FROM quota WHERE api = ?",
+                                               (api_type,)).fetchone()
+            window_start = datetime.strptime(window_start, '%Y-%m-%d %H:%M:%S')
+
+            # find out how many days since (compare to UTC timezone)
+            current_time = datetime.now(timezone.utc).replace(tzinfo=None)
+            time_between = (current_time - window_start).total_seconds() / (60 * 60 * 24)
+
+            # check if limit is reached
+            if time_between <= api_days and usage < api_limit:
+                flag = True
+            elif time_between > api_days:
+                # if date expired, update with today's date midnight and reset quota
+                conn.execute("UPDATE quota SET window_start = ?, count = 0 WHERE api = ?",
+                             (str(self._midnight_today()), api_type))
+                self._mark_dirty(api_type)
+                flag = True
+            else:
+                logger.error('API Limit reached for {}.'.format(api_type))
+                flag = False
+
+            conn.execute("COMMIT")
+
+        return flag
+
+    def check_limits(self, api_types):
+        """Check usage limits of several apis used for one call - True only if none of them is reached
+
+           Every api is checked so expired windows are all reset.
+        """
+        flags = [self.check_limit(api_type) for api_type in api_types]
+        return all(flags)
+
+    def increment(self, api_type, count=1):
+        """Add to the usage count of the api"""
+        with self._connect() as conn:
+            conn.execute("UPDATE quota SET count = count + ? WHERE api = ?", (count, api_type))
+
+        self._mark_dirty(api_type)
+
+    def sync(self):
+        """Write the changes of the ledger to google sheet in one batch"""
+        if self.gsheet is None:
+            return
+
+        with self._dirty_lock:
+            apis = list(self._dirty)
+            self._dirty.clear()
+
+        if not apis:
+            return
+
+        data = {}
+        for api in apis:
+            window_start, usage = self.get_usage(api)
+            data[(api, 'DATE')] = "'" + str(window_start)
+            data[(api, 'COUNT')] = usage
+
+        try:
+            write_cells(self.gsheet, data)
+        except Exception:
+            # keep the changes so that they are synced next time
+            logger.warning('Failed to sync quota ledger to google sheet. Will try again later...')
+            with self._dirty_lock:
+                self._dirty.update(apis)
+
+    def _sync_worker(self):
+        """Sync ledger to google sheet every sync interval until the ledger is closed"""
+        while not self._stop_event.wait(self.sync_interval):
+            self.sync()
+
+    def close(self):
+        """Stop background sync and write out any remaining changes"""
+        if self._sync_thread is not None:
+            self._stop_event.set()
+            self._sync_thread.join()
+            self._sync_thread = None
+
+        self.sync()
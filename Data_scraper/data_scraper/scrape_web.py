@@ -1,13 +1,87 @@
-""" This module scraps a particular website to get the headers and paragraphs
+""" This module scraps websites to get the headers and paragraphs
+
+    Websites are fetched concurrently using a thread pool sharing one connection-pooled
+    requests session. Every request has connect/read timeouts and is retried with backoff,
+    and requests to the same domain are spaced out so we stay polite to each website.
+    Pages are parsed in the main thread as soon as they arrive.
 """
+import time
+import threading
 import requests
-from .utils import logger
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from . import constants
+from .utils import logger
+
+HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Max-Age': '3600',
+    'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0'
+}
+
+
+class DomainThrottle:
+    """Keep a minimum delay between two requests sent to the same domain"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._domain_locks = {}
+        self._last_access = {}
+
+    def _get_domain_lock(self, domain):
+        """Get lock for the domain - create one if it does not exist yet"""
+        with self._lock:
+            if domain not in self._domain_locks:
+                self._domain_locks[domain] = threading.Lock()
+            return self._domain_locks[domain]
+
+    def wait(self, url):
+        """Block until the domain of the url can be accessed again"""
+        domain = urlparse(url).netloc
+
+        with self._get_domain_lock(domain):
+            wait_time = self._last_access.get(domain, 0) + self.delay - time.monotonic()
+            if wait_time > 0:
+                time.sleep(wait_time)
+            self._last_access[domain] = time.monotonic()
+
+
+def build_session(pool_size=constants.SCRAPE_MAX_WORKERS, retries=constants.SCRAPE_RETRIES,
+                  backoff=constants.SCRAPE_BACKOFF):
+    """Build requests session with connection pooling and retries with backoff"""
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=backoff,
+                  status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def fetch_page(session, url, timeout=constants.SCRAPE_TIMEOUT, throttle=None):
+    """Download the content of the url. Timeout is given as (connect, read) in seconds"""
+    if throttle:
+        throttle.wait(url)
+
+    r = session.get(url, timeout=timeout)
+    r.raise_for_status()
+
+    return r.content
+
 
 def get_title(html):
     """Scrape page title."""
     title = None
-    if html.title.string:
+    if html.title and html.title.string:
         title = html.title.string
     elif html.find("meta", property="og:title"):
         title = html.find("meta", property="og:title").get('content')
@@ -17,19 +91,12 @@ def get_title(html):
         title = html.find("h1").string
     return title
 
-def scrape_page(url, websites_data):
-    """Scrape target URL for useful information i.e. headers and paragraphs"""
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Max-Age': '3600',
-        'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0'
-    }
-    r = requests.get(url, headers=headers)
-    html = BeautifulSoup(r.content, 'html.parser')
+
+def parse_page(url, content, websites_data):
+    """Parse the content of a website and store the headers and paragraphs found to websites_data"""
+    html = BeautifulSoup(content, 'html.parser')
     title_name = get_title(html)
-    
+
     logger.info('Scraping {}'.format(url))
 
     # check if the same site has been scrapped before
@@ -38,19 +105,61 @@ def scrape_page(url, websites_data):
         return websites_data
     else:
         result = {}
-        
+
         # find out all lines with headers and any paragraphs associated to them
         flag = ''
         for para in html.find_all():
           if para.name in ['h4', 'h3', 'h2', 'h1', 'h']:
             result[para.text] = ""
             flag = para.text
-          
+
           if flag != '' and para.name == "p":
             result[flag] += para.text
-            
+
         # store data to website data
         websites_data[title_name] = result
-            
+
         return websites_data
 
+
+def scrape_page(url, websites_data, session=None):
+    """Scrape target URL for useful information i.e. headers and paragraphs"""
+    if session is None:
+        session = build_session()
+
+    return parse_page(url, fetch_page(session, url), websites_data)
+
+
+def scrape_pages(urls, websites_data, max_workers=constants.SCRAPE_MAX_WORKERS, timeout=constants.SCRAPE_TIMEOUT,
+                 domain_delay=constants.SCRAPE_DOMAIN_DELAY):
+    """Scrape all target URLs concurrently and store the headers and paragraphs to websites_data
+
+       Urls that fail to download after all retries (timeouts included) or fail to parse are logged and skipped.
+    """
+    # remove repeated urls but keep the order
+    urls = list(dict.fromkeys(urls))
+
+    session = build_session(pool_size=max_workers)
+    throttle = DomainThrottle(domain_delay)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_page, session, url, timeout, throttle): url for url in urls}
+
+            # parse the pages as they arrive
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    content = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.warning('Failed to download url {}: {}. Skipped...'.format(url, e))
+                    continue
+
+                try:
+                    websites_data = parse_page(url, content, websites_data)
+                except Exception as e:
+                    logger.warning('Failed to parse url {}: {}. Skipped...'.format(url, e))
+    finally:
+        session.close()
+
+    return websites_data
@@ -1,8 +1,100 @@
-from googlesearch import search 
+""" This module searches google to get the urls of the websites that we want to scrape
+
+    Query results are cached on disk so re-runs of the same city only search the queries
+    which are not answered yet or have expired. Uncached queries are searched concurrently
+    within a rate budget. The search provider is pluggable so a local stub can replace google.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from googlesearch import search
+from . import constants
+from .utils import read_json_file, write_output_json, logger
+
+
+class GoogleSearchProvider:
+    """Search provider using google search"""
+
+    def __init__(self, pause_time=1):
+        self.pause_time = pause_time
+
+    def search(self, query, num_result, country):
+        """Return list of urls found for the query"""
+        return list(search(query, stop=num_result, pause=self.pause_time, country=country))
+
+
+class StubSearchProvider:
+    """Local search provider returning urls from a dictionary of query: list of urls. Used for testing"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def search(self, query, num_result, country):
+        """Return list of urls stored for the query"""
+        return self.results.get(query, [])[:num_result]
+
+
+class RateLimiter:
+    """Allow at most max_calls calls within every period (in seconds)"""
+
+    def __init__(self, max_calls, period):
+        self.interval = period / max_calls
+        self._lock = threading.Lock()
+        self._next_call = 0
+
+    def wait(self):
+        """Block until the next call is allowed"""
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class SearchCache:
+    """Cache of query -> urls results stored on disk as a json file
+
+       Results older than the ttl (in seconds) are treated as not cached.
+    """
+
+    def __init__(self, cache_dir, ttl=constants.SEARCH_CACHE_TTL, file_name=constants.SEARCH_CACHE_NAME):
+        self.cache_dir = cache_dir
+        self.file_name = file_name
+        self.ttl = ttl
+        self.filepath = os.path.join(cache_dir, '{}.json'.format(file_name))
+        self.data = read_json_file(self.filepath) if os.path.exists(self.filepath) else {}
+
+    @staticmethod
+    def _key(query, num_result, country):
+        """Form cache key for a query"""
+        return '{}|{}|{}'.format(country, num_result, ' '.join(query.lower().split()))
+
+    def get(self, query, num_result, country):
+        """Return cached urls for the query. None is returned if the query is not cached or has expired"""
+        entry = self.data.get(self._key(query, num_result, country))
+
+        if entry and time.time() - entry['timestamp'] <= self.ttl:
+            return entry['urls']
+
+        return None
+
+    def set(self, query, num_result, country, urls):
+        """Store urls found for the query"""
+        self.data[self._key(query, num_result, country)] = {'urls': urls, 'timestamp': time.time()}
+
+    def save(self):
+        """Write cache out to disk"""
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        write_output_json(self.data, self.cache_dir, self.file_name)
+
 
 def define_googlequery(user_class):
     """ Form a list of queries to search google """
-    
+
     # unwrap class attributes
     place = user_class.place
     # country = user_class.country
@@ -38,15 +130,55 @@ def define_googlequery(user_class):
                    place + " adventure ideas",
                  ]
 
-    return query_list 
+    return query_list
 
-def request_urls(query_list, user_class, num_result=1, pause_time=1):
+def request_urls(query_list, user_class, num_result=1, pause_time=1, provider=None, cache_dir=None,
+                 max_workers=constants.SEARCH_MAX_WORKERS, rate_limit=constants.SEARCH_RATE_LIMIT):
     """ Takes in the user's search keywords and finds out the relevant urls
-    """ 
-    # google search to get urls
+
+        If cache_dir is provided, queries answered before are taken from the cache and only the remaining
+        queries are searched. Queries are searched concurrently, limited to rate_limit queries per minute.
+    """
+    country = user_class.country
+
+    if provider is None:
+        provider = GoogleSearchProvider(pause_time)
+
+    # find out which queries have been answered before - each query is only looked up and searched once
+    cache = SearchCache(cache_dir) if cache_dir else None
+    unique_queries = list(dict.fromkeys(query_list))
+    results = {}
+    for query in unique_queries:
+        urls = cache.get(query, num_result, country) if cache else None
+        if urls is not None:
+            results[query] = urls
+
+    uncached_queries = [query for query in unique_queries if query not in results]
+    logger.info('{} queries found in cache. Searching for the remaining {} queries...'
+                .format(len(unique_queries) - len(uncached_queries), len(uncached_queries)))
+
+    # search for the uncached queries within the rate budget
+    limiter = RateLimiter(rate_limit, 60)
+
+    def _search(query):
+        limiter.wait()
+        return provider.search(query, num_result, country)
+
+    if uncached_queries:
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for query, urls in zip(uncached_queries, executor.map(_search, uncached_queries)):
+                    results[query] = urls
+                    if cache:
+                        cache.set(query, num_result, country, urls)
+        finally:
+            # keep the answered queries even if the search failed half way
+            if cache:
+                cache.save()
+
+    # google search to get urls - keep the order of the queries
     search_urls = []
     for query in query_list:
-        search_urls.extend(search(query, stop=num_result, pause=pause_time, 
-                                  country=user_class.country))
-    
-    return search_urls
\ No newline at end of file
+        search_urls.extend(results[query])
+
+    return search_urls
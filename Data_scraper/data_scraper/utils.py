@@ -144,14 +144,18 @@ def get_gsheet(path):
     
     return sheet
 
+def get_range_name(api_name, field):
+    """ Get range name of a cell in the googlesheet """
+    try:
+        return constants.GSHEET_DICT[api_name][field]
+    except:
+        raise ValueError('Range name not found from the dictionary in constants.py. Please check if the keys are correct.')
+
 def read_cell(gsheet, api_name, field):
     """ Read value from a cell in a googlesheet """
     
     # establish range name
-    try:
-        range_name = constants.GSHEET_DICT[api_name][field]
-    except:
-        raise ValueError('Range name not found from the dictionary in constants.py. Please check if the keys are correct.')
+    range_name = get_range_name(api_name, field)
     
     # read data
     result = gsheet.values().get(spreadsheetId=constants.SPREADSHEET_ID, 
@@ -163,10 +167,7 @@ def write_cell(gsheet, api_name, field, input_value):
     """ Write value to a cell in a googlesheet """
     
     # establish range name
-    try:
-        range_name = constants.GSHEET_DICT[api_name][field]
-    except:
-        raise ValueError('Range name not found from the dictionary in constants.py. Please check if the keys are correct.')
+    range_name = get_range_name(api_name, field)
 
     # write data
     values = [[input_value],]
@@ -178,6 +179,33 @@ def write_cell(gsheet, api_name, field, input_value):
     
     return gsheet
 
+def read_cells(gsheet, fields):
+    """ Read values from several cells in a googlesheet in one request
+
+        fields is a list of (api_name, field). Returns a dictionary of (api_name, field): value
+    """
+    ranges = [get_range_name(api_name, field) for api_name, field in fields]
+
+    # read data
+    result = gsheet.values().batchGet(spreadsheetId=constants.SPREADSHEET_ID, ranges=ranges).execute()
+
+    # return string from nested list of each range
+    return {field: value_range.get('values')[0][0] for field, value_range in zip(fields, result.get('valueRanges'))}
+
+def write_cells(gsheet, data):
+    """ Write values to several cells in a googlesheet in one request
+
+        data is a dictionary of (api_name, field): input_value
+    """
+    body = {'valueInputOption': 'RAW',
+            'data': [{'range': get_range_name(api_name, field), 'values': [[input_value]]}
+                     for (api_name, field), input_value in data.items()]}
+
+    # write data
+    gsheet.values().batchUpdate(spreadsheetId=constants.SPREADSHEET_ID, body=body).execute()
+
+    return gsheet
+
 def str2bool(v):
     """Convert string to boolean"""
     if isinstance(v, bool):
@@ -0,0 +1,12 @@
+""" Shared setup of the data scraper tests """
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# importing data_scraper.utils writes a log file to the working directory - keep it out of the repo
+os.chdir(tempfile.mkdtemp(prefix='data_scraper_tests_'))
+
+# needs chrome and a live connection to google maps - run it as a script instead
+collect_ignore = ['test_gmaps.py']
@@ -0,0 +1,139 @@
+""" Tests of the API response cache with a fake API """
+import json
+import sqlite3
+from unittest import mock
+import pytest
+from data_scraper import access_api
+from data_scraper.access_api import _cached_call, check_location_foursquare
+from data_scraper.api_cache import ApiResponseCache
+from data_scraper.get_locationinfo import check_api_limit
+from data_scraper.quota import QuotaLedger
+
+FOUND = {'meta': {'code': 200}, 'response': {'venues': [{'name': 'Gardens by the Bay',
+                                                         'location': {'formattedAddress': ['18 Marina Gardens Dr']},
+                                                         'categories': []}]}}
+NOT_FOUND = {'meta': {'code': 200}, 'response': {'venues': []}}
+ERROR = {'meta': {'code': 429}}
+
+
+def is_found(data):
+    return bool(data.get('response', {}).get('venues'))
+
+
+def is_valid(data):
+    return data.get('meta', {}).get('code') == 200
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ApiResponseCache(str(tmp_path / 'cache' / 'api_responses.db'), ttl={'venues/search': 100},
+                            negative_ttl=10)
+
+
+def age(cache, seconds):
+    """Make every cached response older by the seconds given"""
+    conn = sqlite3.connect(cache.db_path)
+    with conn:
+        conn.execute("UPDATE responses SET timestamp = timestamp - ?", (seconds,))
+    conn.close()
+
+
+def call(cache, fetch, query='Gardens by the Bay'):
+    return _cached_call(cache, 'foursquare', 'venues/search', query, 'Singapore', fetch, is_found, is_valid)
+
+
+def test_cache_round_trip(cache):
+    assert cache.get('foursquare', 'venues/search', 'Gardens by the Bay', 'Singapore') == (False, None)
+
+    cache.set('foursquare', 'venues/search', 'Gardens by the Bay', 'Singapore', FOUND, True)
+    # queries ignore case and repeated spaces
+    assert cache.get('foursquare', 'venues/search', 'gardens  by the bay', 'singapore') == (True, FOUND)
+    assert cache.get('here', 'venues/search', 'Gardens by the Bay', 'Singapore') == (False, None)
+
+
+def test_cached_call_only_calls_api_once(cache):
+    fetch = mock.Mock(return_value=FOUND)
+
+    assert call(cache, fetch) == (FOUND, True)
+    assert call(cache, fetch) == (FOUND, False)
+    fetch.assert_called_once()
+
+
+def test_cached_call_does_not_cache_errors(cache):
+    fetch = mock.Mock(return_value=ERROR)
+
+    assert call(cache, fetch) == (ERROR, True)
+    assert call(cache, fetch) == (ERROR, True)
+    assert fetch.call_count == 2
+
+
+def test_found_response_expires_after_ttl(cache):
+    fetch = mock.Mock(return_value=FOUND)
+    call(cache, fetch)
+
+    age(cache, 50)
+    assert call(cache, fetch) == (FOUND, False)
+
+    age(cache, 51)
+    assert call(cache, fetch) == (FOUND, True)
+    assert fetch.call_count == 2
+
+
+def test_not_found_response_expires_after_negative_ttl(cache):
+    fetch = mock.Mock(return_value=NOT_FOUND)
+    call(cache, fetch)
+
+    age(cache, 9)
+    assert call(cache, fetch) == (NOT_FOUND, False)
+
+    age(cache, 2)
+    assert call(cache, fetch) == (NOT_FOUND, True)
+    assert fetch.call_count == 2
+
+
+def test_cache_only_never_calls_api(tmp_path):
+    db_path = str(tmp_path / 'api_responses.db')
+    call(ApiResponseCache(db_path), mock.Mock(return_value=FOUND))
+
+    cache = ApiResponseCache(db_path, cache_only=True)
+    fetch = mock.Mock(return_value=FOUND)
+    assert call(cache, fetch) == (FOUND, False)
+    assert call(cache, fetch, query='Merlion Park') == (None, False)
+    fetch.assert_not_called()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'api_quota.db'), gsheet=None)
+    yield ledger
+    ledger.close()
+
+
+def test_quota_only_counts_api_calls(cache, ledger, monkeypatch):
+    get = mock.Mock(return_value=mock.Mock(text=json.dumps(FOUND)))
+    monkeypatch.setattr(access_api.requests, 'get', get)
+
+    for _ in range(3):
+        result = check_location_foursquare('Gardens by the Bay', 'Singapore', 'Singapore', ledger, cache)
+        assert result[0] == 'Gardens by the Bay'
+
+    get.assert_called_once()
+    assert ledger.get_usage('foursquare')[1] == 1
+
+
+def test_cache_only_skips_check_limit(tmp_path):
+    ledger = mock.Mock()
+
+    assert check_api_limit(ledger, 'foursquare', ApiResponseCache(str(tmp_path / 'db'), cache_only=True))
+    ledger.check_limit.assert_not_called()
+    ledger.check_limits.assert_not_called()
+
+
+def test_check_api_limit(tmp_path):
+    ledger = mock.Mock()
+
+    check_api_limit(ledger, 'here', ApiResponseCache(str(tmp_path / 'db')))
+    ledger.check_limit.assert_called_once_with('here')
+
+    check_api_limit(ledger, 'foursquare_detail')
+    ledger.check_limits.assert_called_once_with(['foursquare_detail', 'foursquare'])
@@ -0,0 +1,99 @@
+""" Tests of the local API quota ledger (offline, without google sheet) """
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+from data_scraper import constants, quota
+from data_scraper.quota import QuotaLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / 'quota' / 'api_quota.db'), gsheet=None)
+    yield ledger
+    ledger.close()
+
+
+def set_usage(ledger, api_type, window_start, count):
+    """Overwrite the reset window and count of the api"""
+    conn = sqlite3.connect(ledger.db_path)
+    with conn:
+        conn.execute("UPDATE quota SET window_start = ?, count = ? WHERE api = ?",
+                     (str(window_start.replace(microsecond=0)), count, api_type))
+    conn.close()
+
+
+def test_seed_adds_every_api(ledger):
+    midnight = QuotaLedger._midnight_today()
+
+    for api_type in constants.API_LIMITS:
+        assert ledger.get_usage(api_type) == (midnight, 0)
+
+
+def test_seed_keeps_existing_counts(ledger, monkeypatch):
+    ledger.increment('here', 5)
+
+    monkeypatch.setitem(constants.API_LIMITS, 'new_api', {'DAY': 1, 'LIMIT': 10})
+    reopened = QuotaLedger(ledger.db_path, gsheet=None)
+
+    assert reopened.get_usage('here')[1] == 5
+    assert reopened.get_usage('new_api') == (QuotaLedger._midnight_today(), 0)
+
+
+def test_seed_from_google_sheet(tmp_path, monkeypatch):
+    values = {(api, 'DATE'): "'2021-03-01 00:00:00" for api in constants.API_LIMITS}
+    values.update({(api, 'COUNT'): '7' for api in constants.API_LIMITS})
+    monkeypatch.setattr(quota, 'read_cells', lambda gsheet, fields: {x: values[x] for x in fields})
+    monkeypatch.setattr(quota, 'write_cells', lambda gsheet, data: None)
+
+    ledger = QuotaLedger(str(tmp_path / 'api_quota.db'), gsheet=object(), sync_interval=60)
+    ledger.close()
+
+    assert ledger.get_usage('foursquare') == (datetime(2021, 3, 1), 7)
+
+
+def test_get_usage_unknown_api(ledger):
+    with pytest.raises(ValueError):
+        ledger.get_usage('unknown')
+
+
+def test_increment(ledger):
+    ledger.increment('foursquare')
+    ledger.increment('foursquare', 3)
+
+    assert ledger.get_usage('foursquare')[1] == 4
+    assert ledger.get_usage('here')[1] == 0
+
+
+def test_check_limit_within_window(ledger):
+    limit = constants.API_LIMITS['foursquare_detail']['LIMIT']
+
+    set_usage(ledger, 'foursquare_detail', datetime.utcnow() - timedelta(hours=1), limit - 1)
+    assert ledger.check_limit('foursquare_detail')
+
+    ledger.increment('foursquare_detail')
+    assert not ledger.check_limit('foursquare_detail')
+    # count is kept until the window expires
+    assert ledger.get_usage('foursquare_detail')[1] == limit
+
+
+def test_check_limit_resets_expired_window(ledger):
+    days = constants.API_LIMITS['here']['DAY']
+    limit = constants.API_LIMITS['here']['LIMIT']
+    set_usage(ledger, 'here', datetime.utcnow() - timedelta(days=days + 1), limit)
+
+    assert ledger.check_limit('here')
+    assert ledger.get_usage('here') == (QuotaLedger._midnight_today(), 0)
+
+
+def test_check_limits_needs_every_api(ledger):
+    # regression: foursquare_detail was allowed when both apis had reached their limits (flag_1 == flag_2)
+    now = datetime.utcnow() - timedelta(hours=1)
+    set_usage(ledger, 'foursquare_detail', now, constants.API_LIMITS['foursquare_detail']['LIMIT'])
+    set_usage(ledger, 'foursquare', now, constants.API_LIMITS['foursquare']['LIMIT'])
+    assert not ledger.check_limits(['foursquare_detail', 'foursquare'])
+
+    set_usage(ledger, 'foursquare', now, 0)
+    assert not ledger.check_limits(['foursquare_detail', 'foursquare'])
+
+    set_usage(ledger, 'foursquare_detail', now, 0)
+    assert ledger.check_limits(['foursquare_detail', 'foursquare'])
@@ -0,0 +1,91 @@
+""" Tests of the concurrent web scraper with a mocked session """
+import time
+from unittest import mock
+import pytest
+import requests
+from data_scraper import scrape_web
+from data_scraper.scrape_web import DomainThrottle, scrape_pages
+
+PAGES = {'https://a.com/1': b'<html><title>Page A1</title><h2>Food</h2><p>Laksa</p><p> and satay</p></html>',
+         'https://a.com/2': b'<html><title>Page A2</title><h1>Parks</h1><p>Gardens</p></html>',
+         'https://b.com/1': b'<html><title>Page B1</title><h3>Museums</h3><p>Art</p></html>'}
+
+
+def fake_session(pages, errors=None):
+    """Mocked session returning the content of the pages and raising the errors given for the other urls"""
+    errors = errors or {}
+
+    def get(url, timeout=None):
+        if url in errors:
+            raise errors[url]
+        return mock.Mock(content=pages[url], raise_for_status=mock.Mock())
+
+    return mock.Mock(get=mock.Mock(side_effect=get), close=mock.Mock())
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = fake_session(PAGES, {'https://b.com/timeout': requests.exceptions.ConnectionError('read timed out'),
+                                   'https://b.com/retries': requests.exceptions.RetryError('too many 503s')})
+    monkeypatch.setattr(scrape_web, 'build_session', lambda pool_size: session)
+    return session
+
+
+def test_scrape_pages(session):
+    websites_data = scrape_pages(list(PAGES) + ['https://a.com/1'], {}, max_workers=4, domain_delay=0)
+
+    assert websites_data == {'Page A1': {'Food': 'Laksa and satay'},
+                             'Page A2': {'Parks': 'Gardens'},
+                             'Page B1': {'Museums': 'Art'}}
+    # repeated urls are downloaded once
+    assert session.get.call_count == 3
+    session.close.assert_called_once()
+
+
+def test_scrape_pages_skips_failed_downloads(session):
+    websites_data = scrape_pages(['https://b.com/timeout', 'https://b.com/retries', 'https://b.com/1'], {},
+                                 max_workers=2, domain_delay=0)
+
+    assert list(websites_data) == ['Page B1']
+    session.close.assert_called_once()
+
+
+def test_scrape_pages_skips_pages_failing_to_parse(session, monkeypatch):
+    parse_page = scrape_web.parse_page
+
+    def failing_parse(url, content, websites_data):
+        if url == 'https://a.com/2':
+            raise AttributeError('bad page')
+        return parse_page(url, content, websites_data)
+
+    monkeypatch.setattr(scrape_web, 'parse_page', failing_parse)
+    websites_data = scrape_pages(list(PAGES), {}, max_workers=2, domain_delay=0)
+
+    assert set(websites_data) == {'Page A1', 'Page B1'}
+
+
+def test_scrape_pages_closes_session_on_error(session):
+    session.get.side_effect = KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        scrape_pages(['https://a.com/1'], {}, max_workers=1, domain_delay=0)
+    session.close.assert_called_once()
+
+
+def test_domain_throttle_spaces_requests_to_same_domain():
+    throttle = DomainThrottle(0.05)
+
+    start = time.monotonic()
+    for _ in range(3):
+        throttle.wait('https://a.com/page')
+    assert time.monotonic() - start >= 0.1
+
+
+def test_domain_throttle_does_not_delay_other_domains():
+    throttle = DomainThrottle(10)
+    throttle.wait('https://a.com/page')
+
+    start = time.monotonic()
+    throttle.wait('https://b.com/page')
+    throttle.wait('https://c.com/page')
+    assert time.monotonic() - start < 1
@@ -0,0 +1,112 @@
+""" Tests of the cached concurrent google search with the stub search provider """
+import time
+from types import SimpleNamespace
+from unittest import mock
+import pytest
+from data_scraper.search_google import SearchCache, StubSearchProvider, RateLimiter, request_urls
+
+RESULTS = {'Singapore parks': ['https://parks.sg', 'https://gardens.sg'],
+           'Singapore museums': ['https://museums.sg'],
+           'Singapore nightlife': ['https://bars.sg']}
+
+USER = SimpleNamespace(country='Singapore')
+
+
+@pytest.fixture
+def provider():
+    """Stub search provider counting the queries searched"""
+    provider = StubSearchProvider(RESULTS)
+    provider.search = mock.Mock(wraps=provider.search)
+    return provider
+
+
+def searched(provider):
+    return [x.args[0] for x in provider.search.call_args_list]
+
+
+def test_stub_search_provider():
+    provider = StubSearchProvider(RESULTS)
+
+    assert provider.search('Singapore parks', 1, 'Singapore') == ['https://parks.sg']
+    assert provider.search('Singapore parks', 5, 'Singapore') == RESULTS['Singapore parks']
+    assert provider.search('unknown', 5, 'Singapore') == []
+
+
+def test_request_urls_keeps_query_order(provider):
+    queries = ['Singapore nightlife', 'Singapore parks', 'Singapore museums']
+
+    urls = request_urls(queries, USER, num_result=2, provider=provider, max_workers=3, rate_limit=600)
+    assert urls == ['https://bars.sg', 'https://parks.sg', 'https://gardens.sg', 'https://museums.sg']
+
+
+def test_request_urls_searches_repeated_queries_once(provider, tmp_path):
+    queries = ['Singapore parks', 'Singapore museums', 'Singapore parks']
+
+    urls = request_urls(queries, USER, provider=provider, cache_dir=str(tmp_path), rate_limit=600)
+    assert urls == ['https://parks.sg', 'https://museums.sg', 'https://parks.sg']
+    assert sorted(searched(provider)) == ['Singapore museums', 'Singapore parks']
+
+
+def test_request_urls_only_searches_uncached_queries(provider, tmp_path):
+    request_urls(['Singapore parks'], USER, provider=provider, cache_dir=str(tmp_path), rate_limit=600)
+    provider.search.reset_mock()
+
+    urls = request_urls(['Singapore parks', 'Singapore museums'], USER, provider=provider, cache_dir=str(tmp_path),
+                        rate_limit=600)
+    assert urls == ['https://parks.sg', 'https://museums.sg']
+    assert searched(provider) == ['Singapore museums']
+
+
+def test_search_cache_round_trip(tmp_path):
+    cache = SearchCache(str(tmp_path))
+    cache.set('Singapore  Parks', 1, 'Singapore', ['https://parks.sg'])
+    cache.save()
+
+    cache = SearchCache(str(tmp_path))
+    # keys ignore case and repeated spaces
+    assert cache.get('singapore parks', 1, 'Singapore') == ['https://parks.sg']
+    assert cache.get('singapore parks', 2, 'Singapore') is None
+    assert cache.get('singapore parks', 1, 'Malaysia') is None
+
+
+def test_search_cache_ttl_expiry(tmp_path):
+    cache = SearchCache(str(tmp_path), ttl=60)
+    cache.set('Singapore parks', 1, 'Singapore', ['https://parks.sg'])
+    entry = cache.data[SearchCache._key('Singapore parks', 1, 'Singapore')]
+
+    entry['timestamp'] = time.time() - 59
+    assert cache.get('Singapore parks', 1, 'Singapore') == ['https://parks.sg']
+
+    entry['timestamp'] = time.time() - 61
+    assert cache.get('Singapore parks', 1, 'Singapore') is None
+
+
+def test_request_urls_searches_expired_queries_again(provider, tmp_path):
+    request_urls(['Singapore parks'], USER, provider=provider, cache_dir=str(tmp_path), rate_limit=600)
+
+    cache = SearchCache(str(tmp_path))
+    for entry in cache.data.values():
+        entry['timestamp'] -= cache.ttl + 1
+    cache.save()
+    provider.search.reset_mock()
+
+    request_urls(['Singapore parks'], USER, provider=provider, cache_dir=str(tmp_path), rate_limit=600)
+    assert searched(provider) == ['Singapore parks']
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(10, 1)
+
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    # first call goes straight away, then one call every 0.1s
+    assert 0.3 <= time.monotonic() - start < 1
+
+
+def test_rate_limiter_first_call_does_not_wait():
+    limiter = RateLimiter(1, 60)
+
+    start = time.monotonic()
+    limiter.wait()
+    assert time.monotonic() - start < 0.1
@@ -2,6 +2,7 @@
 
     To run the package, please use command:
         python -m data_wrangler [-h] --inp path_to_data [--wf wordfinder_config] [--ml multilabel_config]
+        [--publish path_to_venue_table]
 
     args:
         [ ]: optional arguments
@@ -10,6 +11,8 @@
                         0 = one hot encoding, 1 = weighted words, 2 = weighted and normalised
         multilabel_config: Default config = 0. Configuration for how scores are calculated in nlp multilabel
                         classification. 0 = one hot encoding, 1 = raw scores
+        path_to_venue_table: Default is Planning_engine/data/TripPlannerData.pkl. Output pickle is copied there so
+                        the planning engine and the web app pick up the new data.
 """
 import spacy
 import os
@@ -17,7 +20,7 @@ import argparse
 import pandas as pd
 from datetime import datetime
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from .utils import read_json_file, logger, read_excel_as_df, write_output_pickle
+from .utils import read_json_file, logger, read_excel_as_df, write_output_pickle, publish_output
 from .unpack_dict import unpack_dict
 from .validate import validate_data
 from .analyse_text import analyse_text
@@ -27,7 +30,7 @@ from .duration import find_duration_of_loc
 from .pp_dict import pp_dict
 
 
-def main(inp_path, wf_config, ml_config):
+def main(inp_path, wf_config, ml_config, publish_path=None):
     """ Main function for data wrangler
     """
     start = datetime.now()
@@ -38,6 +41,8 @@ def main(inp_path, wf_config, ml_config):
     nlp_loc_path = os.path.join(parent_path, 'NLP_ML', 'nlp_loc_model')
     misc_path = os.path.join(parent_path, 'Miscellaneous')
     output_path = os.path.join(parent_path, 'Data_scraper', 'output_data')
+    if not publish_path:
+        publish_path = os.path.join(parent_path, 'Planning_engine', 'data', 'TripPlannerData.pkl')
 
     # check if input data path exist
     if not os.path.exists(inp_path):
@@ -136,7 +141,8 @@ def main(inp_path, wf_config, ml_config):
     df = pd.DataFrame.from_dict(inp_dict, orient='index')
     df.to_html('{}.html'.format(output_file_name))
     logger.info('Output html file created as {}.html...'.format(output_file_name))
-    write_output_pickle(df, '', output_file_name)
+    pickle_path = write_output_pickle(df, '', output_file_name)
+    publish_output(pickle_path, publish_path)
 
     # record time taken 
     end = datetime.now()
@@ -156,7 +162,10 @@ if __name__ == "__main__":
     parser.add_argument('--ml', type=int, default=0, choices=[0, 1],
                         help='Default config = 0. Configuration for how scores are calculated in nlp multilabel '
                              'classification. 0 = one hot encoding, 1 = raw scores')
+    parser.add_argument('--publish', type=str, default=None,
+                        help='Path to copy the output pickle to for the planning engine. '
+                             'Default is Planning_engine/data/TripPlannerData.pkl.')
     args = parser.parse_args()
 
     # call main function
-    main(args.inp, args.wf, args.ml)
+    main(args.inp, args.wf, args.ml, args.publish)
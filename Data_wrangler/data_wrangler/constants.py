@@ -74,4 +74,4 @@ TIME_PERIOD = ['AM', 'PM']
 STRING_TO_TIME_MAPPING = {'NOON': '12:00', 'MIDNIGHT': '24:00', 'MORNING': '09:00',
                           'EVENING': '19:00', 'CLOSED': None, 'NONE': None}
 
-DAYS_IN_A_WEEK = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
\ No newline at end of file
+DAYS_IN_A_WEEK = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
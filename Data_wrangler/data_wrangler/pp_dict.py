@@ -1,5 +1,8 @@
 """This module post-processes the location dictionary which has been unpacked """
 
+# opening hours are encoded with the functions of the planning engine so the bitmap written is the one the planner reads
+from planning_engine.hours import timeranges_to_bitmap, pack_hours
+from planning_engine.utils import parse_timeranges
 from .utils import logger, convert_12hr_to_24hr_timerange
 from .constants import MIN_REVIEW_RATINGS, RESTAURANT_PRICES, DAYS_IN_A_WEEK
 
@@ -204,15 +207,37 @@ def unpack_google_hours(result_dict, key_to_read, key_to_write):
     return result_dict
 
 
+def encode_opening_hours(result_dict, key_to_read, key_to_write):
+    """Encode opening hours of the week into a bitmap of 15 minute slots
+
+       Bitmap is 7 days x 96 slots packed into 84 bytes (bit set if the venue is open for the whole slot).
+       Time ranges past midnight continue on the next day. None if the opening hours are unknown.
+    """
+    week = [parse_timeranges(result_dict["{}_for_{}".format(key_to_read, day.lower())]) for day in DAYS_IN_A_WEEK]
+
+    # opening hours unknown
+    if not any(week):
+        result_dict[key_to_write] = None
+        return result_dict
+
+    result_dict[key_to_write] = pack_hours(timeranges_to_bitmap(week)).tobytes()
+
+    return result_dict
+
+
 def pp_dict(result_dict, venue_categories):
     """Data clean dictionary and post-process the dictionary to add more data like tags, prices, durations etc.
        Items:
        (1) convert review ratings to standardise values
        (2) combine reviews and tips into one new key
        (3) convert suggested duration from tripadvisor to fix hours
-       (4) assign venue tag to location. For example, 'restaruant' is a tag and consists of all different categories of
+       (4) convert pricing tiers of restaurants to price values
+       (5) convert categories to lower case
+       (6) assign venue tag to location. For example, 'restaruant' is a tag and consists of all different categories of
        restaurants
-
+       (7) add hardcoded duration based on tag
+       (8) unpack popular times and opening hours
+       (9) encode opening hours into a bitmap of 15 minute slots so they do not need to be parsed again
 
     """
     # (1) reformat the reviews so that both google and trip advisor data are standardised
@@ -238,16 +263,16 @@ def pp_dict(result_dict, venue_categories):
     if result_dict['foursquare_category']:
         result_dict['foursquare_category'] = result_dict['foursquare_category'].lower()
 
-    # (5) add tags to the venue based on the category of location
+    # (6) add tags to the venue based on the category of location
     result_dict['tags'] = add_tags(result_dict, venue_categories)
 
-    # (6) add hardcoded duration based on tag
+    # (7) add hardcoded duration based on tag
     result_dict['hardcoded_durations_value'], result_dict['hardcoded_durations_priority'] = add_hardcoded_duration(result_dict, venue_categories)
 
-    # (7) unpack popular times properly (this is from foursquare)
+    # (8) unpack popular times properly (this is from foursquare)
     result_dict = unpack_foursquare_hours(result_dict, "popular_timeframes", "popular_time")
 
-    # (7) unpack opening hours properly (this is either from foursquare or google)
+    # (8) unpack opening hours properly (this is either from foursquare or google)
     if result_dict['hours']:
         result_dict = unpack_google_hours(result_dict, "hours", "hours")
         del result_dict['foursquare_hours']
@@ -255,4 +280,7 @@ def pp_dict(result_dict, venue_categories):
         result_dict = unpack_foursquare_hours(result_dict, "foursquare_hours", "hours")
         del result_dict['hours']
 
+    # (9) encode opening hours into bitmap
+    result_dict = encode_opening_hours(result_dict, "hours", "hours_bitmap")
+
     return result_dict
@@ -2,6 +2,7 @@
 
 import pickle
 import os
+import shutil
 import logging
 import json
 import numpy as np
@@ -197,18 +198,38 @@ def check_filename(output_file_name):
 
 
 def write_output_pickle(data, output_dir, output_file_name):
-    """ Writes output data as pickle format """
+    """ Writes output data as pickle format and returns path of the file written """
 
     # check filename
     output_file_name = check_filename(output_file_name)
 
     # write python dict to a file
-    output = open(os.path.join(output_dir, '{}.pkl'.format(output_file_name)), 'wb')
+    output_path = os.path.join(output_dir, '{}.pkl'.format(output_file_name))
+    output = open(output_path, 'wb')
     pickle.dump(data, output)
     output.close()
 
     logger.info('Successfully created pickle file {}.pkl...'.format(output_file_name))
 
+    return output_path
+
+
+def publish_output(filepath, publish_path):
+    """ Copy output file to where it is read by the other engines, e.g. venue table of the planning engine
+
+        The file is copied next to publish_path first and then renamed, so readers never see half a file.
+    """
+
+    publish_dir = os.path.dirname(os.path.abspath(publish_path))
+    if not os.path.exists(publish_dir):
+        os.makedirs(publish_dir)
+
+    tmp_path = '{}.tmp'.format(publish_path)
+    shutil.copyfile(filepath, tmp_path)
+    os.replace(tmp_path, publish_path)
+
+    logger.info('Published {} to {}...'.format(filepath, publish_path))
+
     return None
 
 
@@ -1 +0,0 @@
-""" main code for planning engine """
\ No newline at end of file
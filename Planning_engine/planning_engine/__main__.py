@@ -0,0 +1,200 @@
+""" Planning_engine python package's main entry point code
+
+    To run the package, please use command:
+        python -m planning_engine plan [-h] --inp path_to_data --start START_DATE --end END_DATE [--adults NUM_OF_ADULTS]
+        [--children NUM_OF_CHILDREN] [--budget BUDGET] [--hotel LATITUDE,LONGITUDE] [--radius MAX_DISTANCE]
+        [--time TIME_LIMIT] [--matrix path_to_matrix]
+
+    To plan the itineraries of many trip profiles (one per row of a csv file, see batch module), please use command:
+        python -m planning_engine batch [-h] --inp path_to_data --profiles path_to_profiles [--out path_to_output]
+        [--time TIME_LIMIT] [--matrix path_to_matrix] [--workers NUM_OF_WORKERS]
+
+    To benchmark the planner on synthetic cities, please use command:
+        python -m planning_engine benchmark [-h] [--sizes NUM_OF_VENUES,...] [--profiles NUM_OF_PROFILES]
+        [--time TIME_LIMIT] [--seed SEED] [--out path_to_results]
+
+    To build the travel time matrix of the venues, please use command:
+        python -m planning_engine matrix [-h] --inp path_to_data [--out path_to_matrix] [--routing]
+
+    args:
+        [ ]: optional arguments
+        path_to_data: path to the venue table (.pkl) written by the data wrangler
+        path_to_matrix: path to the travel time matrix (.npy)
+        START_DATE, END_DATE: first and last day of the trip in YYYY-MM-DD format
+"""
+import os
+import json
+import argparse
+from datetime import datetime
+from .venues import load_venue_data
+from .profile import TripProfile
+from .planner import Planner
+from .travel import TravelTimeMatrix, LocalRoutingStandIn, build_travel_matrix
+from .batch import read_profiles, plan_batch, write_columns
+from .benchmark import run_benchmark, write_results
+from .constants import TIME_LIMIT, BUDGET_PRICE_LIMITS, TRAVEL_MATRIX_NAME, BENCHMARK_SIZES, BENCHMARK_PROFILES
+from .utils import logger, setup_logging
+
+
+def build_matrix(inp_path, out_path, use_routing):
+    """Build travel time matrix of all venues in the venue table"""
+    start = datetime.now()
+
+    venues = load_venue_data(inp_path)
+    if not out_path:
+        out_path = os.path.join(os.path.dirname(os.path.abspath(inp_path)), TRAVEL_MATRIX_NAME)
+    routing = LocalRoutingStandIn() if use_routing else None
+    build_travel_matrix(venues.coordinates, out_path, routing=routing)
+
+    # record time taken
+    end = datetime.now()
+    logger.info('Process completed...')
+    logger.info('Time taken for the process: {}'.format(end - start))
+
+
+def plan(inp_path, start_date, end_date, no_of_adults, no_of_children, budget, hotel, max_distance, time_limit,
+         matrix_path):
+    """Plan the itinerary of one trip and print it out"""
+    start = datetime.now()
+
+    # load venues and build planner
+    venues = load_venue_data(inp_path)
+    travel_model = TravelTimeMatrix(matrix_path, venues.coordinates) if matrix_path else None
+    planner = Planner(venues, travel_model)
+
+    # build trip profile from user input
+    if hotel:
+        hotel = [float(i) for i in hotel.split(",")]
+    profile = TripProfile(start_date, end_date, no_of_adults, no_of_children, budget, hotel=hotel,
+                          max_distance=max_distance)
+
+    # plan and print itinerary
+    itinerary = planner.plan(profile, time_limit)
+    print(json.dumps(itinerary.to_dict(), indent=2))
+
+    # record time taken
+    end = datetime.now()
+    logger.info('Process completed...')
+    logger.info('Time taken for the process: {}'.format(end - start))
+
+
+def batch(inp_path, profiles_path, out_path, time_limit, matrix_path, workers):
+    """Plan the itineraries of all trip profiles in the profiles file and write them out"""
+    start = datetime.now()
+
+    # load venues, travel times and spatial index once for all profiles
+    venues = load_venue_data(inp_path)
+    travel_model = TravelTimeMatrix(matrix_path, venues.coordinates) if matrix_path else None
+    planner = Planner(venues, travel_model, max_workers=1)
+
+    ids, profiles = read_profiles(profiles_path)
+    logger.info('Planning {} profiles...'.format(len(profiles)))
+    visits, summary = plan_batch(planner, profiles, ids, time_limit, workers=workers)
+
+    # write results
+    if not out_path:
+        out_path = 'Itineraries_{}.parquet'.format(start.strftime('%Y%m%d_%H%M%S'))
+    root, ext = os.path.splitext(out_path)
+    logger.info('Visits written to {}...'.format(write_columns(visits, out_path)))
+    logger.info('Summary written to {}...'.format(write_columns(summary, '{}_summary{}'.format(root, ext))))
+
+    # record time taken
+    end = datetime.now()
+    logger.info('Process completed...')
+    logger.info('Time taken for the process: {}'.format(end - start))
+
+
+def benchmark(sizes, no_of_profiles, time_limit, seed, out_path):
+    """Benchmark the planner on synthetic cities and write results to a json file"""
+    start = datetime.now()
+
+    results = run_benchmark([int(i) for i in sizes.split(",")], no_of_profiles, time_limit, seed)
+    if not out_path:
+        out_path = 'Benchmark_{}.json'.format(start.strftime('%Y%m%d_%H%M%S'))
+    write_results(results, out_path)
+    logger.info('Results written to {}...'.format(out_path))
+
+    # record time taken
+    end = datetime.now()
+    logger.info('Process completed...')
+    logger.info('Time taken for the process: {}'.format(end - start))
+
+
+if __name__ == "__main__":
+    # setup argparser
+    parser = argparse.ArgumentParser(description='Planning engine for trip planner AI tool...')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='Plan the itinerary of one trip.')
+    plan_parser.add_argument('--inp', type=str, required=True,
+                             help='Path to the venue table (.pkl) written by the data wrangler.')
+    plan_parser.add_argument('--start', type=str, required=True, help='First day of the trip in YYYY-MM-DD format.')
+    plan_parser.add_argument('--end', type=str, required=True, help='Last day of the trip in YYYY-MM-DD format.')
+    plan_parser.add_argument('--adults', type=int, default=2, help='Number of adults. Default is 2.')
+    plan_parser.add_argument('--children', type=int, default=0, help='Number of children. Default is 0.')
+    plan_parser.add_argument('--budget', type=str, default='intermediate', choices=list(BUDGET_PRICE_LIMITS),
+                             help='Default is intermediate. User can choose from the list: low, intermediate and high.')
+    plan_parser.add_argument('--hotel', type=str, default=None,
+                             help='Latitude and longitude of the hotel, e.g. 1.2834,103.8607. '
+                                  'Default is the centre of the venues chosen.')
+    plan_parser.add_argument('--radius', type=float, default=None,
+                             help='Only visit venues within this distance (km) of the hotel. Default is no limit.')
+    plan_parser.add_argument('--time', type=float, default=TIME_LIMIT,
+                             help='Time limit of the planner in seconds. Default is {}.'.format(TIME_LIMIT))
+    plan_parser.add_argument('--matrix', type=str, default=None,
+                             help='Path to the travel time matrix (.npy) of the venues. '
+                                  'Default is to calculate travelling times on the fly.')
+
+    batch_parser = subparsers.add_parser('batch', help='Plan the itineraries of many trip profiles.')
+    batch_parser.add_argument('--inp', type=str, required=True,
+                              help='Path to the venue table (.pkl) written by the data wrangler.')
+    batch_parser.add_argument('--profiles', type=str, required=True,
+                              help='Path to the csv file of trip profiles, one profile per row.')
+    batch_parser.add_argument('--out', type=str, default=None,
+                              help='Path to write the visits to (.parquet or .npz). Summary of each profile is '
+                                   'written next to it. Default is Itineraries_<timestamp>.parquet.')
+    batch_parser.add_argument('--time', type=float, default=TIME_LIMIT,
+                              help='Time limit of the planner for each profile in seconds. Default is {}.'
+                              .format(TIME_LIMIT))
+    batch_parser.add_argument('--matrix', type=str, default=None,
+                              help='Path to the travel time matrix (.npy) of the venues. '
+                                   'Default is to calculate travelling times on the fly.')
+    batch_parser.add_argument('--workers', type=int, default=None,
+                              help='Number of worker processes. Default is one per core.')
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='Benchmark the planner on synthetic cities.')
+    benchmark_parser.add_argument('--sizes', type=str, default=",".join(str(i) for i in BENCHMARK_SIZES),
+                                  help='Number of venues of each synthetic city separated by commas. '
+                                       'Default is {}.'.format(",".join(str(i) for i in BENCHMARK_SIZES)))
+    benchmark_parser.add_argument('--profiles', type=int, default=BENCHMARK_PROFILES,
+                                  help='Number of profiles planned for each city. Default is {}.'
+                                  .format(BENCHMARK_PROFILES))
+    benchmark_parser.add_argument('--time', type=float, default=TIME_LIMIT,
+                                  help='Time limit of the planner in seconds. Default is {}.'.format(TIME_LIMIT))
+    benchmark_parser.add_argument('--seed', type=int, default=0, help='Seed of the random numbers. Default is 0.')
+    benchmark_parser.add_argument('--out', type=str, default=None,
+                                  help='Path to write the results (.json) to. Default is Benchmark_<timestamp>.json.')
+
+    matrix_parser = subparsers.add_parser('matrix', help='Build travel time matrix of the venues.')
+    matrix_parser.add_argument('--inp', type=str, required=True,
+                               help='Path to the venue table (.pkl) written by the data wrangler.')
+    matrix_parser.add_argument('--out', type=str, default=None,
+                               help='Path to write the matrix to. Default is {} next to the venue table.'
+                               .format(TRAVEL_MATRIX_NAME))
+    matrix_parser.add_argument('--routing', action='store_true',
+                               help='Use local routing stand-in (street grid distance) instead of straight line distance.')
+    args = parser.parse_args()
+
+    # log to file and console - only when run from the command line, not when the engine is imported
+    setup_logging()
+
+    # call main function
+    if args.command == 'plan':
+        plan(args.inp, args.start, args.end, args.adults, args.children, args.budget, args.hotel, args.radius,
+             args.time, args.matrix)
+    elif args.command == 'batch':
+        batch(args.inp, args.profiles, args.out, args.time, args.matrix, args.workers)
+    elif args.command == 'benchmark':
+        benchmark(args.sizes, args.profiles, args.time, args.seed, args.out)
+    elif args.command == 'matrix':
+        build_matrix(args.inp, args.out, args.routing)
@@ -0,0 +1,140 @@
+""" This module plans the itineraries of many trip profiles at once, e.g. to precompute popular itineraries
+
+    Venue data, travel time matrix and spatial index are loaded once in the main process. Worker processes
+    are forked from it so they share the same memory instead of loading their own copy (the travel time
+    matrix is memory-mapped and shared through the page cache in any case).
+
+    Results are written column by column: one row per visit (profile, day, order, venue, start, end) and
+    a summary with one row per profile.
+"""
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+from .profile import TripProfile
+from .constants import STYLES, TIME_LIMIT, BATCH_CHUNK_SIZE
+from .utils import logger
+
+# planner of the worker process - set when the worker starts
+_planner = None
+
+
+def read_profiles(path):
+    """Read trip profiles from a csv file with one profile per row
+
+       Columns: start, end (YYYY-MM-DD) and optionally id, adults, children, budget, hotel_latitude,
+       hotel_longitude, radius (km) and a weight column for any style (e.g. cultural, foodie).
+    """
+    df = pd.read_csv(path)
+
+    missing = [col for col in ['start', 'end'] if col not in df.columns]
+    if missing:
+        raise ValueError('Columns {} not found in profiles file {}...'.format(', '.join(missing), path))
+
+    if 'id' not in df.columns:
+        df['id'] = np.arange(len(df))
+
+    profiles = []
+    for _, row in df.iterrows():
+        def value(col, default=None):
+            return row[col] if col in row.index and pd.notna(row[col]) else default
+
+        hotel = None
+        if value('hotel_latitude') is not None and value('hotel_longitude') is not None:
+            hotel = (value('hotel_latitude'), value('hotel_longitude'))
+        preferences = {style: float(row[style]) for style in STYLES if value(style) is not None}
+
+        profiles.append(TripProfile(row['start'], row['end'], int(value('adults', 2)), int(value('children', 0)),
+                                    value('budget', 'intermediate'), preferences, hotel, value('radius')))
+
+    return df['id'].to_numpy(), profiles
+
+
+def _init_worker(planner):
+    """Keep planner of the main process in the worker - days are not planned on another process pool"""
+    global _planner
+    _planner = planner
+    _planner.max_workers = 1
+
+
+def _plan_profile(task):
+    """Plan one profile in a worker process and return its itinerary as arrays"""
+    i, profile, time_limit, seed = task
+    start = time.perf_counter()
+
+    problem = _planner.build_problem(profile)
+    routes = _planner.solve(problem, time_limit, seed)
+
+    days, orders, venues, starts, ends = [], [], [], [], []
+    for day, route in enumerate(routes):
+        visit_starts, _ = problem.schedule_day(day, route)
+        days.extend([day] * len(route))
+        orders.extend(range(len(route)))
+        venues.extend(problem.pool[route])
+        starts.extend(visit_starts)
+        ends.extend(np.add(visit_starts, problem.durations[route]))
+
+    return i, problem.total_score(routes), time.perf_counter() - start, \
+        np.array(days), np.array(orders), np.array(venues), np.array(starts), np.array(ends)
+
+
+def _concatenate(arrays, dtype):
+    """Join arrays of all profiles into one column - empty column if there are no profiles"""
+    return np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+
+
+def plan_batch(planner, profiles, ids=None, time_limit=TIME_LIMIT, seed=0, workers=None):
+    """Plan all profiles on all cores. Returns (visits, summary) as dictionaries of columns
+
+       ids are written in the profile column of the results, default is the position of the profile in the list.
+    """
+    ids = np.arange(len(profiles)) if ids is None else np.asarray(ids)
+    if ids.dtype == object:
+        ids = ids.astype(str)
+    workers = workers or os.cpu_count()
+    tasks = [(i, profile, time_limit, seed) for i, profile in enumerate(profiles)]
+
+    # fork workers so they share the planner of the main process, otherwise it is copied to each worker
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    # no workers are started for an empty batch - the columns are empty
+    results = [None] * len(profiles)
+    if tasks:
+        with context.Pool(workers, initializer=_init_worker, initargs=(planner,)) as pool:
+            for n, result in enumerate(pool.imap_unordered(_plan_profile, tasks, chunksize=BATCH_CHUNK_SIZE)):
+                results[result[0]] = result
+                if (n + 1) % 100 == 0:
+                    logger.info('{} of {} profiles planned...'.format(n + 1, len(profiles)))
+
+    counts = [len(x[3]) for x in results]
+    visits = {'profile': np.repeat(ids, counts),
+              'day': _concatenate([x[3] for x in results], np.int16),
+              'order': _concatenate([x[4] for x in results], np.int16),
+              'venue_id': _concatenate([x[5] for x in results], np.int32),
+              'start': _concatenate([np.round(x[6]) for x in results], np.int16),
+              'end': _concatenate([np.round(x[7]) for x in results], np.int16)}
+    summary = {'profile': ids,
+               'score': np.array([x[1] for x in results], dtype=np.float32),
+               'no_of_visits': np.array(counts, dtype=np.int16),
+               'plan_time': np.array([x[2] for x in results], dtype=np.float32)}
+
+    return visits, summary
+
+
+def write_columns(columns, path):
+    """Write dictionary of columns to a parquet file, or a compressed numpy file (.npz) if parquet is not
+       available or the path ends with .npz. Returns path written to.
+    """
+    if not path.endswith('.npz'):
+        try:
+            pd.DataFrame(columns).to_parquet(path, index=False)
+            return path
+        except ImportError:
+            path = '{}.npz'.format(os.path.splitext(path)[0])
+            logger.warning('pyarrow or fastparquet is not installed - writing {} instead...'.format(path))
+
+    np.savez_compressed(path, **columns)
+
+    return path
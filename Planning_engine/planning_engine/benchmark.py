@@ -0,0 +1,164 @@
+""" This module benchmarks the planner on synthetic cities so changes to the algorithm can be compared
+
+    A synthetic city has venues spread around a few hot spots with random durations, prices, opening
+    hours and style scores. Synthetic trip profiles are planned on cities of different sizes and the
+    latency, quality (score, visits) and memory of the planner are recorded. Some of the profiles are long
+    trips so the solver planning them day by day is benchmarked as well. Everything is generated from one
+    seed so the same benchmark can be run again after a change.
+"""
+import time
+import json
+import platform
+import tracemalloc
+from datetime import date, timedelta
+import numpy as np
+from .venues import VenueData
+from .profile import TripProfile
+from .planner import Planner
+from .hours import timeranges_to_bitmap, pack_hours
+from .constants import STYLES, BUDGET_PRICE_LIMITS, TIME_LIMIT, BENCHMARK_SIZES, BENCHMARK_PROFILES, \
+    BENCHMARK_CENTRE, BENCHMARK_LONG_TRIP_SHARE, DECOMPOSE_MIN_DAYS
+from .utils import logger
+
+# how peak memory is measured - written to the results so it is not read as the memory of the process pool
+PEAK_MEMORY_NOTE = 'tracemalloc peak of the main process only - memory of process pool workers planning the days ' \
+                   'of long trips is not included'
+
+# opening hours of the synthetic venues (open, close) in minutes for each day of the week
+HOURS_TEMPLATES = [
+    None,                                                       # hours unknown - open all day
+    [[(540, 1080)]] * 7,                                        # 09:00-18:00 every day
+    [[(600, 1320)]] * 6 + [[]],                                 # 10:00-22:00, closed on Sunday
+    [[(690, 840), (1020, 1320)]] * 7,                           # lunch and dinner
+    [[(1080, 1560)]] * 7,                                       # 18:00-02:00
+    [[]] + [[(570, 1050)]] * 6,                                 # 09:30-17:30, closed on Monday
+]
+
+
+def synthetic_city(n, rng, centre=BENCHMARK_CENTRE):
+    """Build venue data of a synthetic city with n venues"""
+    # venues spread around a few hot spots (within about 10 km of the centre)
+    no_of_spots = max(1, n // 500)
+    spots = np.array(centre) + rng.normal(scale=0.05, size=(no_of_spots, 2))
+    coordinates = spots[rng.integers(no_of_spots, size=n)] + rng.normal(scale=0.01, size=(n, 2))
+
+    durations = rng.choice([30, 60, 90, 120, 180], size=n).astype(float)
+    prices = np.where(rng.random(n) < 0.5, np.nan, rng.choice([15, 30, 40, 50], size=n))
+
+    # most venues have a few styles
+    styles = rng.random((n, len(STYLES))) * (rng.random((n, len(STYLES))) < 0.3)
+
+    templates = np.array([np.full((7, 12), 255, dtype=np.uint8) if x is None else pack_hours(timeranges_to_bitmap(x))
+                          for x in HOURS_TEMPLATES])
+    opening_hours = templates[rng.integers(len(templates), size=n)]
+
+    return VenueData(['venue_{}'.format(i) for i in range(n)], coordinates, durations, prices, styles, opening_hours,
+                     version='synthetic_{}'.format(n))
+
+
+def synthetic_profiles(k, rng, centre=BENCHMARK_CENTRE, long_share=BENCHMARK_LONG_TRIP_SHARE):
+    """Build k synthetic trip profiles of 1 to 7 days - the last long_share of them are long trips of
+       DECOMPOSE_MIN_DAYS to DECOMPOSE_MIN_DAYS + 7 days, planned day by day (see decompose module)
+    """
+    no_of_long = int(round(k * long_share))
+
+    profiles = []
+    for i in range(k):
+        start = date(2021, 5, 3) + timedelta(days=int(rng.integers(7)))
+        if i >= k - no_of_long:
+            end = start + timedelta(days=DECOMPOSE_MIN_DAYS - 1 + int(rng.integers(8)))
+        else:
+            end = start + timedelta(days=int(rng.integers(7)))
+        hotel = tuple(np.array(centre) + rng.normal(scale=0.02, size=2)) if rng.random() < 0.5 else None
+        preferences = {style: float(rng.choice([0.5, 1, 2])) for style in rng.choice(STYLES, 3, replace=False)}
+
+        profiles.append(TripProfile(start, end, int(rng.integers(1, 5)), int(rng.integers(0, 3)),
+                                    str(rng.choice(list(BUDGET_PRICE_LIMITS))), preferences, hotel))
+
+    return profiles
+
+
+def _venue_data_size(venues):
+    """Memory used by the arrays of the venue data in bytes"""
+    return sum(x.nbytes for x in vars(venues).values() if isinstance(x, np.ndarray))
+
+
+def _decomposed_summary(latencies, scores, visits_per_day, decomposed):
+    """Latency and quality of the long trips planned day by day, or None if there are none"""
+    decomposed = np.array(decomposed, dtype=bool)
+    if not decomposed.any():
+        return None
+
+    latencies = np.array(latencies)[decomposed]
+    return {'no_of_profiles': int(decomposed.sum()),
+            'latency': {'mean': float(np.mean(latencies)), 'max': float(np.max(latencies))},
+            'score': {'mean': float(np.mean(np.array(scores)[decomposed]))},
+            'visits_per_day': float(np.mean(np.array(visits_per_day)[decomposed]))}
+
+
+def run_benchmark(sizes=BENCHMARK_SIZES, no_of_profiles=BENCHMARK_PROFILES, time_limit=TIME_LIMIT, seed=0,
+                  max_workers=None):
+    """Plan synthetic profiles on synthetic cities of every size and return results as a dictionary"""
+    results = []
+
+    for n in sizes:
+        rng = np.random.default_rng([seed, n])
+
+        # (1) build city and planner
+        start = time.perf_counter()
+        venues = synthetic_city(n, rng)
+        planner = Planner(venues, max_workers=max_workers)
+        build_time = time.perf_counter() - start
+
+        # (2) plan every profile, recording time and quality
+        profiles = synthetic_profiles(no_of_profiles, rng)
+        latencies, scores, visits_per_day, peak_memory, decomposed = [], [], [], [], []
+        for i, profile in enumerate(profiles):
+            start = time.perf_counter()
+            problem = planner.build_problem(profile)
+            routes = planner.solve(problem, time_limit, seed + i)
+            latencies.append(time.perf_counter() - start)
+
+            scores.append(problem.total_score(routes))
+            visits_per_day.append(sum(len(route) for route in routes) / problem.no_of_days)
+            decomposed.append(problem.no_of_days >= DECOMPOSE_MIN_DAYS)
+
+        # (3) plan every profile again to record peak memory (of this process only, see PEAK_MEMORY_NOTE) -
+        # tracing memory slows python down, so it is not done while recording time
+        for i, profile in enumerate(profiles):
+            tracemalloc.start()
+            planner.solve(planner.build_problem(profile), time_limit, seed + i)
+            peak_memory.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        planner.close()
+
+        result = {'no_of_venues': n,
+                  'build_time': build_time,
+                  'venue_data_mb': _venue_data_size(venues) / 1e6,
+                  'latency': {'mean': float(np.mean(latencies)),
+                              'p50': float(np.percentile(latencies, 50)),
+                              'p90': float(np.percentile(latencies, 90)),
+                              'p99': float(np.percentile(latencies, 99)),
+                              'max': float(np.max(latencies))},
+                  'score': {'mean': float(np.mean(scores)), 'min': float(np.min(scores))},
+                  'visits_per_day': float(np.mean(visits_per_day)),
+                  'decomposed': _decomposed_summary(latencies, scores, visits_per_day, decomposed),
+                  'peak_memory_mb': {'mean': float(np.mean(peak_memory)) / 1e6,
+                                     'max': float(np.max(peak_memory)) / 1e6}}
+        results.append(result)
+
+        logger.info('{} venues: p50 {:.3f}s, p99 {:.3f}s, mean score {:.2f}, {:.1f} visits per day...'.format(
+            n, result['latency']['p50'], result['latency']['p99'], result['score']['mean'], result['visits_per_day']))
+
+    return {'config': {'sizes': list(sizes), 'no_of_profiles': no_of_profiles, 'time_limit': time_limit,
+                       'seed': seed, 'long_trip_share': BENCHMARK_LONG_TRIP_SHARE,
+                       'decompose_min_days': DECOMPOSE_MIN_DAYS, 'peak_memory': PEAK_MEMORY_NOTE,
+                       'python': platform.python_version(), 'numpy': np.__version__,
+                       'machine': platform.machine(), 'processor': platform.processor()},
+            'results': results}
+
+
+def write_results(results, path):
+    """Write benchmark results to a json file"""
+    with open(path, 'w') as file_handle:
+        json.dump(results, file_handle, indent=2)
@@ -0,0 +1,73 @@
+""" This module stores all the constants/parameters that are used in the planning engine
+"""
+# ---------- Venue data --------------
+DAYS_IN_A_WEEK = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# styles used to score the venues - nlp and word finder labels are mapped to one name
+STYLES = ['cultural', 'adventure', 'relax', 'foodie', 'nightlife', 'shopping', 'romantic', 'nature', 'family']
+STYLE_ALIASES = {'adventurous': 'adventure', 'relaxing': 'relax'}
+STYLE_PREFIXES = ['nlp_score_', 'wordfinder_score_']
+
+# duration (hours) used if the venue does not have a suggested duration
+DEFAULT_DURATION = 1.5
+
+# opening hours are encoded as a bitmap of time slots for each day of the week
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# ---------- User profile --------------
+# day starts and ends at these times (24 hour system)
+DAY_START = '09:00'
+DAY_END = '21:00'
+
+# maximum price value of a venue for each budget (None means no limit)
+BUDGET_PRICE_LIMITS = {'low': 15, 'intermediate': 40, 'high': None}
+
+# ---------- Planner --------------
+# size of grid cells (km) of the spatial index and maximum number of cells in the grid
+SPATIAL_CELL_SIZE = 0.5
+SPATIAL_MAX_CELLS = 1000000
+
+# travelling speed (km/h) for trips up to each distance (km) - walk short trips, ride longer ones
+# and fixed time (minutes) added to every trip
+TRAVEL_SPEED_BANDS = [(1.0, 5.0), (None, 20.0)]
+TRAVEL_OVERHEAD = 10.0
+
+# travel time matrix file and number of rows calculated at a time when building it
+TRAVEL_MATRIX_NAME = 'TravelTimes.npy'
+MATRIX_BLOCK_SIZE = 2048
+
+# score given to every venue so venues without style scores can still be visited
+BASE_SCORE = 0.1
+
+# number of best scoring venues per trip day considered by the planner
+POOL_SIZE_PER_DAY = 60
+
+# time limit (seconds) and maximum number of iterations without improvement for the local search
+TIME_LIMIT = 0.3
+MAX_NO_IMPROVEMENT = 50
+
+# long trips (at least this many days) are planned day by day: venues are clustered with k-means and
+# each day gets a share of the time limit, then visits are moved between days until REFINE_TIME_SHARE of the
+# time limit is used. Shorter trips plan as well or better as one problem within the time limit
+DECOMPOSE_MIN_DAYS = 21
+KMEANS_ITERATIONS = 20
+DAY_TIME_SHARE = 0.5
+REFINE_TIME_SHARE = 0.7
+
+# number of opening masks (venues open during the days of the week of a trip) kept by the planner
+OPEN_MASK_CACHE_SIZE = 256
+
+# number of profiles sent to a worker process at a time when planning profiles in batch
+BATCH_CHUNK_SIZE = 8
+
+# benchmark: number of venues of the synthetic cities, number of profiles planned for each city,
+# latitude and longitude of the city centre and share of the profiles that are long trips (planned day by day)
+BENCHMARK_SIZES = [100, 1000, 10000, 50000]
+BENCHMARK_PROFILES = 20
+BENCHMARK_CENTRE = (1.29, 103.85)
+BENCHMARK_LONG_TRIP_SHARE = 0.2
+
+# anytime planning: deadline (seconds) of the first itinerary and time limit (seconds) to keep improving it
+FIRST_PLAN_DEADLINE = 0.1
+ANYTIME_TIME_LIMIT = 5.0
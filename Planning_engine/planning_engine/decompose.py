@@ -0,0 +1,177 @@
+""" This module plans long trips day by day
+
+    Planning all days of a long trip as one problem gets slow as every insertion is checked against every
+    day and every venue of the pool. Instead:
+    (1) venues of the pool are clustered by location (k-means), one cluster per day, and clusters are
+        matched to the days they can be visited on
+    (2) every day is planned on its own with the venues of its cluster, in parallel on a process pool
+    (3) visits are moved or swapped between days as long as it cuts travelling time, and the time saved
+        is filled with venues of any cluster
+    (4) the whole plan is improved with local search in the time left
+
+    Planning time grows roughly linearly with the number of days.
+"""
+import time
+import itertools
+import numpy as np
+from .constants import KMEANS_ITERATIONS, DAY_TIME_SHARE, REFINE_TIME_SHARE, SLOT_MINUTES
+from .planner import solve, greedy_insertion, two_opt, local_search
+from .spatial import KM_PER_DEGREE
+from .utils import logger
+
+
+def kmeans(points, k, rng, iterations=KMEANS_ITERATIONS):
+    """Cluster points (n, 2) into k clusters with k-means (k-means++ start). Returns cluster of each point"""
+    # (1) k-means++ - pick centres far away from the centres picked so far
+    centres = [points[rng.integers(len(points))]]
+    distances = ((points - centres[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        probabilities = distances / distances.sum() if distances.sum() > 0 else None
+        centres.append(points[rng.choice(len(points), p=probabilities)])
+        distances = np.minimum(distances, ((points - centres[-1]) ** 2).sum(axis=1))
+    centres = np.array(centres)
+
+    # (2) move centres to the middle of their points until nothing changes
+    labels = None
+    for _ in range(iterations):
+        new_labels = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for c in range(k):
+            if (labels == c).any():
+                centres[c] = points[labels == c].mean(axis=0)
+
+    return labels
+
+
+def match_clusters_to_days(problem, labels, k):
+    """Give every day the cluster with the highest total score of venues that can be visited on that day"""
+    # venues that can be visited some time during the day
+    first_slot = -(-problem.day_start // SLOT_MINUTES)
+    can_visit = problem.hours.next_start[:, :, first_slot] + problem.durations[None, :] <= problem.day_end
+
+    value = np.zeros((k, problem.no_of_days))
+    for c in range(k):
+        value[c] = (can_visit[:, labels == c] * problem.scores[labels == c]).sum(axis=1)
+
+    # best pairs first
+    cluster_of_day = {}
+    used = set()
+    for c, day in zip(*np.unravel_index(np.argsort(-value, axis=None), value.shape)):
+        if c not in used and day not in cluster_of_day:
+            cluster_of_day[day] = c
+            used.add(c)
+
+    return [cluster_of_day.get(day) for day in range(problem.no_of_days)]
+
+
+def _solve_day(problem, time_limit, seed):
+    """Plan the only day of the subproblem - run in worker processes"""
+    return solve(problem, time_limit, seed)[0]
+
+
+def _insert(problem, day, route, venue):
+    """Insert the venue at its cheapest position in the route. Returns new route or None if it does not fit"""
+    only = np.zeros(len(problem.pool), dtype=bool)
+    only[venue] = True
+
+    ratio, _, pos = problem.best_insertion(day, route, only)
+    if ratio == -np.inf:
+        return None
+
+    return route[:pos] + [venue] + route[pos:]
+
+
+def cross_day_refine(problem, routes, deadline):
+    """Move visits to another day or swap visits of two days as long as it cuts the total time of the days"""
+    ends = [problem.schedule_day(day, route)[1] for day, route in enumerate(routes)]
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        for a, b in itertools.permutations(range(problem.no_of_days), 2):
+            for v in routes[a]:
+                route_a = [x for x in routes[a] if x != v]
+
+                # (1) move v from day a to day b
+                candidates = [(route_a, _insert(problem, b, routes[b], v))]
+
+                # (2) swap v with a visit u of day b
+                for u in routes[b]:
+                    new_a = _insert(problem, a, route_a, u)
+                    if new_a is not None:
+                        candidates.append((new_a, _insert(problem, b, [x for x in routes[b] if x != u], v)))
+
+                for new_a, new_b in candidates:
+                    if new_b is None:
+                        continue
+                    end_a, end_b = problem.schedule_day(a, new_a)[1], problem.schedule_day(b, new_b)[1]
+                    if end_a + end_b < ends[a] + ends[b] - 1e-6:
+                        routes[a], routes[b], ends[a], ends[b] = new_a, new_b, end_a, end_b
+                        improved = True
+                        break
+
+                if improved or time.perf_counter() >= deadline:
+                    break
+            if improved or time.perf_counter() >= deadline:
+                break
+
+    return routes
+
+
+def solve_decomposed(problem, time_limit, seed=0, executor=None, workers=1):
+    """Plan the routes of every day one day at a time (see module description)
+
+       Days are planned on the executor (e.g. process pool with the number of workers given) if given, otherwise
+       one after another. DAY_TIME_SHARE of the time limit is shared between the rounds of days the workers need
+       to plan, and every step stops at the time limit.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    routes = [[] for _ in range(problem.no_of_days)]
+    if len(problem.pool) == 0:
+        return routes
+
+    # (1) cluster venues by location - km on the ground, not degrees
+    cos_lat = np.cos(np.radians(problem.coordinates[:, 0].mean()))
+    points = problem.coordinates * [KM_PER_DEGREE, KM_PER_DEGREE * cos_lat]
+    k = min(problem.no_of_days, len(points))
+    labels = kmeans(points, k, np.random.default_rng(seed))
+    cluster_of_day = match_clusters_to_days(problem, labels, k)
+
+    # (2) plan every day with its own cluster
+    days = [day for day in range(problem.no_of_days) if cluster_of_day[day] is not None]
+    indices = [np.flatnonzero(labels == cluster_of_day[day]) for day in days]
+    subproblems = [problem.subproblem([day], x) for day, x in zip(days, indices)]
+    days_deadline = start + time_limit * DAY_TIME_SHARE
+    seeds = [seed + day for day in days]
+
+    if executor is not None:
+        rounds = -(-len(days) // workers)
+        day_time_limit = max(days_deadline - time.perf_counter(), 0) / rounds
+        day_routes = executor.map(_solve_day, subproblems, [day_time_limit] * len(days), seeds)
+    else:
+        # one day after another, sharing the time left between the days left - days not planned when the time
+        # runs out are filled by the greedy insertion below
+        day_routes = []
+        for i, subproblem in enumerate(subproblems):
+            time_left = days_deadline - time.perf_counter()
+            day_routes.append(_solve_day(subproblem, time_left / (len(days) - i), seeds[i]) if time_left > 0 else [])
+
+    for day, x, route in zip(days, indices, day_routes):
+        routes[day] = [int(i) for i in x[route]]
+    logger.info('Planned {} days separately in {:.3f}s...'.format(len(days), time.perf_counter() - start))
+
+    # (3) fill days with venues of other clusters, move visits between days and fill the time saved
+    available = np.ones(len(problem.pool), dtype=bool)
+    for route in routes:
+        available[route] = False
+    routes = greedy_insertion(problem, routes, available, deadline=deadline)
+    routes = cross_day_refine(problem, routes, start + time_limit * REFINE_TIME_SHARE)
+    routes = [two_opt(problem, day, route, deadline) for day, route in enumerate(routes)]
+    routes = greedy_insertion(problem, routes, available, deadline=deadline)
+
+    # (4) improve the whole plan with the time left
+    return local_search(problem, routes, deadline, np.random.default_rng(seed))
@@ -0,0 +1,120 @@
+""" This module works out when venues can be visited from their opening hours
+
+    Opening hours are stored as a bitmap of 15 minute slots for each day of the week (7 x 96 bits, packed
+    into 7 x 12 bytes per venue). A slot is set if the venue is open for the whole slot. The data wrangler
+    writes the bitmap so the opening hour strings never need to be parsed again.
+
+    For the venues of a planning problem, the bitmap is turned into lookup tables so that checking whether
+    a visit fits and finding the next time it fits are array lookups that work on all venues at once.
+"""
+import numpy as np
+from .constants import SLOT_MINUTES, SLOTS_PER_DAY
+
+
+def timeranges_to_bitmap(week):
+    """Convert (open, close) time ranges in minutes of each day of the week to a (7, SLOTS_PER_DAY) bitmap
+
+       Closing times past midnight (over 24:00) continue on the next day.
+    """
+    bitmap = np.zeros(7 * SLOTS_PER_DAY, dtype=bool)
+
+    for day, timeranges in enumerate(week):
+        for open_time, close_time in timeranges:
+            # only slots fully within the time range
+            first_slot = -(-open_time // SLOT_MINUTES)
+            last_slot = close_time // SLOT_MINUTES
+            bitmap[(day * SLOTS_PER_DAY + np.arange(first_slot, last_slot)) % len(bitmap)] = True
+
+    return bitmap.reshape(7, SLOTS_PER_DAY)
+
+
+def pack_hours(bitmap):
+    """Pack bitmap (..., SLOTS_PER_DAY) of bools into bytes (..., SLOTS_PER_DAY // 8)"""
+    return np.packbits(bitmap, axis=-1)
+
+
+def unpack_hours(packed):
+    """Unpack bytes (..., SLOTS_PER_DAY // 8) to bitmap (..., SLOTS_PER_DAY) of bools"""
+    return np.unpackbits(packed, axis=-1).astype(bool)
+
+
+def fits(bitmap, durations):
+    """Check whether a visit starting at the beginning of each slot fits in the opening hours
+
+       bitmap: (..., n, slots) open slots of n venues, durations: (n,) in minutes.
+       Returns (..., n, slots + 1) booleans. A visit starting at the end of the last slot never fits.
+    """
+    slots = bitmap.shape[-1]
+    needed = np.ceil(np.asarray(durations) / SLOT_MINUTES).astype(np.int64)
+
+    # open slots counted from the first slot - a visit fits if all the slots needed are open
+    counts = np.zeros(bitmap.shape[:-1] + (slots + 1,), dtype=np.int16)
+    np.cumsum(bitmap, axis=-1, out=counts[..., 1:])
+
+    ends = np.arange(slots + 1) + needed[:, None]
+    ends = np.broadcast_to(np.minimum(ends, slots), counts.shape)
+
+    return (np.take_along_axis(counts, ends, axis=-1) - counts == needed[:, None]) & \
+        (np.arange(slots + 1) + needed[:, None] <= slots)
+
+
+class OpeningHours:
+    def __init__(self, bitmap, durations):
+        """Lookup tables of the opening hours of the venues of a planning problem
+
+           bitmap: (days, n, SLOTS_PER_DAY) open slots of n venues for each day of the trip
+           durations: (n,) time to spend at each venue in minutes
+        """
+        self.durations = np.asarray(durations, dtype=np.float64)
+        days, n, slots = bitmap.shape
+        slot_ids = np.arange(slots + 1)
+
+        # open slots counted from the first slot of the day
+        self.counts = np.zeros((days, n, slots + 1), dtype=np.int16)
+        np.cumsum(bitmap, axis=-1, out=self.counts[..., 1:])
+
+        # earliest time at or after each slot that a visit fits in the opening hours (inf if it does not)
+        first_fit = np.where(fits(bitmap, self.durations), slot_ids, slots + 1)
+        first_fit = np.minimum.accumulate(first_fit[..., ::-1], axis=-1)[..., ::-1]
+        self.next_start = np.where(first_fit <= slots, first_fit * SLOT_MINUTES, np.inf)
+
+        # time the venue closes after each slot
+        first_closed = np.where(bitmap, slots, slot_ids[:-1])
+        first_closed = np.minimum.accumulate(first_closed[..., ::-1], axis=-1)[..., ::-1]
+        self.closing = np.concatenate([first_closed, np.full((days, n, 1), slots)], axis=-1) * SLOT_MINUTES
+
+    def subset(self, days, venues):
+        """Lookup tables of some days and venues only"""
+        hours = object.__new__(OpeningHours)
+        days, venues = np.asarray(days)[:, None], np.asarray(venues)[None, :]
+        hours.durations = self.durations[venues[0]]
+        hours.counts = self.counts[days, venues]
+        hours.next_start = self.next_start[days, venues]
+        hours.closing = self.closing[days, venues]
+
+        return hours
+
+    def earliest_start(self, day, venues, arrival):
+        """Earliest time the visit of the venues can start after arriving (inf if it does not fit anymore that day)
+
+           venues and arrival are arrays of the same shape (or broadcastable) - every venue is checked at once.
+        """
+        arrival = np.asarray(arrival, dtype=np.float64)
+        slots = self.counts.shape[-1] - 1
+        end = arrival + self.durations[venues]
+
+        # start straight away if every slot from arrival until the end of the visit is open
+        first_slot = np.clip(np.floor(arrival / SLOT_MINUTES).astype(np.int64), 0, slots)
+        last_slot = np.clip(np.ceil(end / SLOT_MINUTES).astype(np.int64), 0, slots)
+        open_now = (self.counts[day, venues, last_slot] - self.counts[day, venues, first_slot] ==
+                    last_slot - first_slot) & (end <= slots * SLOT_MINUTES)
+
+        # otherwise wait for the next slot the visit fits
+        next_slot = np.clip(np.ceil(arrival / SLOT_MINUTES).astype(np.int64), 0, slots)
+
+        return np.where(open_now, arrival, self.next_start[day, venues, next_slot])[()]
+
+    def latest_start(self, day, venue, start):
+        """Latest time the visit of the venue starting at start can be pushed back to before the venue closes"""
+        slot = min(int(start // SLOT_MINUTES), self.closing.shape[-1] - 1)
+        return self.closing[day, venue, slot] - self.durations[venue]
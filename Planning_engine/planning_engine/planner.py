@@ -0,0 +1,490 @@
+""" This module plans the itinerary of a trip based on the trip profile of the user
+
+    Planning is a multi-day orienteering problem with time windows. Every day starts and ends at
+    the hotel, every venue has a score, a duration and opening hours, and the aim is to visit the
+    venues with the highest total score without running past the end of the day.
+
+    The problem is solved heuristically:
+    (1) greedy insertion - keep inserting the venue with the best score to extra time ratio at its
+        cheapest feasible position in any day until nothing fits anymore
+    (2) local search - 2-opt each day to cut travelling time, then perturb the plan by removing a few
+        visits and inserting greedily again, keeping the best plan found within the time limit
+
+    Venues are only considered from a pool of the best scoring venues, and the cost of inserting every
+    venue of the pool at every position of a day is calculated in one go with numpy arrays.
+"""
+import os
+import time
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .constants import POOL_SIZE_PER_DAY, TIME_LIMIT, MAX_NO_IMPROVEMENT, FIRST_PLAN_DEADLINE, ANYTIME_TIME_LIMIT, \
+    DECOMPOSE_MIN_DAYS, OPEN_MASK_CACHE_SIZE
+from .travel import HaversineTravelModel
+from .spatial import SpatialIndex
+from .scoring import score_venues, budget_mask, opening_mask, top_k
+from .hours import OpeningHours, unpack_hours
+from .utils import minutes_to_str, logger
+
+
+class PlanningProblem:
+    def __init__(self, venues, profile, travel_model, pool_size_per_day=POOL_SIZE_PER_DAY, spatial_index=None,
+                 open_mask=None):
+        """Build the planning problem of a trip profile
+
+           Venues are indexed locally from 0 to len(pool) - 1 and the hotel is the last node of the
+           travelling time matrix. spatial_index is needed if the profile limits the distance from the hotel.
+           open_mask (venues open during the trip, see scoring.opening_mask) is worked out if not given.
+        """
+        self.dates = profile.get_dates()
+        weekdays = profile.get_weekdays()
+        self.no_of_days = len(self.dates)
+        self.day_start = profile.day_start
+        self.day_end = profile.day_end
+
+        # (1) score every venue based on the preferences of the user
+        scores = score_venues(venues.styles, profile.get_preference_vector())
+
+        # (2) remove venues over budget or closed during the trip
+        mask = budget_mask(venues.prices, profile.get_price_limit())
+        if open_mask is None:
+            open_mask = opening_mask(venues.opening_hours, venues.durations, weekdays, self.day_start, self.day_end)
+        mask &= open_mask
+
+        # remove venues too far from the hotel
+        if profile.hotel is not None and profile.max_distance is not None:
+            if spatial_index is None:
+                spatial_index = SpatialIndex(venues.coordinates)
+            nearby = np.zeros(len(venues), dtype=bool)
+            nearby[spatial_index.within_radius(profile.hotel, profile.max_distance)[0]] = True
+            mask &= nearby
+
+        # (3) only keep the best scoring venues
+        self.pool = top_k(scores, mask, pool_size_per_day * self.no_of_days)
+
+        self.scores = scores[self.pool]
+        self.durations = venues.durations[self.pool]
+        self.coordinates = venues.coordinates[self.pool]
+        self.hours = OpeningHours(unpack_hours(venues.opening_hours[self.pool][:, weekdays]).transpose(1, 0, 2),
+                                  self.durations)
+
+        # (4) start each day from the hotel - if not known, start from the centre of the venues
+        if profile.hotel is not None:
+            self.hotel_coordinates = np.array(profile.hotel)
+        elif len(self.pool):
+            self.hotel_coordinates = np.average(venues.coordinates[self.pool], axis=0, weights=self.scores)
+        else:
+            self.hotel_coordinates = np.average(venues.coordinates, axis=0)
+        if profile.hotel is None:
+            logger.info('Hotel location unknown - days start from the centre of the venues at {}...'.format(
+                np.round(self.hotel_coordinates, 5).tolist()))
+
+        self.travel_times = travel_model.submatrix(self.pool, self.hotel_coordinates[None, :])
+        self.hotel = len(self.pool)
+
+    def subproblem(self, days, indices):
+        """Planning problem of some days of the trip with only some venues of the pool (local indices)
+
+           Routes of the subproblem use indices into the list of venues given, i.e. venue i of the subproblem
+           is venue indices[i] of this problem.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        nodes = np.append(indices, self.hotel)
+
+        problem = object.__new__(PlanningProblem)
+        problem.__dict__.update(self.__dict__)
+        problem.dates = [self.dates[day] for day in days]
+        problem.no_of_days = len(days)
+        problem.pool = self.pool[indices]
+        problem.scores = self.scores[indices]
+        problem.durations = self.durations[indices]
+        problem.coordinates = self.coordinates[indices]
+        problem.hours = self.hours.subset(days, indices)
+        problem.travel_times = self.travel_times[np.ix_(nodes, nodes)]
+        problem.hotel = len(indices)
+
+        return problem
+
+    def schedule_day(self, day, route):
+        """Work out the start time of every visit of the route and the time back at the hotel
+
+           Returns (list of start times, time back at hotel) or None if the route is not feasible.
+        """
+        t = self.day_start
+        prev = self.hotel
+        starts = []
+
+        for v in route:
+            start = self.hours.earliest_start(day, v, t + self.travel_times[prev, v])
+            if start == np.inf:
+                return None
+            starts.append(start)
+            t = start + self.durations[v]
+            prev = v
+
+        end = t + self.travel_times[prev, self.hotel]
+        if end > self.day_end:
+            return None
+
+        return starts, end
+
+    def _route_times(self, day, route):
+        """Work out times of the route needed to check insertions
+
+           For every gap between two nodes of the route (hotel, visits, hotel), returns the nodes before
+           and after the gap, time leaving the node before the gap, and how much later the node after the
+           gap can be reached without making the route infeasible (waiting time + maximum shift).
+        """
+        nodes = [self.hotel] + list(route) + [self.hotel]
+        m = len(route)
+
+        depart = np.empty(m + 1)
+        arrival = np.empty(m + 1)
+        start = np.empty(m + 1)
+
+        depart[0] = self.day_start
+        for i in range(m + 1):
+            arrival[i] = depart[i] + self.travel_times[nodes[i], nodes[i + 1]]
+            if i < m:
+                v = nodes[i + 1]
+                start[i] = self.hours.earliest_start(day, v, arrival[i])
+                depart[i + 1] = start[i] + self.durations[v]
+            else:
+                start[i] = arrival[i]
+
+        # maximum shift of each node going backwards from the hotel
+        max_shift = np.empty(m + 1)
+        max_shift[m] = self.day_end - arrival[m]
+        for i in range(m - 1, -1, -1):
+            v = nodes[i + 1]
+            max_shift[i] = min(self.hours.latest_start(day, v, start[i]) - start[i],
+                               start[i + 1] - arrival[i + 1] + max_shift[i + 1])
+
+        return np.array(nodes[:-1]), np.array(nodes[1:]), depart, start - arrival + max_shift
+
+    def best_insertion(self, day, route, available):
+        """Find the venue and position with the best score to extra time ratio that can be inserted in the day
+
+           Returns (ratio, venue, position). Ratio is -inf if nothing can be inserted.
+        """
+        n = len(self.pool)
+        if n == 0:
+            return -np.inf, None, None
+
+        before, after, depart, slack = self._route_times(day, route)
+
+        # travelling time from the node before the gap, to the node after the gap and without the venue
+        time_from = self.travel_times[before, :n]
+        time_to = self.travel_times[after, :n]
+        time_gap = self.travel_times[before, after]
+
+        start = self.hours.earliest_start(day, np.arange(n)[None, :], depart[:, None] + time_from)
+        end = start + self.durations[None, :]
+        shift = end - depart[:, None] + time_to - time_gap[:, None]
+
+        feasible = (start < np.inf) & (shift <= slack[:, None]) & available[None, :]
+        ratio = np.where(feasible, self.scores[None, :] ** 2 / np.maximum(shift, 1e-6), -np.inf)
+
+        pos, venue = np.unravel_index(np.argmax(ratio), ratio.shape)
+
+        return ratio[pos, venue], venue, pos
+
+    def total_score(self, routes):
+        """Total score of the venues visited"""
+        return float(sum(self.scores[v] for route in routes for v in route))
+
+    def total_time(self, routes):
+        """Total time of all days from leaving the hotel until coming back"""
+        return float(sum(self.schedule_day(day, route)[1] - self.day_start for day, route in enumerate(routes)))
+
+
+def greedy_insertion(problem, routes, available, days=None, deadline=None):
+    """Keep inserting the venue with the best score to extra time ratio until nothing fits anymore
+
+       routes and available (boolean array of venues not visited yet) are updated in place. If a deadline
+       (time.perf_counter) is given, stops inserting once it has passed.
+    """
+    if deadline is not None and time.perf_counter() >= deadline:
+        return routes
+
+    days = range(problem.no_of_days) if days is None else days
+    best = {day: problem.best_insertion(day, routes[day], available) for day in days}
+
+    while best and (deadline is None or time.perf_counter() < deadline):
+        day = max(best, key=lambda x: best[x][0])
+        ratio, venue, pos = best[day]
+        if ratio == -np.inf:
+            break
+
+        routes[day].insert(pos, venue)
+        available[venue] = False
+
+        # only days affected by the insertion need to be worked out again
+        for x in best:
+            if x == day or best[x][1] == venue:
+                best[x] = problem.best_insertion(x, routes[x], available)
+
+    return routes
+
+
+def two_opt(problem, day, route, deadline=None):
+    """Reverse parts of the route as long as it brings the user back to the hotel earlier
+
+       If a deadline (time.perf_counter) is given, stops once it has passed.
+    """
+    best_end = problem.schedule_day(day, route)[1]
+
+    improved = True
+    while improved and (deadline is None or time.perf_counter() < deadline):
+        improved = False
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                new_route = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                schedule = problem.schedule_day(day, new_route)
+                if schedule and schedule[1] < best_end - 1e-6:
+                    route, best_end, improved = new_route, schedule[1], True
+                    break
+            if improved:
+                break
+
+    return route
+
+
+def _perturb(problem, routes, rng):
+    """Remove a few consecutive visits from every day"""
+    new_routes = []
+    for route in routes:
+        if route:
+            length = rng.integers(1, max(2, len(route) // 2 + 1))
+            pos = rng.integers(0, len(route))
+            route = route[:pos] + route[pos + length:]
+        new_routes.append(list(route))
+
+    return new_routes
+
+
+def local_search(problem, routes, deadline, rng, max_no_improvement=MAX_NO_IMPROVEMENT, callback=None):
+    """Improve the plan until the deadline or until no improvement is found for a number of iterations
+
+       callback(routes, score) is called every time a better plan is found.
+    """
+    best_routes = [list(route) for route in routes]
+    best_key = (problem.total_score(best_routes), -problem.total_time(best_routes))
+    no_improvement = 0
+
+    while time.perf_counter() < deadline and no_improvement < max_no_improvement:
+        # perturb the best plan, shorten every day and fill up the time saved
+        new_routes = _perturb(problem, best_routes, rng)
+        new_routes = [two_opt(problem, day, route, deadline) for day, route in enumerate(new_routes)]
+
+        available = np.ones(len(problem.pool), dtype=bool)
+        for route in new_routes:
+            available[route] = False
+        new_routes = greedy_insertion(problem, new_routes, available, deadline=deadline)
+
+        new_key = (problem.total_score(new_routes), -problem.total_time(new_routes))
+        if new_key > best_key:
+            best_routes, best_key = new_routes, new_key
+            no_improvement = 0
+            if callback:
+                callback(best_routes, best_key[0])
+        else:
+            no_improvement += 1
+
+    return best_routes
+
+
+def solve(problem, time_limit=TIME_LIMIT, seed=0, callback=None, routes=None):
+    """Plan the routes of every day: greedy insertion followed by local search
+
+       Every step stops at the deadline, so the plan returned may not be complete if the time limit is very short.
+       routes is an optional plan to start from, e.g. a plan cut short by a deadline.
+    """
+    deadline = time.perf_counter() + time_limit
+    rng = np.random.default_rng(seed)
+
+    routes = [[] for _ in range(problem.no_of_days)] if routes is None else [list(route) for route in routes]
+    available = np.ones(len(problem.pool), dtype=bool)
+    for route in routes:
+        available[route] = False
+    routes = greedy_insertion(problem, routes, available, deadline=deadline)
+    routes = [two_opt(problem, day, route, deadline) for day, route in enumerate(routes)]
+
+    if callback:
+        callback(routes, problem.total_score(routes))
+
+    return local_search(problem, routes, deadline, rng, callback=callback)
+
+
+class Itinerary:
+    def __init__(self, problem, routes, venues):
+        """Itinerary planned for the trip - one list of visits for each day"""
+        self.score = problem.total_score(routes)
+        self.days = []
+
+        for day, route in enumerate(routes):
+            starts, end = problem.schedule_day(day, route)
+            visits = []
+            for v, start in zip(route, starts):
+                visits.append({'name': venues.names[problem.pool[v]],
+                               'venue_id': int(problem.pool[v]),
+                               'start': minutes_to_str(start),
+                               'end': minutes_to_str(start + problem.durations[v]),
+                               'score': float(problem.scores[v])})
+
+            self.days.append({'date': problem.dates[day].strftime('%Y-%m-%d'),
+                              'visits': visits,
+                              'back_to_hotel': minutes_to_str(end)})
+
+    def to_dict(self):
+        """Return itinerary as a dictionary"""
+        return {'score': self.score, 'days': self.days}
+
+
+class AnytimePlan:
+    def __init__(self, problem, venues, first_deadline=FIRST_PLAN_DEADLINE, time_limit=ANYTIME_TIME_LIMIT, seed=0,
+                 callback=None, start=None):
+        """Plan the itinerary of the problem in the background
+
+           A first itinerary (greedy, may not be complete) is ready within first_deadline (seconds) and is then
+           improved in a background thread until time_limit (seconds) runs out. Both are counted from start
+           (time.perf_counter(), now if not given). The itinerary so far can be read at any time with get().
+           callback(itinerary, done) is called every time the itinerary is improved and once more when planning
+           is done.
+        """
+        start = time.perf_counter() if start is None else start
+        self.problem = problem
+        self.venues = venues
+        self.callback = callback
+        self.version = 0
+        self.done = False
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+        # (1) first itinerary within the deadline
+        routes = [[] for _ in range(problem.no_of_days)]
+        routes = greedy_insertion(problem, routes, np.ones(len(problem.pool), dtype=bool),
+                                  deadline=start + first_deadline)
+        self.itinerary = Itinerary(problem, routes, venues)
+        self.version = 1
+
+        # (2) keep improving it in the background
+        self._thread = threading.Thread(target=self._improve, args=(routes, start + time_limit, seed), daemon=True)
+        self._thread.start()
+
+    def _update(self, routes, score=None):
+        """Store better itinerary found"""
+        itinerary = Itinerary(self.problem, routes, self.venues)
+        with self._lock:
+            self.itinerary = itinerary
+            self.version += 1
+        if self.callback:
+            self.callback(itinerary, False)
+
+    def _improve(self, routes, deadline, seed):
+        """Finish greedy insertion and improve the plan with local search until the deadline"""
+        try:
+            solve(self.problem, max(deadline - time.perf_counter(), 0), seed, self._update, routes)
+        except Exception:
+            logger.exception('Planning stopped early because of an error...')
+        finally:
+            with self._lock:
+                self.done = True
+            logger.info('Anytime planning done after {} improvements with score {:.2f}...'.format(
+                self.version - 1, self.itinerary.score))
+            if self.callback:
+                self.callback(self.itinerary, True)
+            self._finished.set()
+
+    def get(self):
+        """Return (itinerary so far, version, done)"""
+        with self._lock:
+            return self.itinerary, self.version, self.done
+
+    def wait(self, timeout=None):
+        """Wait until planning is done or timeout (seconds) and return (itinerary so far, version, done)"""
+        self._finished.wait(timeout)
+        return self.get()
+
+
+class Planner:
+    def __init__(self, venues, travel_model=None, pool_size_per_day=POOL_SIZE_PER_DAY, max_workers=None):
+        """Build planner for the venue data. Travelling times use the haversine model if no model is provided
+
+           Days of long trips are planned in parallel on a pool of max_workers processes (None means one per core,
+           1 means no process pool).
+        """
+        self.venues = venues
+        self.travel_model = travel_model or HaversineTravelModel(venues.coordinates)
+        self.pool_size_per_day = pool_size_per_day
+        self.spatial_index = SpatialIndex(venues.coordinates)
+        self.max_workers = max_workers
+        self._executor = None
+
+        # venues open during trips, by days of the week visited and day start/end - profiles repeat them
+        self._open_masks = {}
+
+    def get_executor(self):
+        """Return process pool used to plan days in parallel - started on first use"""
+        if self._executor is None and self.max_workers != 1:
+            self._executor = ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    def close(self):
+        """Stop process pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def get_open_mask(self, profile):
+        """Venues open long enough to be visited during the trip (see scoring.opening_mask) - cached"""
+        weekdays = np.unique(profile.get_weekdays())
+        key = (tuple(weekdays.tolist()), profile.day_start, profile.day_end)
+
+        mask = self._open_masks.get(key)
+        if mask is None:
+            mask = opening_mask(self.venues.opening_hours, self.venues.durations, weekdays, profile.day_start,
+                                profile.day_end)
+            mask.flags.writeable = False
+            if len(self._open_masks) >= OPEN_MASK_CACHE_SIZE:
+                self._open_masks.clear()
+            self._open_masks[key] = mask
+
+        return mask
+
+    def build_problem(self, profile):
+        """Build the planning problem of the trip profile"""
+        return PlanningProblem(self.venues, profile, self.travel_model, self.pool_size_per_day, self.spatial_index,
+                               self.get_open_mask(profile))
+
+    def solve(self, problem, time_limit=TIME_LIMIT, seed=0):
+        """Plan the routes of the problem - long trips are planned day by day"""
+        if problem.no_of_days >= DECOMPOSE_MIN_DAYS:
+            # imported here as the decompose module builds on the solver functions of this module
+            from .decompose import solve_decomposed
+            workers = self.max_workers or os.cpu_count()
+            return solve_decomposed(problem, time_limit, seed, self.get_executor(), workers)
+
+        return solve(problem, time_limit, seed)
+
+    def plan(self, profile, time_limit=TIME_LIMIT, seed=0):
+        """Plan the itinerary of the trip profile within the time limit (seconds)"""
+        start = time.perf_counter()
+
+        problem = self.build_problem(profile)
+        routes = self.solve(problem, time_limit, seed)
+        itinerary = Itinerary(problem, routes, self.venues)
+
+        logger.info('Planned {} days with {} visits and score {:.2f} in {:.3f}s...'.format(
+            problem.no_of_days, sum(len(x) for x in routes), itinerary.score, time.perf_counter() - start))
+
+        return itinerary
+
+    def plan_anytime(self, profile, first_deadline=FIRST_PLAN_DEADLINE, time_limit=ANYTIME_TIME_LIMIT, seed=0,
+                     callback=None):
+        """Start planning the itinerary of the trip profile - see AnytimePlan. The deadlines include building the
+           planning problem
+        """
+        start = time.perf_counter()
+        return AnytimePlan(self.build_problem(profile), self.venues, first_deadline, time_limit, seed, callback,
+                           start)
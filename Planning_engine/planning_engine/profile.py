@@ -0,0 +1,74 @@
+""" This module defines the trip profile of the user used by the planner """
+
+import numpy as np
+from datetime import datetime, timedelta
+from .constants import STYLES, DAY_START, DAY_END, BUDGET_PRICE_LIMITS
+from .utils import str_to_minutes
+
+
+class TripProfile:
+    def __init__(self, start_date, end_date, no_of_adults=1, no_of_children=0, budget='intermediate',
+                 preferences=None, hotel=None, max_distance=None, day_start=DAY_START, day_end=DAY_END):
+        """Build trip profile
+
+           start_date/end_date: first and last day of the trip (date or YYYY-MM-DD string)
+           preferences: dictionary of style: weight. Styles not given get a weight of 1
+           hotel: (latitude, longitude) of the accommodation. If None, the planner starts each day from the
+           centre of the venues chosen
+           max_distance: only visit venues within this distance (km) of the hotel. None means no limit
+        """
+        self.start_date = self._to_date(start_date)
+        self.end_date = self._to_date(end_date)
+        if self.end_date < self.start_date:
+            raise ValueError('End date {} cannot be before start date {}.'.format(self.end_date, self.start_date))
+
+        if budget not in BUDGET_PRICE_LIMITS:
+            raise ValueError('Budget: {} not recognised...'.format(budget))
+
+        self.no_of_adults = no_of_adults
+        self.no_of_children = no_of_children
+        self.budget = budget
+        self.preferences = preferences or {}
+        self.hotel = None if hotel is None else tuple(float(i) for i in hotel)
+        self.max_distance = max_distance
+        self.day_start = str_to_minutes(day_start)
+        self.day_end = str_to_minutes(day_end)
+
+    @staticmethod
+    def _to_date(x):
+        """Convert YYYY-MM-DD string to date"""
+        if isinstance(x, str):
+            return datetime.strptime(x, '%Y-%m-%d').date()
+        return x
+
+    def get_dates(self):
+        """Return list of dates of the trip"""
+        return [self.start_date + timedelta(days=i) for i in range((self.end_date - self.start_date).days + 1)]
+
+    def get_weekdays(self):
+        """Return day of the week (0 is Monday) for every day of the trip"""
+        return np.array([x.weekday() for x in self.get_dates()])
+
+    def get_preference_vector(self):
+        """Return weight of every style as a vector ordered the same way as STYLES
+
+           Family friendly venues are preferred if children are travelling and romantic venues are preferred
+           for couples
+        """
+        weights = np.ones(len(STYLES))
+
+        if self.no_of_children > 0:
+            weights[STYLES.index('family')] = 2
+        elif self.no_of_adults == 2:
+            weights[STYLES.index('romantic')] = 2
+
+        for style, weight in self.preferences.items():
+            if style not in STYLES:
+                raise ValueError('Style: {} not recognised. Choose from: {}'.format(style, ', '.join(STYLES)))
+            weights[STYLES.index(style)] = weight
+
+        return weights
+
+    def get_price_limit(self):
+        """Return maximum price value of a venue allowed by the budget"""
+        return BUDGET_PRICE_LIMITS[self.budget]
@@ -0,0 +1,46 @@
+""" This module scores the venues against the preferences of the user and picks the best ones
+
+    Style scores of all venues are stored as one (venues x styles) float32 matrix so scoring every venue
+    is one matrix-vector product with the preference vector of the user. Venues the user cannot visit
+    are removed with boolean masks and the best K venues are picked with argpartition instead of sorting
+    all of them.
+"""
+import numpy as np
+from .constants import BASE_SCORE, SLOT_MINUTES
+from .hours import unpack_hours, fits
+
+
+def score_venues(styles, preference_vector):
+    """Relevance of every venue - style matrix (n, len(STYLES)) multiplied by preference vector (len(STYLES),)"""
+    return styles @ np.asarray(preference_vector, dtype=np.float32) + np.float32(BASE_SCORE)
+
+
+def budget_mask(prices, price_limit):
+    """Venues within the price limit. Venues without price are kept. None means no limit"""
+    if price_limit is None:
+        return np.ones(len(prices), dtype=bool)
+
+    return ~(prices > price_limit)
+
+
+def opening_mask(opening_hours, durations, weekdays, day_start, day_end):
+    """Venues open long enough to be visited on at least one day of the trip between day start and day end
+
+       opening_hours is the packed opening hours bitmap of the venues (see hours module)
+    """
+    # only the slots between day start and day end of each day of the week in the trip
+    first_slot = -(-day_start // SLOT_MINUTES)
+    last_slot = day_end // SLOT_MINUTES
+    bitmap = unpack_hours(opening_hours[:, np.unique(weekdays)])[..., first_slot:last_slot]
+
+    return fits(bitmap.transpose(1, 0, 2), durations).any(axis=(0, 2))
+
+
+def top_k(scores, mask, k):
+    """Indices of the k best scoring venues where mask is True, best first"""
+    candidates = np.flatnonzero(mask)
+    if k < len(candidates):
+        # highest k scores in any order, then only sort those
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
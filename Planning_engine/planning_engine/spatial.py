@@ -0,0 +1,131 @@
+""" This module builds a spatial index over the venues to answer location queries quickly
+
+    Venues are put into square grid cells of a few hundred metres. Cells are numbered row by row and the
+    venues are sorted by cell, so the venues of a row of neighbouring cells are one slice of the sorted
+    venues. A query only looks at the cells overlapping the area searched and then checks the exact
+    distance of the venues found in them.
+"""
+import numpy as np
+from .constants import SPATIAL_CELL_SIZE, SPATIAL_MAX_CELLS
+from .travel import haversine
+
+# length of one degree of latitude in km
+KM_PER_DEGREE = 111.2
+
+
+class SpatialIndex:
+    def __init__(self, coordinates, cell_size=SPATIAL_CELL_SIZE):
+        """Build grid index over the coordinates (latitude, longitude in degrees). cell_size is in km
+
+           Cells are made larger if the venues are spread out too much to keep the grid small.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if len(self.coordinates) == 0:
+            raise ValueError('Cannot build spatial index without any coordinates...')
+
+        # longitude degrees get shorter away from the equator - use the middle of the venues
+        self.cos_lat = np.cos(np.radians(self.coordinates[:, 0].mean()))
+
+        # make cells larger until the grid is small enough
+        extent = np.ptp(self._to_km(self.coordinates), axis=0)
+        while np.prod(np.floor(extent / cell_size) + 1) > SPATIAL_MAX_CELLS:
+            cell_size *= 2
+        self.cell_size = cell_size
+
+        cells = self._to_cells(self.coordinates)
+        self.origin = cells.min(axis=0)
+        cells -= self.origin
+        self.shape = cells.max(axis=0) + 1
+
+        # sort venues by cell and record where each cell starts
+        cell_ids = cells[:, 0] * self.shape[1] + cells[:, 1]
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.cell_start = np.searchsorted(cell_ids[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def _to_km(self, points):
+        """Project coordinates to (north, east) in km"""
+        return np.column_stack([points[:, 0] * KM_PER_DEGREE, points[:, 1] * KM_PER_DEGREE * self.cos_lat])
+
+    def _to_cells(self, points):
+        """Grid cell (row, column) of each point, before moving the origin to the first cell"""
+        return np.floor(self._to_km(points) / self.cell_size).astype(np.int64)
+
+    def _venues_in_cells(self, lower, upper):
+        """Indices of venues in the cells from lower (row, column) to upper (row, column), inclusive"""
+        lower = np.maximum(lower - self.origin, 0)
+        upper = np.minimum(upper - self.origin, self.shape - 1)
+        if (lower > upper).any():
+            return np.empty(0, dtype=np.int64)
+
+        # cells of a row next to each other are one slice of the sorted venues
+        rows = np.arange(lower[0], upper[0] + 1) * self.shape[1]
+        starts = self.cell_start[rows + lower[1]]
+        ends = self.cell_start[rows + upper[1] + 1]
+
+        return np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+
+    def _covers_grid(self, lower, upper):
+        """Check whether the cells from lower to upper cover the whole grid"""
+        return (lower <= self.origin).all() and (upper >= self.origin + self.shape - 1).all()
+
+    def _radius_cells(self, point, radius):
+        """Lowest and highest cells overlapping the circle around the point"""
+        centre = self._to_km(point[None, :])[0]
+
+        # longitude degrees of the circle are longer in km on the grid if the circle is further from the equator
+        furthest_lat = min(abs(point[0]) + radius / KM_PER_DEGREE, 89.9)
+        radius = np.array([radius, radius * self.cos_lat / np.cos(np.radians(furthest_lat))])
+
+        lower = np.floor((centre - radius) / self.cell_size).astype(np.int64)
+        upper = np.floor((centre + radius) / self.cell_size).astype(np.int64)
+
+        return lower, upper
+
+    def within_radius(self, point, radius, mask=None):
+        """Venues within radius (km) of the point (latitude, longitude), nearest first
+
+           mask is an optional boolean array of venues that can be returned. Returns (indices, distances in km).
+        """
+        point = np.asarray(point, dtype=np.float64)
+        # a little bit of margin for the flat projection
+        candidates = self._venues_in_cells(*self._radius_cells(point, radius * 1.01))
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+
+        distances = haversine(point[None, :], self.coordinates[candidates])[0]
+        keep = distances <= radius
+        candidates, distances = candidates[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+
+        return candidates[order], distances[order]
+
+    def nearest(self, point, k, mask=None):
+        """k nearest venues to the point (latitude, longitude), nearest first
+
+           mask is an optional boolean array of venues that can be returned, e.g. food venues only.
+           Returns (indices, distances in km).
+        """
+        point = np.asarray(point, dtype=np.float64)
+        radius = self.cell_size
+
+        # search a larger circle until k venues are found or the whole grid is searched
+        while True:
+            indices, distances = self.within_radius(point, radius, mask)
+            if len(indices) >= k or self._covers_grid(*self._radius_cells(point, radius)):
+                return indices[:k], distances[:k]
+            radius *= 2
+
+    def within_bbox(self, lat_min, lng_min, lat_max, lng_max):
+        """Indices of venues within the bounding box"""
+        lower = self._to_cells(np.array([[lat_min, lng_min]]))[0]
+        upper = self._to_cells(np.array([[lat_max, lng_max]]))[0]
+        candidates = self._venues_in_cells(lower, upper)
+
+        coordinates = self.coordinates[candidates]
+        keep = ((coordinates[:, 0] >= lat_min) & (coordinates[:, 0] <= lat_max) &
+                (coordinates[:, 1] >= lng_min) & (coordinates[:, 1] <= lng_max))
+
+        return np.sort(candidates[keep])
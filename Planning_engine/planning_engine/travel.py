@@ -0,0 +1,176 @@
+""" This module calculates the travelling time between venues
+
+    Travelling times are either calculated on the fly from the coordinates (HaversineTravelModel) or
+    read from a travel time matrix built once for all venues and stored as a .npy file. The matrix is
+    memory-mapped so every planner process shares one copy of it instead of loading it.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from .constants import TRAVEL_SPEED_BANDS, TRAVEL_OVERHEAD, MATRIX_BLOCK_SIZE
+from .utils import logger
+
+EARTH_RADIUS = 6371.0
+
+
+def haversine(coord_a, coord_b):
+    """Great circle distance in km between every point in coord_a (m, 2) and every point in coord_b (k, 2)
+
+       Coordinates are (latitude, longitude) in degrees. Returns a (m, k) matrix.
+    """
+    lat_a, lng_a = np.radians(coord_a[:, 0])[:, None], np.radians(coord_a[:, 1])[:, None]
+    lat_b, lng_b = np.radians(coord_b[:, 0])[None, :], np.radians(coord_b[:, 1])[None, :]
+
+    a = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lng_b - lng_a) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_to_time(distance, speed=TRAVEL_SPEED_BANDS, overhead=TRAVEL_OVERHEAD):
+    """Convert distance (km) to travelling time (minutes) with a fixed overhead for every trip
+
+       speed is either one average speed (km/h) or a list of (maximum distance, speed) bands so that
+       e.g. short trips are walked and longer trips are driven. The last band should have no maximum (None).
+    """
+    if np.isscalar(speed):
+        speeds = speed
+    else:
+        speeds = np.full(distance.shape, float(speed[-1][1]))
+        for max_distance, band_speed in reversed(speed[:-1]):
+            speeds = np.where(distance <= max_distance, band_speed, speeds)
+
+    times = distance / speeds * 60 + overhead
+
+    # no travelling needed within the same place
+    return np.where(distance > 0, times, 0)
+
+
+class LocalRoutingStandIn:
+    def __init__(self, speed=TRAVEL_SPEED_BANDS, overhead=TRAVEL_OVERHEAD):
+        """Stand-in for a routing service which can be used offline
+
+           Streets rarely go in a straight line so the distance is measured along north-south and east-west
+           directions only (manhattan distance) before converting it to travelling time.
+        """
+        self.speed = speed
+        self.overhead = overhead
+
+    def __call__(self, coord_a, coord_b):
+        """Travelling time in minutes between every point in coord_a and every point in coord_b"""
+        lat_a, lng_a = np.radians(coord_a[:, 0])[:, None], np.radians(coord_a[:, 1])[:, None]
+        lat_b, lng_b = np.radians(coord_b[:, 0])[None, :], np.radians(coord_b[:, 1])[None, :]
+
+        north_south = np.abs(lat_b - lat_a) * EARTH_RADIUS
+        east_west = np.abs(lng_b - lng_a) * EARTH_RADIUS * np.cos((lat_a + lat_b) / 2)
+
+        return distance_to_time(north_south + east_west, self.speed, self.overhead)
+
+
+class HaversineTravelModel:
+    def __init__(self, coordinates, speed=TRAVEL_SPEED_BANDS, overhead=TRAVEL_OVERHEAD, routing=None):
+        """Travelling time model using straight line distance and a speed model (see distance_to_time)
+
+           routing is an optional function (coord_a, coord_b) -> travelling times in minutes which replaces
+           the straight line model, e.g. a call to a routing service or LocalRoutingStandIn.
+        """
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.speed = speed
+        self.overhead = overhead
+        self.routing = routing
+
+    def times_between_points(self, coord_a, coord_b):
+        """Travelling time in minutes between every point in coord_a and every point in coord_b"""
+        if self.routing is not None:
+            return self.routing(coord_a, coord_b)
+
+        return distance_to_time(haversine(coord_a, coord_b), self.speed, self.overhead)
+
+    def submatrix(self, indices, extra_points=None):
+        """Travelling times in minutes between the venues in indices followed by the extra points (e.g. hotel)"""
+        points = self.coordinates[indices]
+        if extra_points is not None and len(extra_points):
+            points = np.vstack([points, extra_points])
+
+        return self.times_between_points(points, points)
+
+
+def coordinates_checksum(coordinates):
+    """Checksum of the coordinates to make sure a travel time matrix belongs to the venue data"""
+    return hashlib.sha1(np.ascontiguousarray(coordinates, dtype=np.float64).tobytes()).hexdigest()
+
+
+def build_travel_matrix(coordinates, output_path, speed=TRAVEL_SPEED_BANDS, overhead=TRAVEL_OVERHEAD, routing=None,
+                        block_size=MATRIX_BLOCK_SIZE):
+    """Build float32 travelling time matrix (minutes) between all venues and write it out as a .npy file
+
+       The matrix is written in blocks of rows straight to disk so it never needs to fit in memory. Information
+       about the matrix is written next to it as a .json file.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    n = len(coordinates)
+    model = HaversineTravelModel(coordinates, speed, overhead, routing)
+
+    logger.info('Building {} x {} travel time matrix...'.format(n, n))
+    matrix = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=(n, n))
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        matrix[start:end] = model.times_between_points(coordinates[start:end], coordinates)
+
+    matrix.flush()
+    del matrix
+
+    info = {'no_of_venues': n, 'checksum': coordinates_checksum(coordinates), 'speed': speed, 'overhead': overhead,
+            'routing': None if routing is None else type(routing).__name__}
+    with open('{}.json'.format(os.path.splitext(output_path)[0]), 'w') as file_handle:
+        json.dump(info, file_handle)
+
+    logger.info('Travel time matrix written to {}...'.format(output_path))
+
+    return output_path
+
+
+class TravelTimeMatrix:
+    def __init__(self, path, coordinates, speed=TRAVEL_SPEED_BANDS, overhead=TRAVEL_OVERHEAD, routing=None):
+        """Travelling time model reading from a travel time matrix built by build_travel_matrix
+
+           The matrix is memory-mapped (read only). Extra points such as the hotel are not in the matrix so their
+           travelling times are calculated with the haversine model.
+        """
+        self.matrix = np.load(path, mmap_mode='r')
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+
+        # check matrix belongs to the venue data
+        info_path = '{}.json'.format(os.path.splitext(path)[0])
+        if os.path.exists(info_path):
+            with open(info_path, 'r') as file_handle:
+                info = json.load(file_handle)
+            if info['checksum'] != coordinates_checksum(self.coordinates):
+                raise ValueError('Travel time matrix {} was not built for this venue data. '
+                                 'Please build the matrix again.'.format(path))
+        elif self.matrix.shape != (len(self.coordinates), len(self.coordinates)):
+            raise ValueError('Travel time matrix {} shape {} does not match the number of venues {}.'
+                             .format(path, self.matrix.shape, len(self.coordinates)))
+
+        self.point_model = HaversineTravelModel(self.coordinates, speed, overhead, routing)
+
+    def submatrix(self, indices, extra_points=None):
+        """Travelling times in minutes between the venues in indices followed by the extra points (e.g. hotel)"""
+        indices = np.asarray(indices)
+        times = np.asarray(self.matrix[np.ix_(indices, indices)], dtype=np.float64)
+
+        if extra_points is None or not len(extra_points):
+            return times
+
+        # add rows and columns of the extra points
+        k, e = len(indices), len(extra_points)
+        points = np.vstack([self.coordinates[indices], extra_points])
+        extra_times = self.point_model.times_between_points(points, points[k:])
+
+        result = np.empty((k + e, k + e))
+        result[:k, :k] = times
+        result[:, k:] = extra_times
+        result[k:, :] = extra_times.T
+
+        return result
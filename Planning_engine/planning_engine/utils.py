@@ -0,0 +1,113 @@
+""" This module contains all the common functions that can be used in the planning engine """
+
+import os
+import pickle
+import hashlib
+import logging
+from datetime import datetime
+
+
+def str_to_minutes(x):
+    """Convert time in 24 hour system (e.g. 09:30) to minutes since midnight"""
+    hours, minutes = x.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_str(x):
+    """Convert minutes since midnight to time in 24 hour system (e.g. 09:30)"""
+    x = int(round(x))
+    return "{:02d}:{:02d}".format(x // 60, x % 60)
+
+
+def parse_timeranges(value):
+    """Convert opening hours of a day to a list of (open, close) in minutes since midnight
+
+       Value is written by the data wrangler and can be a time range string (e.g. 09:00–18:00),
+       a list of time range strings or None/empty list if the venue is closed or hours are unknown.
+       Closing times past midnight are given as minutes over 24:00.
+    """
+    if not value:
+        return []
+
+    if isinstance(value, str):
+        value = [value]
+
+    ranges = []
+    for timerange in value:
+        if not timerange:
+            continue
+
+        open_time, close_time = [str_to_minutes(i) for i in timerange.split("–")]
+        if close_time <= open_time:
+            close_time += 24 * 60
+        ranges.append((open_time, close_time))
+
+    return ranges
+
+
+def read_pickle_file(filename):
+    """read python object back from the file"""
+
+    with open(filename, 'rb') as pkl_file:
+        data = pickle.load(pkl_file)
+
+    return data
+
+
+def file_checksum(filename, chunk_size=1 << 20):
+    """Checksum of the content of the file"""
+    checksum = hashlib.sha1()
+
+    with open(filename, 'rb') as file_handle:
+        for chunk in iter(lambda: file_handle.read(chunk_size), b''):
+            checksum.update(chunk)
+
+    return checksum.hexdigest()
+
+
+def setup_logging():
+    """ Add log file and console handlers to the logger of the planning engine
+
+        Called by the entry points (see __main__) only, so importing the engine (e.g. from the web app) does not
+        write log files. Handlers are only added once.
+    """
+    # create logger
+    log = logging.getLogger('PLANNER')
+    log.setLevel(logging.DEBUG)
+    if log.handlers:
+        return log
+
+    log_file_name = 'PlanningEngine_{}.log'.format(datetime.today().strftime('%Y%m%d_%H%M%S'))
+
+    try:
+        if os.path.exists(log_file_name):
+            os.remove(log_file_name)
+    except:
+        pass
+
+    # create file handler which logs even debug messages
+    fh = logging.FileHandler(log_file_name, 'w', 'utf-8')
+    fh.setLevel(logging.INFO)
+
+    # create console handler with a higher log level
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+
+    # create formatter and add it to the handlers
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s : %(message)s')
+    fh.setFormatter(formatter)
+    ch.setFormatter(formatter)
+
+    # add the handlers to the logger
+    log.addHandler(fh)
+    log.addHandler(ch)
+
+    # first log message
+    log.info("Setup logger...")
+
+    return log
+
+
+# logger of the planning engine - logs go wherever the application importing the engine sends them until
+# setup_logging is called
+logger = logging.getLogger('PLANNER')
@@ -0,0 +1,124 @@
+""" This module loads the venue table written by the data wrangler and packs the attributes needed
+    by the planner into numpy arrays.
+"""
+import numpy as np
+import pandas as pd
+from .constants import DAYS_IN_A_WEEK, STYLES, STYLE_ALIASES, STYLE_PREFIXES, DEFAULT_DURATION, SLOT_MINUTES, \
+    SLOTS_PER_DAY
+from .hours import timeranges_to_bitmap, pack_hours, unpack_hours
+from .utils import parse_timeranges, read_pickle_file, file_checksum, logger
+
+
+class VenueData:
+    def __init__(self, names, coordinates, durations, prices, styles, opening_hours, version=None):
+        """Venue attributes as numpy arrays. Venue i is described by row i of every array
+
+           names: (n,) venue names
+           coordinates: (n, 2) latitude and longitude in degrees
+           durations: (n,) time to spend at the venue in minutes
+           prices: (n,) price value of the venue, nan if unknown
+           styles: (n, len(STYLES)) float32 style scores of the venue
+           opening_hours: (n, 7, SLOTS_PER_DAY // 8) opening hours bitmap of each day of the week packed into
+           bytes (see hours module)
+           version: version of the venue table the data comes from, e.g. checksum of the file
+        """
+        self.names = np.asarray(names, dtype=object)
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.styles = np.asarray(styles, dtype=np.float32)
+        self.opening_hours = np.asarray(opening_hours, dtype=np.uint8)
+        self.version = version
+
+    def __len__(self):
+        return len(self.names)
+
+    def open_for(self, weekday, time, duration):
+        """Check which venues are open for duration (minutes) from time (minutes since midnight) on the weekday
+
+           Visits past midnight continue on the next day. Returns (n,) booleans.
+        """
+        # slots of the day and the next day
+        bitmap = unpack_hours(self.opening_hours[:, [weekday, (weekday + 1) % 7]]).reshape(len(self), -1)
+        first_slot = int(time // SLOT_MINUTES)
+        last_slot = int(np.ceil((time + duration) / SLOT_MINUTES))
+
+        return bitmap[:, first_slot:last_slot].all(axis=1)
+
+    @staticmethod
+    def _get_styles(df):
+        """Average nlp and word finder scores of each style into a (n, len(STYLES)) matrix"""
+        styles = np.zeros((len(df), len(STYLES)))
+        counts = np.zeros(len(STYLES))
+
+        for col in df.columns:
+            for prefix in STYLE_PREFIXES:
+                if col.startswith(prefix):
+                    style = col[len(prefix):]
+                    style = STYLE_ALIASES.get(style, style)
+                    if style in STYLES:
+                        pos = STYLES.index(style)
+                        styles[:, pos] += pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy()
+                        counts[pos] += 1
+
+        return styles / np.maximum(counts, 1)
+
+    @staticmethod
+    def _get_hours(df):
+        """Opening hours bitmap of each venue packed into bytes
+
+           Bitmap written by the data wrangler is used if available, otherwise the opening hours of each day are
+           parsed. Venues without any opening hours are assumed to be open all day.
+        """
+        opening_hours = np.full((len(df), 7, SLOTS_PER_DAY // 8), 255, dtype=np.uint8)
+
+        bitmaps = df['hours_bitmap'] if 'hours_bitmap' in df.columns else pd.Series([None] * len(df), index=df.index)
+        hours = [df.get("hours_for_{}".format(day.lower()), pd.Series([None] * len(df), index=df.index))
+                 for day in DAYS_IN_A_WEEK]
+
+        for i in range(len(df)):
+            if isinstance(bitmaps.iloc[i], bytes):
+                opening_hours[i] = np.frombuffer(bitmaps.iloc[i], dtype=np.uint8).reshape(7, -1)
+                continue
+
+            week = [parse_timeranges(hours[day].iloc[i]) for day in range(7)]
+            # hours unknown - assume open all day
+            if any(week):
+                opening_hours[i] = pack_hours(timeranges_to_bitmap(week))
+
+        return opening_hours
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build venue data from the venue dataframe written by the data wrangler"""
+        # only keep venues with coordinates
+        df = df[df['coordinates'].apply(lambda x: x is not None and len(x) == 2)]
+        if len(df) == 0:
+            raise ValueError('No venues with coordinates found in the venue table...')
+
+        names = df['name'].to_numpy() if 'name' in df.columns else df.index.to_numpy()
+        coordinates = np.array([[float(i) for i in x] for x in df['coordinates']])
+
+        # durations are in hours - convert to minutes
+        if 'suggested_duration' in df.columns:
+            durations = pd.to_numeric(df['suggested_duration'], errors='coerce').fillna(DEFAULT_DURATION).to_numpy()
+        else:
+            durations = np.full(len(df), DEFAULT_DURATION)
+        durations = durations * 60
+
+        if 'price_value' in df.columns:
+            prices = pd.to_numeric(df['price_value'], errors='coerce').to_numpy()
+        else:
+            prices = np.full(len(df), np.nan)
+
+        return cls(names, coordinates, durations, prices, cls._get_styles(df), cls._get_hours(df))
+
+
+def load_venue_data(path):
+    """Read in venue table (pickled dataframe) written by the data wrangler and convert to venue data"""
+    logger.info('Loading venue table from {}...'.format(path))
+    venues = VenueData.from_dataframe(read_pickle_file(path))
+    venues.version = file_checksum(path)
+    logger.info('{} venues loaded (version {})...'.format(len(venues), venues.version[:12]))
+
+    return venues
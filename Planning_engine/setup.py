@@ -0,0 +1,12 @@
+"""Installs the planning engine package so the data wrangler and the web app can import it
+
+   pip install -e path/to/Planning_engine
+"""
+from setuptools import setup, find_packages
+
+setup(name='planning_engine',
+      version='0.1.0',
+      description='Plans trip itineraries from the venue table written by the data wrangler',
+      packages=find_packages(exclude=['tests']),
+      python_requires='>=3.7',
+      install_requires=['numpy', 'pandas'])
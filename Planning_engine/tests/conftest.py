@@ -0,0 +1,44 @@
+""" Shared fixtures of the planning engine tests - small venue sets with fixed coordinates and opening hours """
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from planning_engine.venues import VenueData
+from planning_engine.hours import timeranges_to_bitmap, pack_hours
+from planning_engine.constants import STYLES
+
+# opening hours (open, close) in minutes for each day of the week
+OPEN_ALL_DAY = [[(0, 1440)]] * 7
+OFFICE_HOURS = [[(540, 1080)]] * 7                          # 09:00-18:00
+EVENINGS = [[(1080, 1560)]] * 7                             # 18:00-02:00
+LUNCH_AND_DINNER = [[(690, 840), (1020, 1320)]] * 7         # 11:30-14:00 and 17:00-22:00
+CLOSED_ON_MONDAY = [[]] + [[(600, 1200)]] * 6               # 10:00-20:00 except Monday
+HOURS = [OPEN_ALL_DAY, OFFICE_HOURS, EVENINGS, LUNCH_AND_DINNER, CLOSED_ON_MONDAY]
+
+
+def make_venues(coordinates, durations, hours, prices=None, styles=None):
+    """Venue data of the venues given - every venue likes every style equally if styles are not given"""
+    n = len(coordinates)
+    prices = np.full(n, np.nan) if prices is None else prices
+    styles = np.ones((n, len(STYLES))) if styles is None else styles
+    opening_hours = np.array([pack_hours(timeranges_to_bitmap(x)) for x in hours])
+
+    return VenueData(['venue_{}'.format(i) for i in range(n)], coordinates, durations, prices, styles,
+                     opening_hours, version='test')
+
+
+@pytest.fixture
+def city():
+    """40 venues within a few km of the centre of Singapore with a mix of opening hours, durations and prices"""
+    rng = np.random.default_rng(7)
+    n = 40
+    coordinates = np.array([1.29, 103.85]) + rng.normal(scale=0.01, size=(n, 2))
+    durations = rng.choice([30, 60, 90, 120], size=n).astype(float)
+    prices = rng.choice([np.nan, 10, 30, 50], size=n)
+    styles = rng.random((n, len(STYLES)))
+    hours = [HOURS[i % len(HOURS)] for i in range(n)]
+
+    return make_venues(coordinates, durations, hours, prices, styles)
@@ -0,0 +1,80 @@
+""" Tests of batch planning: profiles csv -> plan -> result columns """
+import numpy as np
+import pandas as pd
+import pytest
+from planning_engine.batch import read_profiles, plan_batch, write_columns
+from planning_engine.planner import Planner
+
+PROFILES_CSV = """id,start,end,adults,budget,hotel_latitude,hotel_longitude,foodie,cultural
+trip_a,2021-05-03,2021-05-04,2,low,1.29,103.85,2,
+trip_b,2021-05-08,2021-05-08,1,,,,,1
+trip_c,2021-05-05,2021-05-07,,high,1.30,103.86,,
+"""
+
+
+@pytest.fixture
+def profiles_path(tmp_path):
+    path = tmp_path / 'profiles.csv'
+    path.write_text(PROFILES_CSV)
+    return str(path)
+
+
+def test_read_profiles(profiles_path):
+    ids, profiles = read_profiles(profiles_path)
+
+    assert ids.tolist() == ['trip_a', 'trip_b', 'trip_c']
+    assert [len(x.get_dates()) for x in profiles] == [2, 1, 3]
+    assert profiles[0].hotel == (1.29, 103.85)
+    assert profiles[1].hotel is None
+
+
+def test_read_profiles_missing_columns(tmp_path):
+    path = tmp_path / 'profiles.csv'
+    path.write_text('start,adults\n2021-05-03,2\n')
+
+    with pytest.raises(ValueError):
+        read_profiles(str(path))
+
+
+def test_batch_round_trip(city, profiles_path, tmp_path):
+    ids, profiles = read_profiles(profiles_path)
+    visits, summary = plan_batch(Planner(city), profiles, ids, time_limit=0.05, workers=1)
+
+    # same itineraries as planning the profiles one by one
+    for profile_id, profile in zip(ids, profiles):
+        problem = Planner(city, max_workers=1).build_problem(profile)
+        rows = visits['profile'] == profile_id
+        assert rows.sum() == summary['no_of_visits'][summary['profile'] == profile_id][0]
+        assert set(visits['venue_id'][rows]).issubset(set(problem.pool.tolist()))
+        assert visits['day'][rows].max() < problem.no_of_days
+    assert (visits['end'] > visits['start']).all()
+    assert (summary['score'] > 0).all()
+
+    for columns, name in [(visits, 'visits.npz'), (summary, 'summary.npz')]:
+        path = write_columns(columns, str(tmp_path / name))
+        with np.load(path) as saved:
+            assert set(saved.files) == set(columns)
+            for col, values in columns.items():
+                assert saved[col].tolist() == values.tolist()
+
+
+def test_write_columns_falls_back_to_npz(tmp_path, monkeypatch):
+    def to_parquet(self, path, index):
+        raise ImportError('no parquet engine')
+
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', to_parquet)
+    path = write_columns({'score': np.array([1.5], dtype=np.float32)}, str(tmp_path / 'summary.parquet'))
+
+    assert path == str(tmp_path / 'summary.npz')
+    with np.load(path) as saved:
+        assert saved['score'].tolist() == [1.5]
+
+
+def test_empty_batch(tmp_path):
+    path = tmp_path / 'profiles.csv'
+    path.write_text('start,end\n')
+    ids, profiles = read_profiles(str(path))
+
+    visits, summary = plan_batch(None, profiles, ids, workers=1)
+    assert all(len(x) == 0 for x in list(visits.values()) + list(summary.values()))
+    assert visits['venue_id'].dtype == np.int32
@@ -0,0 +1,28 @@
+""" Tests of the planner benchmark on a small synthetic city """
+import json
+import numpy as np
+from planning_engine.benchmark import synthetic_profiles, run_benchmark, write_results
+from planning_engine.constants import DECOMPOSE_MIN_DAYS
+
+
+def test_synthetic_profiles_include_long_trips():
+    profiles = synthetic_profiles(10, np.random.default_rng(0), long_share=0.2)
+    days = [len(x.get_dates()) for x in profiles]
+
+    assert all(1 <= x <= 7 for x in days[:8])
+    assert all(DECOMPOSE_MIN_DAYS <= x <= DECOMPOSE_MIN_DAYS + 7 for x in days[8:])
+
+
+def test_run_benchmark(tmp_path):
+    results = run_benchmark(sizes=[300], no_of_profiles=5, time_limit=0.05, max_workers=1)
+
+    result = results['results'][0]
+    assert result['no_of_venues'] == 300
+    assert result['decomposed']['no_of_profiles'] == 1
+    assert result['decomposed']['latency']['max'] <= result['latency']['max']
+    assert 'main process only' in results['config']['peak_memory']
+
+    path = str(tmp_path / 'benchmark.json')
+    write_results(results, path)
+    with open(path) as file_handle:
+        assert json.load(file_handle) == results
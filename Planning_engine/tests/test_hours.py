@@ -0,0 +1,60 @@
+""" Tests of the opening hours bitmap and lookup tables """
+import numpy as np
+from planning_engine.hours import timeranges_to_bitmap, pack_hours, unpack_hours, OpeningHours
+from planning_engine.utils import parse_timeranges
+from planning_engine.constants import SLOTS_PER_DAY
+
+
+def test_bitmap_only_sets_slots_fully_open():
+    # 09:10-10:20 only covers the 09:15, 09:30, 09:45 and 10:00 slots
+    bitmap = timeranges_to_bitmap([[(550, 620)]] + [[]] * 6)
+
+    assert bitmap.shape == (7, SLOTS_PER_DAY)
+    assert np.flatnonzero(bitmap[0]).tolist() == [37, 38, 39, 40]
+    assert not bitmap[1:].any()
+
+
+def test_bitmap_past_midnight_continues_next_day():
+    # Saturday 22:00-02:00 and Sunday 23:00-01:00 (wraps to Monday)
+    bitmap = timeranges_to_bitmap([[]] * 5 + [[(1320, 1560)], [(1380, 1500)]])
+
+    assert bitmap[5, 88:].all() and not bitmap[5, :88].any()
+    assert bitmap[6, :8].all() and bitmap[6, 92:].all() and not bitmap[6, 8:92].any()
+    assert bitmap[0, :4].all() and not bitmap[0, 4:].any()
+
+
+def test_bitmap_of_parsed_strings():
+    week = [parse_timeranges(x) for x in ['09:00–18:00', ['11:30–14:00', '17:00–02:00'], None, [], '00:00–24:00',
+                                          [None], '10:00–22:00']]
+    bitmap = timeranges_to_bitmap(week)
+
+    assert bitmap[0].sum() == 9 * 4
+    assert bitmap[1].sum() == (2.5 + 7) * 4
+    assert bitmap[2, :8].all() and bitmap[2].sum() == 8
+    assert bitmap[4].all()
+    assert not bitmap[5].any()
+
+
+def test_pack_round_trip():
+    bitmap = np.random.default_rng(0).random((5, 7, SLOTS_PER_DAY)) < 0.5
+    packed = pack_hours(bitmap)
+
+    assert packed.shape == (5, 7, SLOTS_PER_DAY // 8)
+    assert (unpack_hours(packed) == bitmap).all()
+
+
+def test_earliest_and_latest_start():
+    # one day, venue 0 open 09:00-18:00, venue 1 open 11:30-14:00 and 17:00-22:00, both visited for 60 minutes
+    bitmap = np.stack([timeranges_to_bitmap([[(540, 1080)]] * 7)[0],
+                       timeranges_to_bitmap([[(690, 840), (1020, 1320)]] * 7)[0]])[None]
+    hours = OpeningHours(bitmap, [60, 60])
+
+    assert hours.earliest_start(0, 0, 500) == 540
+    assert hours.earliest_start(0, 0, 600) == 600
+    assert hours.earliest_start(0, 0, 1021) == np.inf
+    assert hours.earliest_start(0, 1, 800) == 1020
+    assert hours.earliest_start(0, 1, 1300) == np.inf
+    assert (hours.earliest_start(0, np.array([0, 1]), np.array([600, 600])) == [600, 690]).all()
+
+    assert hours.latest_start(0, 0, 600) == 1020
+    assert hours.latest_start(0, 1, 700) == 780
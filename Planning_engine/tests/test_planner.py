@@ -0,0 +1,185 @@
+""" Tests of the planner - every plan is checked against the opening hours and the time budget of each day """
+import time
+import numpy as np
+import pytest
+from planning_engine.planner import Planner, PlanningProblem, solve, Itinerary
+from planning_engine.decompose import solve_decomposed, kmeans
+from planning_engine.profile import TripProfile
+from planning_engine.travel import HaversineTravelModel, haversine
+from planning_engine.benchmark import synthetic_city
+from planning_engine.scoring import opening_mask
+from planning_engine.utils import str_to_minutes
+from conftest import make_venues, OPEN_ALL_DAY, OFFICE_HOURS, EVENINGS, CLOSED_ON_MONDAY
+
+# 3 May 2021 is a Monday
+MONDAY = '2021-05-03'
+
+
+def check_plan(problem, routes, venues):
+    """Check every visit fits in the opening hours, travelling times are respected and every day ends in time"""
+    visited = [v for route in routes for v in route]
+    assert len(visited) == len(set(visited))
+    assert len(routes) == problem.no_of_days
+
+    for day, route in enumerate(routes):
+        weekday = problem.dates[day].weekday()
+        t, prev = problem.day_start, problem.hotel
+
+        for v, start in zip(route, problem.schedule_day(day, route)[0]):
+            assert start >= t + problem.travel_times[prev, v] - 1e-6
+            assert venues.open_for(weekday, start, problem.durations[v])[problem.pool[v]]
+            t, prev = start + problem.durations[v], v
+
+        assert t + problem.travel_times[prev, problem.hotel] <= problem.day_end + 1e-6
+
+
+def test_plan_fits_opening_hours_and_day(city):
+    profile = TripProfile(MONDAY, '2021-05-05', hotel=(1.29, 103.85))
+    problem = PlanningProblem(city, profile, HaversineTravelModel(city.coordinates))
+    routes = solve(problem, 0.2)
+
+    assert sum(len(route) for route in routes) > 0
+    check_plan(problem, routes, city)
+
+
+def test_evening_venue_waits_for_opening():
+    venues = make_venues(np.array([[1.29, 103.85], [1.291, 103.851]]), [60, 60], [EVENINGS, OFFICE_HOURS])
+    problem = PlanningProblem(venues, TripProfile(MONDAY, MONDAY), HaversineTravelModel(venues.coordinates))
+    routes = solve(problem, 0.1)
+    starts = dict(zip(problem.pool[routes[0]], problem.schedule_day(0, routes[0])[0]))
+
+    assert set(starts) == {0, 1}
+    assert starts[0] >= str_to_minutes('18:00')
+    assert str_to_minutes('09:00') <= starts[1] <= str_to_minutes('17:00')
+    check_plan(problem, routes, venues)
+
+
+def test_closed_venue_not_visited():
+    venues = make_venues(np.array([[1.29, 103.85], [1.291, 103.851]]), [60, 60], [CLOSED_ON_MONDAY, OPEN_ALL_DAY])
+    problem = PlanningProblem(venues, TripProfile(MONDAY, MONDAY), HaversineTravelModel(venues.coordinates))
+
+    assert problem.pool.tolist() == [1]
+    assert problem.pool[solve(problem, 0.1)[0]].tolist() == [1]
+
+
+def test_short_day_is_not_overrun():
+    # 2 hour visits in a 3 hour day - only one fits with travelling
+    coordinates = np.array([1.29, 103.85]) + np.random.default_rng(0).normal(scale=0.005, size=(10, 2))
+    venues = make_venues(coordinates, np.full(10, 120.0), [OPEN_ALL_DAY] * 10)
+    profile = TripProfile(MONDAY, '2021-05-04', day_start='10:00', day_end='13:00')
+    problem = PlanningProblem(venues, profile, HaversineTravelModel(venues.coordinates))
+    routes = solve(problem, 0.1)
+
+    assert [len(route) for route in routes] == [1, 1]
+    check_plan(problem, routes, venues)
+
+
+def test_budget_and_distance_limits(city):
+    hotel = (1.29, 103.85)
+    profile = TripProfile(MONDAY, MONDAY, budget='low', hotel=hotel, max_distance=1.0)
+    problem = PlanningProblem(city, profile, HaversineTravelModel(city.coordinates))
+
+    assert len(problem.pool)
+    assert not (city.prices[problem.pool] > 15).any()
+    assert (haversine(np.array([hotel]), city.coordinates[problem.pool])[0] <= 1.0).all()
+
+
+def test_solve_stops_at_time_limit():
+    venues = synthetic_city(2000, np.random.default_rng(0))
+    problem = PlanningProblem(venues, TripProfile(MONDAY, '2021-05-09'), HaversineTravelModel(venues.coordinates))
+
+    start = time.perf_counter()
+    routes = solve(problem, 0.05)
+    assert time.perf_counter() - start < 0.3
+    check_plan(problem, routes, venues)
+
+
+def test_kmeans_separates_clusters():
+    rng = np.random.default_rng(0)
+    points = np.vstack([rng.normal(scale=0.1, size=(20, 2)), rng.normal(loc=10, scale=0.1, size=(20, 2))])
+    labels = kmeans(points, 2, rng)
+
+    assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1 and labels[0] != labels[20]
+
+
+def test_subproblem_uses_local_indices(city):
+    problem = PlanningProblem(city, TripProfile(MONDAY, '2021-05-05'), HaversineTravelModel(city.coordinates))
+    indices = np.array([5, 2, 9])
+    sub = problem.subproblem([2], indices)
+
+    assert sub.no_of_days == 1 and sub.dates == [problem.dates[2]]
+    assert sub.pool.tolist() == problem.pool[indices].tolist()
+    assert sub.travel_times[0, sub.hotel] == problem.travel_times[5, problem.hotel]
+    assert sub.travel_times[1, 2] == problem.travel_times[2, 9]
+
+
+def test_decomposed_plan_fits_opening_hours_and_day():
+    venues = synthetic_city(1000, np.random.default_rng(1))
+    profile = TripProfile(MONDAY, '2021-05-10', hotel=(1.29, 103.85))
+    problem = PlanningProblem(venues, profile, HaversineTravelModel(venues.coordinates))
+    routes = solve_decomposed(problem, 0.3)
+
+    assert all(routes)
+    check_plan(problem, routes, venues)
+
+
+def test_planner_itinerary(city):
+    planner = Planner(city, max_workers=1)
+    itinerary = planner.plan(TripProfile(MONDAY, '2021-05-04'), 0.1).to_dict()
+
+    assert [x['date'] for x in itinerary['days']] == [MONDAY, '2021-05-04']
+    for day in itinerary['days']:
+        times = [x for visit in day['visits'] for x in (visit['start'], visit['end'])] + [day['back_to_hotel']]
+        assert times == sorted(times)
+        assert '09:00' <= times[0] and times[-1] <= '21:00'
+    assert itinerary['score'] == pytest.approx(sum(x['score'] for day in itinerary['days'] for x in day['visits']),
+                                               rel=1e-5)
+
+
+def test_anytime_plan(city):
+    planner = Planner(city, max_workers=1)
+    session = planner.plan_anytime(TripProfile(MONDAY, '2021-05-05'), 0.1, 0.3)
+    first_score = session.get()[0].score
+
+    itinerary, version, done = session.wait(5)
+    assert done and version >= 1
+    assert itinerary.score >= first_score
+    assert isinstance(itinerary, Itinerary)
+
+
+def test_anytime_deadline_includes_building_the_problem(city, monkeypatch):
+    planner = Planner(city, max_workers=1)
+    build_problem = planner.build_problem
+
+    def slow_build_problem(profile):
+        time.sleep(0.08)
+        return build_problem(profile)
+
+    monkeypatch.setattr(planner, 'build_problem', slow_build_problem)
+    start = time.perf_counter()
+    session = planner.plan_anytime(TripProfile(MONDAY, '2021-05-09'), 0.1, 0.3)
+    assert time.perf_counter() - start < 0.125
+    session.wait(5)
+
+
+def test_open_mask_cached_per_weekdays_and_day(city):
+    planner = Planner(city, max_workers=1)
+    mask = planner.get_open_mask(TripProfile(MONDAY, '2021-05-04'))
+
+    expected = opening_mask(city.opening_hours, city.durations, np.array([0, 1]), str_to_minutes('09:00'),
+                            str_to_minutes('21:00'))
+    assert (mask == expected).all()
+    # same days of the week a week later
+    assert planner.get_open_mask(TripProfile('2021-05-10', '2021-05-11')) is mask
+    assert planner.get_open_mask(TripProfile(MONDAY, '2021-05-05')) is not mask
+    assert planner.get_open_mask(TripProfile(MONDAY, '2021-05-04', day_start='19:00')) is not mask
+
+
+def test_decomposed_solve_stops_at_time_limit():
+    venues = synthetic_city(2000, np.random.default_rng(0))
+    problem = PlanningProblem(venues, TripProfile(MONDAY, '2021-05-30'), HaversineTravelModel(venues.coordinates))
+
+    start = time.perf_counter()
+    routes = solve_decomposed(problem, 0.1)
+    assert time.perf_counter() - start < 0.35
+    check_plan(problem, routes, venues)
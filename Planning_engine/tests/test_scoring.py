@@ -0,0 +1,43 @@
+""" Tests of venue scoring, masks and top-K selection """
+import numpy as np
+from planning_engine.scoring import score_venues, budget_mask, opening_mask, top_k
+from planning_engine.constants import STYLES, BASE_SCORE
+from conftest import make_venues, OPEN_ALL_DAY, OFFICE_HOURS, EVENINGS, CLOSED_ON_MONDAY
+
+
+def test_score_venues():
+    styles = np.zeros((2, len(STYLES)), dtype=np.float32)
+    styles[0, 0], styles[1, 1] = 1.0, 0.5
+    preferences = np.ones(len(STYLES))
+    preferences[1] = 4
+
+    assert np.allclose(score_venues(styles, preferences), [1 + BASE_SCORE, 2 + BASE_SCORE])
+
+
+def test_top_k_matches_sort():
+    rng = np.random.default_rng(1)
+    scores = rng.random(1000).astype(np.float32)
+    mask = rng.random(1000) < 0.7
+
+    for k in [1, 10, 500, 2000]:
+        expected = np.flatnonzero(mask)[np.argsort(-scores[mask], kind='stable')][:k]
+        assert top_k(scores, mask, k).tolist() == expected.tolist()
+
+
+def test_budget_mask_keeps_unknown_prices():
+    prices = np.array([10, 40, np.nan, 60])
+
+    assert budget_mask(prices, 40).tolist() == [True, True, True, False]
+    assert budget_mask(prices, None).all()
+
+
+def test_opening_mask():
+    venues = make_venues(np.zeros((4, 2)), [60, 60, 240, 60], [OPEN_ALL_DAY, OFFICE_HOURS, EVENINGS, CLOSED_ON_MONDAY])
+
+    # Monday 09:00-21:00: evenings only leave 3 hours and the last venue is closed
+    monday = opening_mask(venues.opening_hours, venues.durations, np.array([0]), 540, 1260)
+    assert monday.tolist() == [True, True, False, False]
+
+    # Monday and Tuesday until midnight
+    both = opening_mask(venues.opening_hours, venues.durations, np.array([0, 1]), 540, 1440)
+    assert both.tolist() == [True, True, True, True]
@@ -0,0 +1,58 @@
+""" Tests of the spatial index against brute force distances """
+import numpy as np
+import pytest
+from planning_engine.spatial import SpatialIndex
+from planning_engine.travel import haversine
+
+CENTRE = (1.29, 103.85)
+
+
+@pytest.fixture
+def coordinates():
+    rng = np.random.default_rng(3)
+    return np.array(CENTRE) + rng.normal(scale=0.05, size=(500, 2))
+
+
+def test_within_radius(coordinates):
+    index = SpatialIndex(coordinates)
+    distances = haversine(np.array([CENTRE]), coordinates)[0]
+
+    for radius in [0.1, 1.0, 3.0, 50.0]:
+        indices, found = index.within_radius(CENTRE, radius)
+        assert set(indices.tolist()) == set(np.flatnonzero(distances <= radius).tolist())
+        assert np.allclose(found, distances[indices])
+        assert (np.diff(found) >= 0).all()
+
+
+def test_within_radius_mask(coordinates):
+    index = SpatialIndex(coordinates)
+    mask = np.arange(len(coordinates)) % 2 == 0
+
+    indices, _ = index.within_radius(CENTRE, 5.0, mask)
+    assert len(indices) and mask[indices].all()
+
+
+def test_nearest(coordinates):
+    index = SpatialIndex(coordinates)
+    distances = haversine(np.array([CENTRE]), coordinates)[0]
+
+    indices, found = index.nearest(CENTRE, 10)
+    assert indices.tolist() == np.argsort(distances, kind='stable')[:10].tolist()
+
+    # more venues than available returns all of them
+    indices, _ = index.nearest((1.5, 104.0), len(coordinates) + 5)
+    assert len(indices) == len(coordinates)
+
+
+def test_within_bbox(coordinates):
+    index = SpatialIndex(coordinates)
+    box = (1.27, 103.83, 1.31, 103.9)
+
+    expected = np.flatnonzero((coordinates[:, 0] >= box[0]) & (coordinates[:, 0] <= box[2]) &
+                              (coordinates[:, 1] >= box[1]) & (coordinates[:, 1] <= box[3]))
+    assert index.within_bbox(*box).tolist() == expected.tolist()
+
+
+def test_empty_index():
+    with pytest.raises(ValueError):
+        SpatialIndex(np.empty((0, 2)))
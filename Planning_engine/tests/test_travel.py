@@ -0,0 +1,52 @@
+""" Tests of travelling times and the travel time matrix """
+import numpy as np
+import pytest
+from planning_engine.travel import haversine, distance_to_time, HaversineTravelModel, TravelTimeMatrix, \
+    LocalRoutingStandIn, build_travel_matrix
+
+
+@pytest.fixture
+def coordinates():
+    return np.array([1.29, 103.85]) + np.random.default_rng(5).normal(scale=0.02, size=(30, 2))
+
+
+def test_haversine():
+    # one degree of latitude is about 111.2 km
+    assert np.allclose(haversine(np.array([[0.0, 0.0]]), np.array([[1.0, 0.0], [0.0, 0.0]])), [[111.19, 0.0]],
+                       atol=0.01)
+
+
+def test_distance_to_time():
+    # walk up to 1 km at 5 km/h, ride at 20 km/h beyond that, plus 10 minutes for every trip
+    times = distance_to_time(np.array([0.0, 0.5, 10.0]), [(1.0, 5.0), (None, 20.0)], 10.0)
+    assert np.allclose(times, [0.0, 16.0, 40.0])
+
+
+def test_matrix_round_trip(coordinates, tmp_path):
+    path = build_travel_matrix(coordinates, str(tmp_path / 'TravelTimes.npy'), block_size=7)
+    matrix = TravelTimeMatrix(path, coordinates)
+    model = HaversineTravelModel(coordinates)
+
+    assert matrix.matrix.dtype == np.float32
+    indices = np.array([4, 0, 17, 29])
+    hotel = np.array([[1.3, 103.86]])
+    assert np.allclose(matrix.submatrix(indices, hotel), model.submatrix(indices, hotel), atol=1e-3)
+    assert np.allclose(matrix.submatrix(indices), model.submatrix(indices), atol=1e-3)
+
+
+def test_matrix_with_routing(coordinates, tmp_path):
+    routing = LocalRoutingStandIn()
+    path = build_travel_matrix(coordinates, str(tmp_path / 'TravelTimes.npy'), routing=routing)
+    matrix = TravelTimeMatrix(path, coordinates, routing=routing)
+
+    indices = np.arange(len(coordinates))
+    model = HaversineTravelModel(coordinates, routing=routing)
+    assert np.allclose(matrix.submatrix(indices), model.submatrix(indices), atol=1e-3)
+    assert not np.allclose(matrix.submatrix(indices), HaversineTravelModel(coordinates).submatrix(indices))
+
+
+def test_matrix_of_other_venues_rejected(coordinates, tmp_path):
+    path = build_travel_matrix(coordinates, str(tmp_path / 'TravelTimes.npy'))
+
+    with pytest.raises(ValueError):
+        TravelTimeMatrix(path, coordinates + 0.001)
@@ -142,4 +142,52 @@ CITIES_LIGHT_TRANSLATION_LANGUAGES = ['en']
 
 CITIES_LIGHT_INCLUDE_CITY_TYPES = ['PPLC']
 
-DJANGO_TABLES2_TEMPLATE = "django_tables2/bootstrap4.html"
\ No newline at end of file
+DJANGO_TABLES2_TEMPLATE = "django_tables2/bootstrap4.html"
+
+# Planning engine - installed as a package (see README.txt), its data folder is read from here
+# venue table written by the data wrangler is used to plan the itinerary - published here by 'python -m data_wrangler'
+# (see --publish), itineraries cannot be planned until it is
+PLANNING_ENGINE_DIR = os.path.join(BASE_DIR.parent.parent, 'Planning_engine')
+
+VENUE_DATA_PATH = os.path.join(PLANNING_ENGINE_DIR, 'data', 'TripPlannerData.pkl')
+
+# travel time matrix built with 'python -m planning_engine matrix' - travelling times are calculated on the fly if missing
+TRAVEL_MATRIX_PATH = os.path.join(PLANNING_ENGINE_DIR, 'data', 'TravelTimes.npy')
+
+# number of itineraries kept in each process and time (seconds) itineraries are kept in the django cache
+PLAN_CACHE_SIZE = 256
+PLAN_CACHE_TIMEOUT = 24 * 60 * 60
+
+# a first itinerary is shown within PLAN_FIRST_DEADLINE (seconds) and improved in the background for PLAN_TIME_LIMIT (seconds)
+PLAN_FIRST_DEADLINE = 0.1
+PLAN_TIME_LIMIT = 5.0
+
+# other venues within NEARBY_VENUES_RADIUS (km) of each visit shown on the itinerary, at most NEARBY_VENUES_LIMIT
+NEARBY_VENUES_RADIUS = 1.0
+NEARBY_VENUES_LIMIT = 3
+
+# Kayak scrapes are queued by the search pages and run by 'python manage.py scrape_worker'
+# number of worker processes, seconds between checks of an empty queue and seconds before a running job is
+# considered lost (e.g. worker killed) and queued again
+SCRAPE_WORKERS = 2
+SCRAPE_JOB_POLL_INTERVAL = 1.0
+SCRAPE_JOB_TIMEOUT = 15 * 60
+
+# chrome drivers kept running by each scrape worker (also used to load hotel details pages at the same time) and
+# number of scrapes before a driver is replaced
+DRIVER_POOL_SIZE = 4
+DRIVER_MAX_USES = 50
+
+# seconds flights and accommodations found by a kayak search are shown to other users doing the same search
+FLIGHT_RESULTS_TTL = 30 * 60
+ACCOM_RESULTS_TTL = 30 * 60
+
+# read kayak results from the json responses of the results page instead of the rendered page - falls back to the
+# page if the responses are not recognised. Off until the json fields are checked against recorded kayak responses:
+# if they do not match, every scrape first waits for the json responses and then loads the page again
+KAYAK_CAPTURE_JSON = False
+
+# airport codes used to build kayak flight urls - index is built from the csv with 'python manage.py build_iata_index'
+IATA_CSV_PATH = os.path.join(BASE_DIR.parent.parent, 'Miscellaneous', 'airport_codes_iata_only.csv')
+
+IATA_INDEX_PATH = os.path.join(BASE_DIR, 'search', 'data', 'iata_index.json')
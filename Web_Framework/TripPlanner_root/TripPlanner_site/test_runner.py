@@ -0,0 +1,70 @@
+"""Test runner of the SQLite test database (see test_settings)
+
+   SQLite has no array columns. While the tests run, ArrayFields are stored as json text on SQLite: text column, no
+   array cast in the placeholder and json in and out. The fields are patched when the test environment is set up
+   and restored when it is torn down - nothing is patched outside of the test runner and PostgreSQL is not affected.
+"""
+
+import json
+from django.contrib.postgres.fields import ArrayField
+from django.test.runner import DiscoverRunner
+
+
+def _db_type(original):
+    def db_type(self, connection):
+        """Array column on PostgreSQL, text column on SQLite"""
+        return 'text' if connection.vendor == 'sqlite' else original(self, connection)
+    return db_type
+
+
+def _get_db_prep_value(original):
+    def get_db_prep_value(self, value, connection, prepared=False):
+        """List as json on SQLite"""
+        if connection.vendor == 'sqlite':
+            return json.dumps(value) if value is not None else None
+        return original(self, value, connection, prepared)
+    return get_db_prep_value
+
+
+def _get_placeholder(original):
+    def get_placeholder(self, value, compiler, connection):
+        """No array cast on SQLite"""
+        return '%s' if connection.vendor == 'sqlite' else original(self, value, compiler, connection)
+    return get_placeholder
+
+
+def _from_db_value(original):
+    def from_db_value(self, value, expression, connection):
+        """List from json on SQLite"""
+        if connection.vendor == 'sqlite' and isinstance(value, str):
+            return json.loads(value)
+        return original(self, value, expression, connection) if original else value
+    return from_db_value
+
+
+# ArrayField methods patched while the tests run
+SQLITE_PATCHES = {'db_type': _db_type,
+                  'get_db_prep_value': _get_db_prep_value,
+                  'get_placeholder': _get_placeholder,
+                  'from_db_value': _from_db_value}
+
+
+class SQLiteTestRunner(DiscoverRunner):
+    """Runs the tests with ArrayFields stored as json text on SQLite"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        # keep the methods defined on ArrayField itself (None if inherited) to restore them afterwards
+        self._array_methods = {name: ArrayField.__dict__.get(name) for name in SQLITE_PATCHES}
+        for name, patch in SQLITE_PATCHES.items():
+            setattr(ArrayField, name, patch(getattr(ArrayField, name, None)))
+
+    def teardown_test_environment(self, **kwargs):
+        for name, method in self._array_methods.items():
+            if method is None:
+                delattr(ArrayField, name)
+            else:
+                setattr(ArrayField, name, method)
+
+        super().teardown_test_environment(**kwargs)
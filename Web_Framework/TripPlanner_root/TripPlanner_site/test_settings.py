@@ -0,0 +1,18 @@
+"""Settings to run the tests on an in-memory SQLite database
+
+   python manage.py test search --settings=TripPlanner_site.test_settings
+
+   SQLite has no array columns - the test runner (see test_runner) stores ArrayFields as json text while the tests
+   run. Nothing is patched by importing these settings and no database file is written.
+"""
+
+from .settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+TEST_RUNNER = 'TripPlanner_site.test_runner.SQLiteTestRunner'
@@ -1,19 +1,35 @@
 # try scraping kayak for accomodation details
 
 import time
+import queue
 import datetime
+import threading
 from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
 try:
     from .kayak import Kayak
+    from .kayak_parser import RESULTS_XPATH, parse_accom_results
+    from .kayak_json import ACCOM_JSON_KEYWORDS, map_accom_results
 except ImportError:
     from kayak import Kayak
+    from kayak_parser import RESULTS_XPATH, parse_accom_results
+    from kayak_json import ACCOM_JSON_KEYWORDS, map_accom_results
 try:
     from .models import AccomDatabase
 except ImportError:
     pass
 
 
+# fields scraped from the details page of an accommodation
+ACCOM_DETAIL_FIELDS = ['address', 'phone_number', 'website', 'description', 'rating', 'images_url', 'check_in',
+                       'check_out']
+
+# seconds to wait for the details page of an accommodation to open in a new window and start loading
+DETAILS_WINDOW_TIMEOUT = 10
+
+
 class DefaultUserProfile:
     # build default user accom profile
     # depart date is one month from today
@@ -29,9 +45,9 @@ class DefaultUserProfile:
 
 
 class KayakAccom(Kayak):
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, driver=None, capture=False):
         """Build kayak scraper class for accommodation"""
-        super().__init__(headless)
+        super().__init__(headless, driver, capture)
 
         # initiate default user profile
         self.user_profile_default = DefaultUserProfile()
@@ -115,11 +131,7 @@ class KayakAccom(Kayak):
         temp_dict['hotel_name'] = hotel_name
 
         # (2) number of stars
-        try:
-            temp_dict['stars'] = ele.find_element_by_css_selector("div[class=' col col-stars']"). \
-                find_element_by_css_selector("div[aria-label*='Rating Score']").get_attribute("data-count")
-        except NoSuchElementException:
-            temp_dict['stars'] = None
+        temp_dict['stars'] = self._get_stars(ele)
 
         # jump into detail page to get more information
         # get the window handles using window_handles( ) method
@@ -136,18 +148,69 @@ class KayakAccom(Kayak):
         # switch to new window
         self.driver.switch_to.window(details_window)
 
+        # (3) - (9) details on the page
+        temp_dict.update(self._scrape_details_page(self.driver, piclimit))
+
+        # switch back to default window
+        self.driver.close()
+        self.driver.switch_to.window(window_before)
+
+        print(temp_dict)
+
+        return temp_dict
+
+    @staticmethod
+    def _get_stars(ele):
+        """Get number of stars of the accommodation in the results list"""
+        try:
+            return ele.find_element_by_css_selector("div[class=' col col-stars']"). \
+                find_element_by_css_selector("div[aria-label*='Rating Score']").get_attribute("data-count")
+        except NoSuchElementException:
+            return None
+
+    def _get_details_url(self, ele):
+        """Get url of the details page of the accommodation in the results list
+
+           Kayak opens the details page in a new window - the page is opened to read its url. Raises TimeoutException
+           if the window does not open or leave about:blank within DETAILS_WINDOW_TIMEOUT seconds.
+        """
+        handles_before = self.driver.window_handles
+        ele.find_element_by_css_selector("div[class='col col-title']").find_element_by_css_selector(
+            "button").click()
+
+        wait = WebDriverWait(self.driver, DETAILS_WINDOW_TIMEOUT)
+        try:
+            wait.until(EC.number_of_windows_to_be(len(handles_before) + 1))
+            self.driver.switch_to.window([x for x in self.driver.window_handles if x not in handles_before][0])
+            wait.until(lambda driver: driver.current_url != 'about:blank')
+            url = self.driver.current_url
+        finally:
+            # close the details window (if it opened) so the results list is left as it was
+            for handle in self.driver.window_handles:
+                if handle not in handles_before:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+            self.driver.switch_to.window(handles_before[0])
+
+        return url
+
+    @staticmethod
+    def _scrape_details_page(driver, piclimit):
+        """Scrape details of the accommodation from its details page loaded in the driver"""
+        temp_dict = {}
+
         # (3) address
         address = None
         try:
             address = "{}, {}, {}, {}".format(
-                self.driver.find_element_by_css_selector("span[itemprop='streetAddress']").text,
-                self.driver.find_element_by_css_selector("span[itemprop='addressLocality']").text,
-                self.driver.find_element_by_css_selector("span[itemprop='postalCode']").text,
-                self.driver.find_element_by_css_selector("span[itemprop='addressCountry']").text
+                driver.find_element_by_css_selector("span[itemprop='streetAddress']").text,
+                driver.find_element_by_css_selector("span[itemprop='addressLocality']").text,
+                driver.find_element_by_css_selector("span[itemprop='postalCode']").text,
+                driver.find_element_by_css_selector("span[itemprop='addressCountry']").text
             )
         except NoSuchElementException:
             try:
-                address = self.driver.find_element_by_css_selector("div[class*='address']").text
+                address = driver.find_element_by_css_selector("div[class*='address']").text
             except NoSuchElementException:
                 pass
 
@@ -156,39 +219,39 @@ class KayakAccom(Kayak):
         # (4) phone number
         temp_dict['phone_number'] = None
         try:
-            temp_dict['phone_number'] = self.driver.find_element_by_css_selector("a[class='phone']").text
+            temp_dict['phone_number'] = driver.find_element_by_css_selector("a[class='phone']").text
         except NoSuchElementException:
             pass
 
         # (5) kayak website - remove info about searches
-        details_url = self.driver.current_url
+        details_url = driver.current_url
         temp_dict['website'] = details_url[:details_url.find('-details/') + 9]
 
         # (6) description
         temp_dict['description'] = None
         try:
-            temp_dict['description'] = self.driver.find_element_by_css_selector(
+            temp_dict['description'] = driver.find_element_by_css_selector(
                 "div[class='overview-container']").text
         except NoSuchElementException:
             try:
-                temp_dict['description'] = self.driver.find_element_by_xpath("//div[@class='b40a-descText']").text
+                temp_dict['description'] = driver.find_element_by_xpath("//div[@class='b40a-descText']").text
             except NoSuchElementException:
                 pass
 
         # (7) rating
         temp_dict['rating'] = None
         try:
-            temp_dict['rating'] = self.driver.find_element_by_css_selector("div[class='rating']").text
+            temp_dict['rating'] = driver.find_element_by_css_selector("div[class='rating']").text
         except NoSuchElementException:
             try:
-                temp_dict['rating'] = self.driver.find_element_by_xpath("//div[@class='b40a-ratingScore']").text
+                temp_dict['rating'] = driver.find_element_by_xpath("//div[@class='b40a-ratingScore']").text
             except NoSuchElementException:
                 pass
 
         # (8) pictures
         images_url = []
         try:
-            all_img = self.driver.find_element_by_css_selector("div[class='col-photos onestop']")
+            all_img = driver.find_element_by_css_selector("div[class='col-photos onestop']")
             for ite, img_ele in enumerate(all_img.find_elements_by_css_selector("img")):
                 temp_url = img_ele.get_attribute("src")
 
@@ -205,11 +268,11 @@ class KayakAccom(Kayak):
         except NoSuchElementException:
             try:
                 # click view all photos to open a new window
-                self.driver.find_element_by_xpath("//div[contains(text(), 'View all photos')]").click()
+                driver.find_element_by_xpath("//div[contains(text(), 'View all photos')]").click()
                 time.sleep(1)
 
                 # start saving photos
-                for ite, img_ele in enumerate(self.driver.find_elements_by_xpath("//img[contains(@class, 'photo')]")):
+                for ite, img_ele in enumerate(driver.find_elements_by_xpath("//img[contains(@class, 'photo')]")):
                     temp_url = img_ele.get_attribute("src")
 
                     # cut off css style
@@ -223,10 +286,9 @@ class KayakAccom(Kayak):
                     if ite >= piclimit - 1:
                         break
 
-                # selenium switch back to details window
-                self.driver.refresh()
+                # close photos
+                driver.refresh()
                 time.sleep(1)
-                self.driver.switch_to.window(details_window)
             except NoSuchElementException:
                 pass
 
@@ -236,7 +298,7 @@ class KayakAccom(Kayak):
         temp_dict['check_in'] = None
         temp_dict['check_out'] = None
         try:
-            for policy in self.driver.find_element_by_css_selector("section[aria-label='Policies"). \
+            for policy in driver.find_element_by_css_selector("section[aria-label='Policies"). \
                     find_elements_by_css_selector("div[class='box']"):
 
                 if 'check in' in policy.text.lower():
@@ -247,86 +309,152 @@ class KayakAccom(Kayak):
             # if fail, it might be in different format
             # try scraping different stuff
             try:
-                policy = self.driver.find_element_by_css_selector("div[data-code='checkinCheckout']"). \
+                policy = driver.find_element_by_css_selector("div[data-code='checkinCheckout']"). \
                     find_element_by_css_selector("div[class='Fa11-description']").text
                 temp_dict['check_in'] = policy.split(",")[0].split(" ")[-1]
                 temp_dict['check_out'] = policy.split(",")[1].split(" ")[-1]
             except NoSuchElementException:
                 pass
 
-        # switch back to default window
-        self.driver.close()
-        self.driver.switch_to.window(window_before)
+        return temp_dict
 
-        print(temp_dict)
+    def fetch_accom_details(self, urls, piclimit, pool=None, positions=None):
+        """Scrape details pages of the urls, returns list of dictionaries in the same order
 
-        return temp_dict
+           Pages are loaded by the driver of the scraper and by drivers leased from the pool (if given) at the same
+           time, so the number of pages loaded at once is up to the size of the pool plus one.
+
+           positions: position in the results list (open in the driver of the scraper) of every url that is None.
+           The driver of the scraper first opens these details pages from the results list to read their urls, while
+           the drivers of the pool already load the pages found so far.
+        """
+        tasks = queue.Queue()
+        to_resolve = []
+        for i, url in enumerate(urls):
+            if url is not None:
+                tasks.put((i, url))
+            elif positions is not None and positions[i] is not None:
+                to_resolve.append(i)
+        details = [None] * len(urls)
+
+        def work(driver):
+            # keep loading pages until told to stop - all urls have been queued by then
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                i, url = task
+                try:
+                    driver.get(url)
+                    time.sleep(5)
+                    details[i] = self._scrape_details_page(driver, piclimit)
+                except Exception as e:
+                    print("Failed to scrape details from {}: {}".format(url, e))
+
+        def work_with_lease():
+            # other drivers are busy - pages are left to the drivers that are running
+            try:
+                with pool.lease(timeout=1) as driver:
+                    work(driver)
+            except queue.Empty:
+                pass
 
-    def get_accoms_for_user(self, user, db_flag, acclimit=10, piclimit=5):
+        no_of_pages = tasks.qsize() + len(to_resolve)
+        no_of_leases = min(pool.size, no_of_pages - 1) if pool is not None else 0
+        threads = [threading.Thread(target=work_with_lease) for _ in range(no_of_leases)]
+        for thread in threads:
+            thread.start()
+
+        # read urls not linked in the results list while the other drivers load pages
+        try:
+            for i in to_resolve:
+                try:
+                    ele = self.driver.find_elements_by_xpath(RESULTS_XPATH)[positions[i]]
+                    tasks.put((i, self._get_details_url(ele)))
+                except Exception as e:
+                    print("Failed to open details page of result {}: {}".format(positions[i], e))
+        finally:
+            # one stop signal for every driver, queued after all pages
+            for _ in range(len(threads) + 1):
+                tasks.put(None)
+
+        work(self.driver)
+        for thread in threads:
+            thread.join()
+
+        return details
+
+    def get_accoms_for_user(self, user, db_flag, acclimit=10, piclimit=5, pool=None):
         """Scrap to get real time prices of accomodation depends on the user profile
 
            Also store details of the accommodation from database into the return dictionary
 
-           If details of the specific accommodation has not been built, details will be scraped on the spot
+           If details of the specific accommodation has not been built, details pages will be scraped at the same time
+           with drivers of the pool (see fetch_accom_details) and stored in the database in one go
         """
         # get url
         url = self.accom_url_builder(user)
 
-        # load driver to the website and give consent
-        self.load_wbdriver(url)
+        # (1) get results - from the json responses if capturing them, no need to wait for the page
+        results = []
+        if self.capture:
+            results = map_accom_results(self.capture_json(url, ACCOM_JSON_KEYWORDS), self.base_url, acclimit)
+            if not results:
+                print("Accommodation results not found in json responses. Have to scrap results page...")
 
-        # load more results
-        self.show_more_results(acclimit, 20)
+        from_page = not results
+        if from_page:
+            # load driver to the website and give consent
+            self.load_wbdriver(url)
 
-        # get results
-        accom_list = []
-
-        # load x amount of accommodation depends on user specified limit
-        for count, ele in enumerate(
-                self.driver.find_elements_by_xpath("//div[@id='searchResultsList']//div[@class='resultWrapper']")):
+            # load more results
+            self.show_more_results(acclimit, 20)
 
-            temp_dict = {}
+            # parse page source in one go instead of reading every element through the webdriver
+            results = parse_accom_results(self.driver.page_source, self.base_url, acclimit)
 
-            # (1) hotel name
-            hotel_name = ele.find_element_by_css_selector("span[class='titleContainer']").text
-            temp_dict['hotel_name'] = hotel_name
+        accom_list = []
+        urls = {}
+        for position, temp_dict in enumerate(results):
+            urls.setdefault(temp_dict['hotel_name'], (position, temp_dict.pop('url'), temp_dict.pop('stars')))
 
-            # (2) price
-            temp_dict['price'] = ele.find_element_by_css_selector("div[id*='booking-price']").text
+            # store to master dict
+            accom_list.append(temp_dict)
 
-            # check if hotel details already in database provided flag is true
-            accdetails = {}
-            if db_flag:
-                accom_obj = AccomDatabase.objects.filter(hotel_name=hotel_name)
-                if accom_obj:
-                    # take first object
-                    accdetails = vars(accom_obj[0])
+        # (2) check which hotel details are already in database provided flag is true - one query for all hotels
+        known = AccomDatabase.objects.get_details(urls) if db_flag else {}
 
-            # does not exist then have to scrap for the details and store the data back to database if got connection
-            if not accdetails:
-                accdetails = self._get_accom_detail(ele, piclimit)
+        # does not exist then have to scrap for the details
+        missing = {}
+        positions = []
+        for hotel_name, (position, details_url, stars) in urls.items():
+            if hotel_name not in known:
                 print("Database for {} not available. Have to scrap website for additional info...".format(hotel_name))
+                missing[hotel_name] = {'hotel_name': hotel_name, 'stars': stars, 'url': details_url}
+                # details page not linked - opened from the results list while other pages are loaded
+                positions.append(position if details_url is None and from_page else None)
 
-                # store database if flag is on
-                if db_flag:
-                    AccomDatabase.objects.create_accom(accdetails)
-                    print("Database for {} successfully added...".format(hotel_name))
+        # (3) scrape details pages
+        details = self.fetch_accom_details([x['url'] for x in missing.values()], piclimit, pool, positions)
+        for accdetails, page_details in zip(missing.values(), details):
+            del accdetails['url']
+            accdetails.update(page_details or {field: None for field in ACCOM_DETAIL_FIELDS})
 
-            # store hotel details to dictionary
-            temp_dict.update(accdetails)
+        # (4) store details back to database in one go if flag is on - accommodations without details page are not
+        if db_flag and missing:
+            created = AccomDatabase.objects.create_accoms([x for x in missing.values() if x['website']])
+            print("Database for {} accommodations successfully added...".format(len(created)))
+
+        # store hotel details to dictionary
+        for temp_dict in accom_list:
+            temp_dict.update(known.get(temp_dict['hotel_name']) or missing[temp_dict['hotel_name']])
 
             # edit the website to be relevant based on user profile
-            temp_dict['website'] = "{}{}/{}/{}".format(temp_dict['website'],
+            temp_dict['website'] = "{}{}/{}/{}".format(temp_dict['website'] or '',
                                                         self._url_dates(user),
                                                         self._url_people(user),
                                                         self._url_rooms(user))
 
-            # store to master dict
-            accom_list.append(temp_dict)
-
-            if count >= acclimit - 1:
-                break
-
         return accom_list
 
     def build_accom_database(self, acclimit=10, piclimit=5):
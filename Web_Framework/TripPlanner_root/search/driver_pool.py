@@ -0,0 +1,178 @@
+"""Keeps chrome webdrivers running between kayak scrapes
+
+   Starting chrome and accepting the cookie consent of kayak takes several seconds on every search. The pool starts
+   drivers up front, gives consent once per driver and lends them out to scrapes. Drivers are checked before they are
+   lent out and replaced after a number of uses or when a scrape fails with them.
+"""
+
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from .kayak import Kayak, create_driver
+
+
+class DriverPool:
+    def __init__(self, size, headless=True, max_uses=50, capture=False):
+        """Pool of size webdrivers, each replaced after max_uses leases
+
+           capture: start drivers recording network traffic so scrapers can read json results (see Kayak.capture_json)
+        """
+        self.size = size
+        self.headless = headless
+        self.max_uses = max_uses
+        self.capture = capture
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._metrics = {'started': 0, 'recycled': 0, 'failed_checks': 0, 'leases': 0, 'errors': 0,
+                         'failed_starts': 0, 'wait_time': 0.0, 'start_time': 0.0}
+
+        # idle slots without a driver (None) start one when leased, e.g. after a driver failed to restart
+        for _ in range(size):
+            self._idle.put(self._start_driver())
+
+    def _start_driver(self):
+        """Start a driver and accept cookie consent of kayak so scrapes can start straight away"""
+        start = time.perf_counter()
+        driver = None
+        try:
+            kayak = Kayak(self.headless, create_driver(self.headless, self.capture))
+            driver = kayak.driver
+
+            kayak.driver.get(kayak.base_url)
+            time.sleep(5)
+            kayak._give_consent()
+            driver.consent_given = True
+        except Exception:
+            # chrome started already is closed, otherwise it keeps running without being used
+            with self._lock:
+                self._metrics['failed_starts'] += 1
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            raise
+
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self._metrics['started'] += 1
+            self._metrics['start_time'] += time.perf_counter() - start
+
+        return driver
+
+    def _quit_driver(self, driver):
+        """Close driver - it is not used again"""
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(driver):
+        """Check the browser still responds"""
+        try:
+            return driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Lend a driver out for the with block, e.g. with pool.lease() as driver: ...
+
+           Waits up to timeout seconds (forever if None) for a driver to be returned if all are in use. The driver is
+           replaced if the block raises an error or it has been used max_uses times.
+        """
+        start = time.perf_counter()
+        driver = self._idle.get(timeout=timeout)
+        try:
+            if driver is not None and not self._is_healthy(driver):
+                self._quit_driver(driver)
+                driver = None
+                with self._lock:
+                    self._metrics['failed_checks'] += 1
+            if driver is None:
+                driver = self._start_driver()
+        except Exception:
+            # keep the slot so the pool does not shrink
+            self._idle.put(None)
+            raise
+
+        with self._lock:
+            self._uses[id(driver)] += 1
+            self._metrics['leases'] += 1
+            self._metrics['wait_time'] += time.perf_counter() - start
+
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # start from a clean window for the next scrape
+            if not failed:
+                try:
+                    for handle in driver.window_handles[1:]:
+                        driver.switch_to.window(handle)
+                        driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
+                except Exception:
+                    failed = True
+
+            if failed or self._uses[id(driver)] >= self.max_uses:
+                with self._lock:
+                    self._metrics['errors' if failed else 'recycled'] += 1
+                self._quit_driver(driver)
+                try:
+                    driver = self._start_driver()
+                except Exception:
+                    driver = None
+            self._idle.put(driver)
+
+    def metrics(self):
+        """Return counters of the pool as a dictionary"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['size'] = self.size
+        metrics['idle'] = self._idle.qsize()
+        metrics['in_use'] = self.size - metrics['idle']
+        metrics['mean_wait_time'] = metrics['wait_time'] / metrics['leases'] if metrics['leases'] else 0.0
+        metrics['mean_start_time'] = metrics['start_time'] / metrics['started'] if metrics['started'] else 0.0
+
+        return metrics
+
+    def close(self):
+        """Quit all idle drivers"""
+        while not self._idle.empty():
+            driver = self._idle.get_nowait()
+            if driver is not None:
+                self._quit_driver(driver)
+
+
+# drivers are started on first use in each worker process
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return driver pool of the process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(settings.DRIVER_POOL_SIZE, max_uses=settings.DRIVER_MAX_USES,
+                               capture=settings.KAYAK_CAPTURE_JSON)
+    return _pool
+
+
+def close_driver_pool():
+    """Quit drivers of the process, e.g. when the worker stops"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
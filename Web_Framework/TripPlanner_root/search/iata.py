@@ -0,0 +1,186 @@
+"""Looks up IATA codes of the airports serving a city
+
+   The airport codes csv is boiled down once into a small json index (python manage.py build_iata_index):
+   normalised city name -> IATA codes (biggest airports first) and the coordinates and type of every large and medium
+   airport.
+   The index is loaded once per process on first use and lookups are memoised.
+
+   Cities are matched by name, then by alias (e.g. Bombay -> Mumbai), then by the closest name. If nothing matches,
+   the biggest airport near the coordinates of the city is taken.
+"""
+
+import json
+import difflib
+import threading
+import unicodedata
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+# airport types kept - biggest first. Closed airports, heliports and seaplane bases are not served by kayak
+AIRPORT_TYPES = ['large_airport', 'medium_airport', 'small_airport']
+
+# airport types used when looking for the airport nearest to a city
+NEAREST_AIRPORT_TYPES = ['large_airport', 'medium_airport']
+
+# airports within this distance (km) of a city are taken biggest first, e.g. Changi (large) rather than Seletar
+# (medium) for central Singapore - airports further away are taken nearest first
+NEAREST_AIRPORT_RADIUS = 50.0
+
+# other names of cities - keys and values are normalised names
+CITY_ALIASES = {'new york city': 'new york',
+                'nyc': 'new york',
+                'bombay': 'mumbai',
+                'calcutta': 'kolkata',
+                'madras': 'chennai',
+                'peking': 'beijing',
+                'saigon': 'ho chi minh city',
+                'canton': 'guangzhou',
+                'rangoon': 'yangon',
+                'kyiv': 'kiev',
+                'washington d.c.': 'washington',
+                'washington dc': 'washington'}
+
+# codes of all airports of cities with several big airports - kayak searches all of them
+METRO_CODES = {'london': 'LON',
+               'new york': 'NYC',
+               'paris': 'PAR',
+               'tokyo': 'TYO',
+               'milan': 'MIL',
+               'moscow': 'MOW',
+               'washington': 'WAS',
+               'chicago': 'CHI',
+               'stockholm': 'STO',
+               'rome': 'ROM',
+               'seoul': 'SEL',
+               'sao paulo': 'SAO',
+               'osaka': 'OSA',
+               'beijing': 'BJS',
+               'jakarta': 'JKT'}
+
+# closest city names must be at least this similar (0 to 1)
+FUZZY_CUTOFF = 0.85
+
+# radius of the earth in km
+EARTH_RADIUS = 6371.0
+
+
+def normalise_city(name):
+    """Lower case city name without accents or extra spaces, e.g. 'São  Paulo' -> 'sao paulo'"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(name.lower().split())
+
+
+def build_iata_index(csv_path, output_path):
+    """Build json index of the airport codes csv (columns type, municipality, iata_code and coordinates 'lng, lat')"""
+    df = pd.read_csv(csv_path, usecols=['type', 'municipality', 'iata_code', 'coordinates'])
+    df = df[df['type'].isin(AIRPORT_TYPES) & df['iata_code'].notna()].copy()
+
+    # biggest airports first
+    df['rank'] = df['type'].map({x: i for i, x in enumerate(AIRPORT_TYPES)})
+    df = df.sort_values(['rank', 'iata_code'], kind='stable')
+
+    cities = {}
+    for city, code in zip(df['municipality'], df['iata_code']):
+        if pd.notna(city):
+            codes = cities.setdefault(normalise_city(city), [])
+            if code not in codes:
+                codes.append(code)
+
+    nearest = df[df['type'].isin(NEAREST_AIRPORT_TYPES)]
+    lng_lat = nearest['coordinates'].str.split(',', expand=True).astype(float)
+    airports = {'codes': nearest['iata_code'].tolist(),
+                'coordinates': np.round(lng_lat[[1, 0]].to_numpy(), 4).tolist(),
+                'types': nearest['type'].tolist()}
+
+    with open(output_path, 'w') as file_handle:
+        json.dump({'cities': cities, 'airports': airports}, file_handle, separators=(',', ':'))
+
+    return output_path
+
+
+class IataLookup:
+    def __init__(self, cities, airport_codes, airport_coordinates, airport_types=None):
+        """IATA code lookup
+
+           cities: normalised city name -> IATA codes of its airports, biggest first
+           airport_codes, airport_coordinates: codes and (lat, lng) of airports to fall back on by distance
+           airport_types: type of every airport (see AIRPORT_TYPES) - all airports are taken as large if not given
+        """
+        self.cities = cities
+        self.airport_codes = np.asarray(airport_codes)
+        self.airport_coordinates = np.radians(np.asarray(airport_coordinates, dtype=np.float64).reshape(-1, 2))
+        ranks = {x: i for i, x in enumerate(AIRPORT_TYPES)}
+        self.airport_ranks = np.array([ranks[x] for x in airport_types] if airport_types is not None else
+                                      np.zeros(len(self.airport_codes)), dtype=np.int8)
+        self._names = list(cities)
+
+    @classmethod
+    def load(cls, path):
+        """Load index written by build_iata_index"""
+        with open(path) as file_handle:
+            index = json.load(file_handle)
+        return cls(index['cities'], index['airports']['codes'], index['airports']['coordinates'],
+                   index['airports'].get('types'))
+
+    @lru_cache(maxsize=1024)
+    def match_city(self, name):
+        """Normalised name of the city in the index matching the name given, or None"""
+        name = normalise_city(name)
+        name = CITY_ALIASES.get(name, name)
+        if name in self.cities:
+            return name
+
+        close = difflib.get_close_matches(name, self._names, n=1, cutoff=FUZZY_CUTOFF)
+        return close[0] if close else None
+
+    def codes(self, name):
+        """IATA codes of the airports of the city, biggest first (empty if the city is not found)"""
+        city = self.match_city(name)
+        return list(self.cities[city]) if city is not None else []
+
+    def nearest(self, latitude, longitude, k=1):
+        """IATA codes of k airports near the location - biggest first within NEAREST_AIRPORT_RADIUS, then nearest
+           first
+        """
+        lat, lng = np.radians(float(latitude)), np.radians(float(longitude))
+        a = np.sin((self.airport_coordinates[:, 0] - lat) / 2) ** 2 + np.cos(lat) * \
+            np.cos(self.airport_coordinates[:, 0]) * np.sin((self.airport_coordinates[:, 1] - lng) / 2) ** 2
+        distances = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+        # airports further away than the radius all rank after the smallest type near the location
+        ranks = np.where(distances <= NEAREST_AIRPORT_RADIUS, self.airport_ranks, len(AIRPORT_TYPES))
+
+        return self.airport_codes[np.lexsort((distances, ranks))[:k]].tolist()
+
+    def get_code(self, name, coordinates=None):
+        """IATA code to search flights from/to the city - metropolitan area code if it has several big airports
+
+           coordinates: (lat, lng) of the city, the biggest airport near it is taken if the city is not found
+        """
+        city = self.match_city(name)
+        if city is not None:
+            return METRO_CODES.get(city, self.cities[city][0])
+
+        if coordinates is not None and None not in coordinates and len(self.airport_codes):
+            return self.nearest(*coordinates)[0]
+
+        raise ValueError('No airport found for {}...'.format(name))
+
+
+# index is loaded on first use in each process
+_lookup = None
+_lookup_lock = threading.Lock()
+
+
+def get_iata_lookup():
+    """Return IATA lookup of the process - index is built from the csv first if missing"""
+    global _lookup
+    with _lookup_lock:
+        if _lookup is None:
+            try:
+                _lookup = IataLookup.load(settings.IATA_INDEX_PATH)
+            except FileNotFoundError:
+                _lookup = IataLookup.load(build_iata_index(settings.IATA_CSV_PATH, settings.IATA_INDEX_PATH))
+    return _lookup
@@ -0,0 +1,121 @@
+"""Runs kayak scrapes in worker processes so requests never wait for chrome
+
+   Views queue a ScrapeJob and return straight away. Workers started with 'python manage.py scrape_worker' take
+   queued jobs from the database one at a time, scrape kayak and store the results for the user. Pages poll the
+   status of the job and show the results once it is done.
+"""
+
+import os
+import time
+import socket
+import datetime
+import traceback
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+from .models import User, ScrapeJob, SearchResult
+from .FlightQuery import KayakFlight
+from .AccomQuery import KayakAccom
+from .driver_pool import get_driver_pool, close_driver_pool
+from .search_cache import search_url, attach_fresh_results, store_results
+
+
+def scrape_flights(user_id):
+    """Scrape flights for the user and store them"""
+    # check if user already has results or someone did the same search recently - if so don't need to scrap again
+    user = User.objects.select_related('departure_city', 'destination_city').get(pk=user_id)
+    url = search_url(SearchResult.FLIGHT, user)
+    if user.flight_results_id is not None or attach_fresh_results(user, SearchResult.FLIGHT, url):
+        return
+
+    pool = get_driver_pool()
+    with pool.lease() as driver:
+        kayak = KayakFlight(headless=True, driver=driver, capture=pool.capture)
+        results = kayak.scrap_flight_details(url, flightlimit=20)
+
+    store_results(user, SearchResult.FLIGHT, url, results)
+
+
+def scrape_accoms(user_id):
+    """Scrape accommodation for the user and store them"""
+    # check if user already has results or someone did the same search recently - if so don't need to scrap again
+    user = User.objects.select_related('departure_city', 'destination_city').get(pk=user_id)
+    url = search_url(SearchResult.ACCOM, user)
+    if user.accom_results_id is not None or attach_fresh_results(user, SearchResult.ACCOM, url):
+        return
+
+    pool = get_driver_pool()
+    with pool.lease() as driver:
+        kayak = KayakAccom(headless=True, driver=driver, capture=pool.capture)
+        results = kayak.get_accoms_for_user(user, True, acclimit=50, piclimit=20, pool=pool)
+
+    store_results(user, SearchResult.ACCOM, url, results)
+
+
+SCRAPERS = {ScrapeJob.FLIGHT: scrape_flights,
+            ScrapeJob.ACCOM: scrape_accoms}
+
+
+def claim_job(worker):
+    """Mark the oldest queued job as running by the worker and return it, or None if the queue is empty
+
+       Rows locked by other workers are skipped so every job is only run once.
+    """
+    with transaction.atomic():
+        job = ScrapeJob.objects.select_for_update(skip_locked=True).filter(status=ScrapeJob.QUEUED)\
+            .order_by('created_at').first()
+        if job is None:
+            return None
+
+        job.status = ScrapeJob.RUNNING
+        job.worker = worker
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'worker', 'started_at'])
+
+    return job
+
+
+def run_job(job):
+    """Run scrape of the job and record whether it worked"""
+    try:
+        SCRAPERS[job.kind](job.user_id)
+        job.status = ScrapeJob.DONE
+    except Exception as e:
+        traceback.print_exc()
+        job.status = ScrapeJob.FAILED
+        job.error = str(e)[:1000]
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+def requeue_stale_jobs(timeout):
+    """Queue jobs again whose worker has been running them for longer than timeout (seconds) - e.g. worker died"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=timeout)
+    return ScrapeJob.objects.filter(status=ScrapeJob.RUNNING, started_at__lt=cutoff)\
+        .update(status=ScrapeJob.QUEUED, worker=None, started_at=None)
+
+
+def work(poll_interval, stale_timeout, max_jobs=None):
+    """Run queued jobs until stopped (or max_jobs have been run), checking the queue every poll_interval seconds"""
+    worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+    print("Scrape worker {} started...".format(worker))
+
+    count = 0
+    try:
+        while max_jobs is None or count < max_jobs:
+            # connections are dropped by the database when idle for long
+            close_old_connections()
+            requeue_stale_jobs(stale_timeout)
+
+            job = claim_job(worker)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            print("Scrape worker {} running {} job {} for user {}...".format(worker, job.kind, job.pk, job.user_id))
+            run_job(job)
+            count += 1
+            print("Driver pool of worker {}: {}".format(worker, get_driver_pool().metrics()))
+    finally:
+        # chrome processes are left running otherwise
+        close_driver_pool()
@@ -3,31 +3,70 @@
 import datetime
 import time
 import math
+import json
 from selenium import webdriver
 
+# json results are captured for up to JSON_TIMEOUT seconds and until no new results arrive for JSON_QUIET_TIME seconds
+JSON_TIMEOUT = 30
+JSON_QUIET_TIME = 3
+
+
+def create_driver(headless, capture=False):
+    """Start chrome webdriver used to scrape kayak
+
+       capture: record network traffic in the performance log so json responses can be read (see Kayak.capture_json)
+    """
+    webdriver_path = "D:/Documents/GitHub/TripPlannerAI/Miscellaneous/chromedriver_win32/chromedriver.exe"
+    user_agent = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.50 Safari/537.36'
+    try:
+        option = webdriver.ChromeOptions()
+        option.add_argument('window-size=1920x1080')
+        option.add_argument("--start-maximized")
+        option.add_argument(f'user-agent={user_agent}')
+        if headless:
+            # make headless undetectable https://intoli.com/blog/making-chrome-headless-undetectable/
+            option.add_argument('headless')
+        if capture:
+            option.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        driver = webdriver.Chrome(executable_path=webdriver_path, options=option)
+        driver.capture = capture
+        return driver
+    except:
+        raise ValueError("Failed in setting up webdriver. Please check if webdriver is in Miscellaneous folder.")
+
 
 class Kayak:
-    def __init__(self, headless):
-        """Build kayak scraper base class and contain methods that can be shared with child classes"""
+    def __init__(self, headless, driver=None, capture=False):
+        """Build kayak scraper base class and contain methods that can be shared with child classes
 
+           driver: webdriver to use, e.g. leased from a DriverPool with consent given already. A new one is started
+           on first use if not given (urls can be built without chrome) and closed by quit().
+           capture: read results from the json responses of kayak instead of the page where possible. Drivers given
+           must have been started with capture on.
+        """
         # set up webdriver object
-        webdriver_path = "D:/Documents/GitHub/TripPlannerAI/Miscellaneous/chromedriver_win32/chromedriver.exe"
-        user_agent = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.50 Safari/537.36'
-        try:
-            option = webdriver.ChromeOptions()
-            option.add_argument('window-size=1920x1080')
-            option.add_argument("--start-maximized")
-            option.add_argument(f'user-agent={user_agent}')
-            if headless:
-                # make headless undetectable https://intoli.com/blog/making-chrome-headless-undetectable/
-                option.add_argument('headless')
-            self.driver = webdriver.Chrome(executable_path=webdriver_path, options=option)
-        except:
-            raise ValueError("Failed in setting up webdriver. Please check if webdriver is in Miscellaneous folder.")
+        self.headless = headless
+        self.own_driver = driver is None
+        self._driver = driver
+        self.consent_given = getattr(driver, 'consent_given', False)
+        self.capture = capture if driver is None else capture and getattr(driver, 'capture', False)
 
         # assign base url
         self.base_url = 'https://www.kayak.co.uk'
 
+    @property
+    def driver(self):
+        """Webdriver of the scraper - started when first needed"""
+        if self._driver is None:
+            self._driver = create_driver(self.headless, self.capture)
+        return self._driver
+
+    def quit(self):
+        """Close webdriver if started by the scraper"""
+        if self.own_driver and self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
     def _give_consent(self):
         """Give consent to website"""
         # try and see if consent window exists and accept it
@@ -77,12 +116,61 @@ class Kayak:
     def load_wbdriver(self, url):
         """Load webdriver object based on url provided"""
 
-        # load driver to the website and give consent
+        # load driver to the website and give consent - cookies are kept by drivers that gave consent before
         self.driver.get(url)
-        time.sleep(5)
-        self._give_consent()
+        if not self.consent_given:
+            time.sleep(5)
+            self._give_consent()
+            self.consent_given = True
         time.sleep(10)
 
+    def capture_json(self, url, keywords, timeout=JSON_TIMEOUT, quiet_time=JSON_QUIET_TIME):
+        """Load url and return the json payloads of responses whose url contains any of the keywords
+
+           Kayak fills the results page from background json requests - these are read from the performance log of
+           chrome as soon as they arrive so there is no need to wait for the page to render.
+        """
+        # drop log entries of pages loaded before
+        self.driver.get_log('performance')
+
+        self.driver.get(url)
+        if not self.consent_given:
+            time.sleep(5)
+            self._give_consent()
+            self.consent_given = True
+
+        payloads = []
+        pending = set()
+        start = last_payload = time.time()
+        while time.time() - start < timeout:
+            for entry in self.driver.get_log('performance'):
+                message = json.loads(entry['message'])['message']
+                params = message.get('params', {})
+
+                # (1) json response of the results - body can be read once loading finished
+                if message.get('method') == 'Network.responseReceived':
+                    response = params.get('response', {})
+                    if 'json' in response.get('mimeType', '') and any(x in response.get('url', '') for x in keywords):
+                        pending.add(params['requestId'])
+
+                # (2) read body
+                elif message.get('method') == 'Network.loadingFinished' and params.get('requestId') in pending:
+                    pending.discard(params['requestId'])
+                    try:
+                        body = self.driver.execute_cdp_cmd('Network.getResponseBody',
+                                                           {'requestId': params['requestId']})
+                        payloads.append(json.loads(body['body']))
+                        last_payload = time.time()
+                    except Exception as e:
+                        print("Failed to read json response: {}".format(e))
+
+            # kayak keeps polling until the search is complete - stop once nothing new arrives
+            if payloads and not pending and time.time() - last_payload > quiet_time:
+                break
+            time.sleep(0.5)
+
+        return payloads
+
     def show_more_results(self, no_of_results, results_per_page):
         """Click the show more results button depending on how many results we are interested in"""
 
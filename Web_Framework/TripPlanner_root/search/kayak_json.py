@@ -0,0 +1,132 @@
+"""Maps the json results of kayak onto the dictionaries scraped from the results page
+
+   The results page of kayak polls a search api that returns the results as json. Flights come back as results
+   pointing at legs, legs at segments and segments at airlines and airports (all looked up by id). Hotels come back as
+   a list of results. The fields kept are the ones scraped from the page (see kayak_parser) so both can be stored the
+   same way. Results that do not look like kayak results are skipped so the page can be scraped instead.
+"""
+
+from datetime import datetime
+from urllib.parse import urljoin
+
+# words in the urls of the json responses with the results
+FLIGHT_JSON_KEYWORDS = ['flights/poll', 'FlightSearchPoll']
+ACCOM_JSON_KEYWORDS = ['hotels/poll', 'HotelSearchPoll']
+
+
+def _pick(values, *keys):
+    """Value of the first key found in the dictionary, or None"""
+    for key in keys:
+        if isinstance(values, dict) and values.get(key) is not None:
+            return values[key]
+    return None
+
+
+def _price(values):
+    """Price as shown on the page, e.g. £512"""
+    price = _pick(values, 'displayPrice', 'price', 'totalPrice')
+    if isinstance(price, dict):
+        price = _pick(price, 'localizedPrice', 'formatted', 'price')
+    return str(price) if price is not None else None
+
+
+def _time(value):
+    """Time of the day from an iso date time, e.g. 2021-05-01T10:00 -> 10:00"""
+    try:
+        return datetime.fromisoformat(value).strftime('%H:%M')
+    except (TypeError, ValueError):
+        return ""
+
+
+def _merge(payloads, key):
+    """Dictionary of key merged over all payloads - legs, segments etc. can be spread over the responses polled"""
+    merged = {}
+    for payload in payloads:
+        if isinstance(payload.get(key), dict):
+            merged.update(payload[key])
+    return merged
+
+
+def _latest_results(payloads):
+    """Results of the last payload that has any - kayak sends all results found so far in every response"""
+    for payload in reversed(payloads):
+        if isinstance(payload, dict) and isinstance(payload.get('results'), list) and payload['results']:
+            return payload['results']
+    return []
+
+
+def _flight_leg(leg, journey, segments, airlines, airports):
+    """Detail information of the leg of flight"""
+    legs_segments = [segments.get(_pick(x, 'id') if isinstance(x, dict) else x, {}) for x in leg.get('segments', [])]
+    codes = [_pick(x, 'airline', 'airlineCode') for x in legs_segments]
+    stops = [_pick(x, 'destination') for x in legs_segments[:-1]]
+    duration = _pick(leg, 'duration')
+
+    def airport(code):
+        return _pick(airports.get(code, {}), 'displayName', 'shortName') or code or ""
+
+    return {'{}_depart_time'.format(journey): _time(_pick(leg, 'departure')),
+            '{}_arrival_time'.format(journey): _time(_pick(leg, 'arrival')),
+            '{}_stop_number'.format(journey): 'direct' if not stops else
+            '{} stop{}'.format(len(stops), 's' if len(stops) > 1 else ''),
+            '{}_layovers'.format(journey): ", ".join(x for x in stops if x),
+            '{}_duration'.format(journey): '{}h {:02d}m'.format(*divmod(int(duration), 60)) if duration else "",
+            '{}_carrier'.format(journey): ",".join(dict.fromkeys(
+                _pick(airlines.get(x, {}), 'name') or x for x in codes if x)),
+            '{}_logo_url'.format(journey): list(dict.fromkeys(
+                _pick(airlines.get(x, {}), 'logoUrl') for x in codes if _pick(airlines.get(x, {}), 'logoUrl'))),
+            '{}_depart_airport'.format(journey): airport(_pick(legs_segments[0], 'origin')) if legs_segments else "",
+            '{}_arrival_airport'.format(journey): airport(_pick(legs_segments[-1], 'destination'))
+            if legs_segments else ""}
+
+
+def map_flight_results(payloads, base_url, flightlimit=10):
+    """Flight details of the first flightlimit results in the json payloads (empty if not recognised)"""
+    legs, segments = _merge(payloads, 'legs'), _merge(payloads, 'segments')
+    airlines, airports = _merge(payloads, 'airlines'), _merge(payloads, 'airports')
+
+    flight_details = []
+    for result in _latest_results(payloads):
+        # only return flights - skip adverts and results with legs or price missing
+        result_legs = [legs.get(_pick(x, 'id') if isinstance(x, dict) else x) for x in result.get('legs', [])]
+        options = result.get('bookingOptions') or [{}]
+        if len(result_legs) != 2 or None in result_legs or _price(options[0]) is None:
+            continue
+
+        # no link rather than a link to the home page of kayak if the booking url is missing
+        booking_url = _pick(_pick(options[0], 'bookingUrl') or {}, 'url')
+        temp_details = {'price_per_pas': _price(options[0]),
+                        'booking_link': urljoin(base_url, booking_url) if booking_url else None}
+        temp_details.update(_flight_leg(result_legs[0], 'departure', segments, airlines, airports))
+        temp_details.update(_flight_leg(result_legs[1], 'arrival', segments, airlines, airports))
+        temp_details['departure_logo_url'] = [urljoin(base_url, x) for x in temp_details['departure_logo_url']]
+        temp_details['arrival_logo_url'] = [urljoin(base_url, x) for x in temp_details['arrival_logo_url']]
+
+        flight_details.append(temp_details)
+        if len(flight_details) >= flightlimit:
+            break
+
+    return flight_details
+
+
+def map_accom_results(payloads, base_url, acclimit=10):
+    """Hotel name, price, stars and details page url of the first acclimit results in the json payloads (empty if
+       not recognised) - as returned by kayak_parser.parse_accom_results
+    """
+    accom_list = []
+    for result in _latest_results(payloads):
+        hotel_name = _pick(result, 'localizedHotelName', 'displayName', 'name', 'hotelName')
+        price = _price(result)
+        if hotel_name is None or price is None:
+            continue
+
+        stars = _pick(result, 'stars', 'starRating')
+        url = _pick(result, 'detailsUrl', 'url', 'shareURL')
+        accom_list.append({'hotel_name': str(hotel_name),
+                           'price': price,
+                           'stars': str(stars) if stars is not None else None,
+                           'url': urljoin(base_url, url) if url else None})
+        if len(accom_list) >= acclimit:
+            break
+
+    return accom_list
@@ -0,0 +1,140 @@
+"""Parses kayak results lists from the page source
+
+   Reading every field of every result through the webdriver is one round trip to chrome per field. Instead the page
+   source is read once when the results have loaded and parsed with lxml, giving the same dictionaries as scraping the
+   elements one by one.
+"""
+
+from lxml import html
+
+# every result in the results list
+RESULTS_XPATH = "//div[@id='searchResultsList']//div[@class='resultWrapper']"
+
+
+def _has_class(name):
+    """XPath condition matching elements with the css class (like .name in css)"""
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {} ')".format(name)
+
+
+def _first(element, xpath):
+    """First element matching xpath or None"""
+    found = element.xpath(xpath)
+    return found[0] if found else None
+
+
+def _text(element):
+    """Text of the element with white space collapsed, like the text shown in the browser"""
+    return ' '.join(element.text_content().split())
+
+
+def parse_page(page_source, base_url):
+    """Parse page source into an lxml tree with absolute links"""
+    tree = html.fromstring(page_source, base_url=base_url)
+    tree.make_links_absolute(base_url)
+    return tree
+
+
+def _parse_flight_leg(element, journey):
+    """Get detail information of the leg of flight"""
+    flight_leg = {}
+    times = _first(element, ".//div[@class='section times']")
+    stops = _first(element, ".//div[@class='section stops']")
+
+    # get depart and arrival time
+    depart_time = _first(times, ".//span[@class='depart-time base-time']") if times is not None else None
+    arrival_time = _first(times, ".//span[@class='arrival-time base-time']") if times is not None else None
+    if depart_time is not None and arrival_time is not None:
+        flight_leg['{}_depart_time'.format(journey)] = _text(depart_time)
+        flight_leg['{}_arrival_time'.format(journey)] = _text(arrival_time)
+    else:
+        flight_leg['{}_depart_time'.format(journey)] = ""
+        flight_leg['{}_arrival_time'.format(journey)] = ""
+
+    # find out section stop details - direct flight or flight with layovers
+    direct = _first(stops, ".//span[@class='stops-text']") if stops is not None else None
+    stop_number = _first(stops, ".//span[starts-with(@class, 'stops-text')]") if stops is not None else None
+    layovers = _first(stops, ".//span[@class='js-layover']") if stops is not None else None
+    if direct is not None:
+        flight_leg['{}_stop_number'.format(journey)] = _text(direct)
+        flight_leg['{}_layovers'.format(journey)] = ""
+    elif stop_number is not None and layovers is not None:
+        flight_leg['{}_stop_number'.format(journey)] = _text(stop_number)
+        flight_leg['{}_layovers'.format(journey)] = _text(layovers)
+    else:
+        flight_leg['{}_stop_number'.format(journey)] = ""
+        flight_leg['{}_layovers'.format(journey)] = ""
+
+    # find out duration
+    duration = _first(element, ".//div[@class='section duration allow-multi-modal-icons']//div[@class='top']")
+    flight_leg['{}_duration'.format(journey)] = _text(duration) if duration is not None else ""
+
+    # find out carriers and logos (might have more than 1) - remove the word logo from the names
+    carriers = element.xpath(".//div[@class='section stacked-carriers']//div[@class='leg-carrier']")
+    logos = [_first(carrier, ".//img") for carrier in carriers]
+    if None in logos:
+        logos = []
+    flight_leg['{}_carrier'.format(journey)] = ",".join(img.get('alt', '')[:-5] for img in logos)
+    flight_leg['{}_logo_url'.format(journey)] = [img.get('src') for img in logos]
+
+    # find out airports
+    if times is not None:
+        airports = times.xpath(".//span[@class='airport-name']")
+
+        # check if airport not two elements
+        if len(airports) != 2:
+            raise ValueError("Number of airports not two for {}".format([_text(x) for x in airports]))
+
+        flight_leg['{}_depart_airport'.format(journey)] = _text(airports[0])
+        flight_leg['{}_arrival_airport'.format(journey)] = _text(airports[1])
+    else:
+        flight_leg['{}_depart_airport'.format(journey)] = ""
+        flight_leg['{}_arrival_airport'.format(journey)] = ""
+
+    return flight_leg
+
+
+def parse_flight_results(page_source, base_url, flightlimit=10):
+    """Get flight details of the first flightlimit results of the page"""
+    flight_details = []
+
+    for i, ele in enumerate(parse_page(page_source, base_url).xpath(RESULTS_XPATH)[:flightlimit]):
+        price = _first(ele, ".//span[{}]".format(_has_class('price-text')))
+        link = _first(ele, ".//a[{}]".format(_has_class('booking-link')))
+        departure = _first(ele, ".//li[@class='flight with-gutter']")
+        arrival = _first(ele, ".//li[@class='flight ']")
+
+        # results without a price or a link to book (e.g. sold out or adverts) cannot be booked - skipped
+        if price is None or link is None or departure is None or arrival is None:
+            print("Flight result {} has no price, booking link or flight details. Skipped...".format(i))
+            continue
+
+        temp_details = {}
+
+        # price per pax
+        temp_details['price_per_pas'] = _text(price)
+        # link to book
+        temp_details['booking_link'] = link.get('href')
+        # departure
+        temp_details.update(_parse_flight_leg(departure, 'departure'))
+        # arrival
+        temp_details.update(_parse_flight_leg(arrival, 'arrival'))
+
+        flight_details.append(temp_details)
+
+    return flight_details
+
+
+def parse_accom_results(page_source, base_url, acclimit=10):
+    """Get hotel name, price, stars and details page url (None if not linked) of the first acclimit results"""
+    accom_list = []
+
+    for ele in parse_page(page_source, base_url).xpath(RESULTS_XPATH)[:acclimit]:
+        stars = _first(ele, ".//div[@class=' col col-stars']//div[contains(@aria-label, 'Rating Score')]")
+        link = _first(ele, ".//a[contains(@href, '-details')]")
+
+        accom_list.append({'hotel_name': _text(_first(ele, ".//span[@class='titleContainer']")),
+                           'price': _text(_first(ele, ".//div[contains(@id, 'booking-price')]")),
+                           'stars': stars.get('data-count') if stars is not None else None,
+                           'url': link.get('href') if link is not None else None})
+
+    return accom_list
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from search.iata import build_iata_index
+
+
+class Command(BaseCommand):
+    help = 'Build the IATA code index used to build kayak flight urls from the airport codes csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inp', type=str, default=settings.IATA_CSV_PATH, help='Path to airport codes csv.')
+        parser.add_argument('--out', type=str, default=settings.IATA_INDEX_PATH, help='Path to write the index to.')
+
+    def handle(self, *args, **options):
+        path = build_iata_index(options['inp'], options['out'])
+        self.stdout.write('IATA index written to {}...'.format(path))
@@ -0,0 +1,33 @@
+import sys
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from search.jobs import work
+
+
+class Command(BaseCommand):
+    help = 'Run kayak scrapes queued by the search pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.SCRAPE_WORKERS,
+                            help='Number of worker processes, each running one scrape at a time.')
+        parser.add_argument('--max-jobs', type=int, default=None,
+                            help='Stop each worker after running this many jobs.')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            work(settings.SCRAPE_JOB_POLL_INTERVAL, settings.SCRAPE_JOB_TIMEOUT, options['max_jobs'])
+            return
+
+        # start every worker as its own manage.py process so each has its own django setup and db connection
+        command = [sys.executable, sys.argv[0], 'scrape_worker', '--workers', '1']
+        if options['max_jobs'] is not None:
+            command += ['--max-jobs', str(options['max_jobs'])]
+
+        processes = [subprocess.Popen(command) for _ in range(options['workers'])]
+        try:
+            for process in processes:
+                process.wait()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
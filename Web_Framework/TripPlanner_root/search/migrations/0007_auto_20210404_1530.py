@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2021-04-04 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_scrapejob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accomdatabase',
+            name='hotel_name',
+            field=models.CharField(db_index=True, max_length=1000, null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.1.7 on 2021-04-05 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0007_auto_20210404_1530'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('flight', 'Flights'), ('accom', 'Accommodation')], max_length=10)),
+                ('key', models.CharField(max_length=64)),
+                ('url', models.URLField(max_length=5000)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchresult',
+            index=models.Index(fields=['key', 'created_at'], name='search_sear_key_85c539_idx'),
+        ),
+        migrations.AddField(
+            model_name='accominfo',
+            name='result_set',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='search.searchresult'),
+        ),
+        migrations.AddField(
+            model_name='flightinfo',
+            name='result_set',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='search.searchresult'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='accom_results',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='search.searchresult'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='flight_results',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='search.searchresult'),
+        ),
+    ]
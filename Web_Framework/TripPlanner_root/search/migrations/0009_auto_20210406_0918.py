@@ -0,0 +1,35 @@
+# Generated by Django 3.1.7 on 2021-04-06 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0008_auto_20210405_1012'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accominfo',
+            name='user_id',
+            field=models.IntegerField(db_index=True, default='0'),
+        ),
+        migrations.AlterField(
+            model_name='flightinfo',
+            name='user_id',
+            field=models.IntegerField(db_index=True, default='0'),
+        ),
+        migrations.AddIndex(
+            model_name='accominfo',
+            index=models.Index(fields=['result_set', 'id'], name='search_acco_result__cb66da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightinfo',
+            index=models.Index(fields=['result_set', 'id'], name='search_flig_result__87f62f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scrapejob',
+            index=models.Index(fields=['user_id', 'kind', 'created_at'], name='search_scra_user_id_d1d519_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from enum import Enum
 from cities_light.models import City
 from django_mysql.models import ListCharField
@@ -38,6 +38,10 @@ class User(models.Model):
     flight_id = models.IntegerField(default=0)
     accom_id = models.IntegerField(default=0)
 
+    # (4) flights and accommodations found for the user - shared with users doing the same search
+    flight_results = models.ForeignKey('SearchResult', on_delete=models.SET_NULL, null=True, related_name='+')
+    accom_results = models.ForeignKey('SearchResult', on_delete=models.SET_NULL, null=True, related_name='+')
+
     def get_str_departure_city(self):
         """Return string value of the city"""
         return str(self.departure_city).split(", ")[0]
@@ -60,6 +64,17 @@ class User(models.Model):
         return str(delta.days)
 
 
+# fields scraped for each flight and accommodation result
+FLIGHT_FIELDS = ['price_per_pas', 'booking_link', 'departure_depart_time', 'arrival_depart_time',
+                 'departure_arrival_time', 'arrival_arrival_time', 'departure_stop_number', 'arrival_stop_number',
+                 'departure_layovers', 'arrival_layovers', 'departure_duration', 'arrival_duration',
+                 'departure_carrier', 'arrival_carrier', 'departure_logo_url', 'arrival_logo_url',
+                 'departure_depart_airport', 'departure_arrival_airport', 'arrival_depart_airport',
+                 'arrival_arrival_airport']
+ACCOM_FIELDS = ['hotel_name', 'price', 'stars', 'address', 'phone_number', 'website', 'images_url', 'description',
+                'rating', 'check_in', 'check_out']
+
+
 class FlightInfoManager(models.Manager):
     def create_flight(self, user_id, flight_dict):
         flight = self.create(user_id=user_id,
@@ -87,9 +102,17 @@ class FlightInfoManager(models.Manager):
         # do something with the book
         return flight
 
+    def create_flights(self, user_id, flight_dicts, result_set=None):
+        """Store all flights found for the user with one insert - returns them (with ids) in the order given"""
+        with transaction.atomic():
+            return self.bulk_create([self.model(user_id=user_id, result_set=result_set,
+                                                **{field: flight_dict[field] for field in FLIGHT_FIELDS})
+                                     for flight_dict in flight_dicts])
+
 
 class FlightInfo(models.Model):
-    user_id = models.IntegerField(default='0')
+    user_id = models.IntegerField(default='0', db_index=True)
+    result_set = models.ForeignKey('SearchResult', on_delete=models.CASCADE, null=True)
     price_per_pas = models.CharField(max_length=100, null=True)
     booking_link = models.URLField(max_length=5000, null=True)
     # time
@@ -120,6 +143,10 @@ class FlightInfo(models.Model):
 
     objects = FlightInfoManager()
 
+    class Meta:
+        # results of a search are listed in the order they were found
+        indexes = [models.Index(fields=['result_set', 'id'])]
+
 
 class AccomInfoManager(models.Manager):
     def create_accom(self, user_id, accom_dict):
@@ -140,6 +167,13 @@ class AccomInfoManager(models.Manager):
         # do something with the book
         return accom
 
+    def create_accoms(self, user_id, accom_dicts, result_set=None):
+        """Store all accommodations found for the user with one insert - returns them (with ids) in the order given"""
+        with transaction.atomic():
+            return self.bulk_create([self.model(user_id=user_id, result_set=result_set,
+                                                **{field: accom_dict[field] for field in ACCOM_FIELDS})
+                                     for accom_dict in accom_dicts])
+
 class AccomDatabaseManager(models.Manager):
     def create_accom(self, accom_dict):
 
@@ -157,8 +191,23 @@ class AccomDatabaseManager(models.Manager):
         # do something with the book
         return accom
 
+    def get_details(self, hotel_names):
+        """Return details of the hotels found in the database as a dictionary of hotel name to details"""
+        details = {}
+        for accom_dict in self.filter(hotel_name__in=set(hotel_names)).order_by('id').values():
+            # take first object
+            details.setdefault(accom_dict['hotel_name'], accom_dict)
+        return details
+
+    def create_accoms(self, accom_dicts):
+        """Store details of many accommodations with one insert"""
+        fields = [field for field in ACCOM_FIELDS if field != 'price']
+        return self.bulk_create([self.model(**{field: accom_dict[field] for field in fields})
+                                 for accom_dict in accom_dicts])
+
 class AccomInfo(models.Model):
-    user_id = models.IntegerField(default='0')
+    user_id = models.IntegerField(default='0', db_index=True)
+    result_set = models.ForeignKey('SearchResult', on_delete=models.CASCADE, null=True)
     price = models.CharField(max_length=100, null=True)
     hotel_name = models.CharField(max_length=1000, null=True)
     stars = models.IntegerField(null=True)
@@ -172,8 +221,12 @@ class AccomInfo(models.Model):
     check_out = models.TimeField(null=True)
     objects = AccomInfoManager()
 
+    class Meta:
+        # results of a search are listed in the order they were found
+        indexes = [models.Index(fields=['result_set', 'id'])]
+
 class AccomDatabase(models.Model):
-    hotel_name = models.CharField(max_length=1000, null=True)
+    hotel_name = models.CharField(max_length=1000, null=True, db_index=True)
     stars = models.IntegerField(null=True)
     address = models.CharField(max_length=1000, null=True)
     phone_number = models.CharField(max_length=100, null=True)
@@ -185,3 +238,69 @@ class AccomDatabase(models.Model):
     check_out = models.TimeField(null=True)
     objects = AccomDatabaseManager()
 
+
+class ScrapeJobManager(models.Manager):
+    def latest(self, kind, user_id):
+        """Latest job of the user, or None if the user has none"""
+        return self.filter(kind=kind, user_id=user_id).order_by('-created_at').first()
+
+    def enqueue(self, kind, user_id):
+        """Queue a scrape for the user and return the job
+
+           The latest job is returned instead if it is queued, running or done - failed scrapes are queued again.
+        """
+        job = self.latest(kind, user_id)
+        if job is not None and job.status != ScrapeJob.FAILED:
+            return job
+
+        # lock the user row and look again, so two requests of the user (e.g. a double click) queue one scrape only
+        with transaction.atomic():
+            User.objects.select_for_update().get(pk=user_id)
+            job = self.latest(kind, user_id)
+            if job is None or job.status == ScrapeJob.FAILED:
+                job = self.create(kind=kind, user_id=user_id)
+
+        return job
+
+
+class ScrapeJob(models.Model):
+    """Kayak scrape run by a worker process (python manage.py scrape_worker) outside of the request"""
+    FLIGHT = 'flight'
+    ACCOM = 'accom'
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    kind = models.CharField(max_length=10, choices=[(FLIGHT, 'Flights'), (ACCOM, 'Accommodation')])
+    user_id = models.IntegerField(default='0')
+    status = models.CharField(max_length=10, default=QUEUED,
+                              choices=[(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')])
+    error = models.CharField(max_length=1000, null=True)
+    # worker running the job
+    worker = models.CharField(max_length=100, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    objects = ScrapeJobManager()
+
+    class Meta:
+        # queue taken in order by workers and latest job of the user looked up by the pages
+        indexes = [models.Index(fields=['status', 'created_at']),
+                   models.Index(fields=['user_id', 'kind', 'created_at'])]
+
+
+class SearchResult(models.Model):
+    """Flights or accommodations found by one kayak search - shared by every user doing the same search"""
+    FLIGHT = ScrapeJob.FLIGHT
+    ACCOM = ScrapeJob.ACCOM
+
+    kind = models.CharField(max_length=10, choices=[(FLIGHT, 'Flights'), (ACCOM, 'Accommodation')])
+    # hash of the canonical kayak search url
+    key = models.CharField(max_length=64)
+    url = models.URLField(max_length=5000)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['key', 'created_at'])]
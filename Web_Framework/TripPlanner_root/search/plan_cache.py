@@ -0,0 +1,78 @@
+"""Caches itineraries planned so the same trip is not planned again
+
+   Itineraries only depend on a few user inputs and the venue data, so the cache key is a hash of those.
+   Recent itineraries are kept in the process (LRU) in front of django's cache framework, which can be
+   shared between processes depending on the cache backend in the settings.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from django.core.cache import cache
+
+
+def plan_cache_key(user, accom, dataset_version):
+    """Build cache key of the itinerary of the user from the inputs used for planning
+
+       Inputs are normalised (e.g. hotel name case and spacing) so near identical requests share the same key.
+    """
+    def normalise(x):
+        return ' '.join(str(x).lower().split()) if x else None
+
+    inputs = {'start': str(user.departure_date),
+              'end': str(user.return_date),
+              'adults': int(user.no_of_adults),
+              'children': int(user.no_of_children),
+              'budget': normalise(user.budget),
+              'destination': user.destination_city_id,
+              'accommodation': [normalise(accom.hotel_name), normalise(accom.address)] if accom else None,
+              'dataset': dataset_version}
+
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+
+    return 'itinerary:{}'.format(hashlib.sha256(canonical.encode('utf-8')).hexdigest())
+
+
+class PlanCache:
+    def __init__(self, max_size, timeout, backend=cache):
+        """Itinerary cache: LRU of max_size itineraries in the process in front of the django cache backend
+
+           timeout: seconds itineraries are kept in the django cache
+        """
+        self.max_size = max_size
+        self.timeout = timeout
+        self.backend = backend
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return cached itinerary or None if not found"""
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return self._recent[key]
+
+        itinerary = self.backend.get(key)
+        if itinerary is not None:
+            self._remember(key, itinerary)
+
+        return itinerary
+
+    def set(self, key, itinerary):
+        """Store itinerary in the cache"""
+        self._remember(key, itinerary)
+        self.backend.set(key, itinerary, self.timeout)
+
+    def clear(self):
+        """Forget itineraries kept in the process - e.g. when a new venue dataset is published"""
+        with self._lock:
+            self._recent.clear()
+
+    def _remember(self, key, itinerary):
+        """Keep itinerary in the process, dropping the least recently used one if full"""
+        with self._lock:
+            self._recent[key] = itinerary
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.max_size:
+                self._recent.popitem(last=False)
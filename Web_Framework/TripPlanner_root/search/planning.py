@@ -0,0 +1,174 @@
+"""Connects the search app to the planning engine to plan the itinerary of the user
+
+   Pages use anytime planning (start_path_plan and poll_path_plan): a first itinerary straight away, improved in a
+   background thread of the django process. path_plan plans synchronously for scripts. Both plan inside the django
+   process - no process pool is started, so long trips are planned day by day one after another.
+"""
+
+import os
+import threading
+from django.conf import settings
+from planning_engine.venues import load_venue_data
+from planning_engine.planner import Planner
+from planning_engine.travel import TravelTimeMatrix
+from planning_engine.profile import TripProfile
+from planning_engine.utils import logger
+from .plan_cache import PlanCache, plan_cache_key
+
+# venue data is loaded once per process and shared by all requests
+_planner = None
+_planner_mtime = None
+_planner_lock = threading.Lock()
+
+# itineraries planned - keys include the version of the venue data so a new dataset is never served old plans
+_plan_cache = PlanCache(settings.PLAN_CACHE_SIZE, settings.PLAN_CACHE_TIMEOUT)
+
+# itineraries being planned in the background, and plans being started (set once the session is published)
+_sessions = {}
+_starting = {}
+_sessions_lock = threading.Lock()
+
+
+def get_planner():
+    """Return planner of the process - venue data is loaded on first use and again when a new dataset is published
+
+       Raises FileNotFoundError if no venue data has been published yet (see data wrangler --publish).
+    """
+    global _planner, _planner_mtime
+    with _planner_lock:
+        if not os.path.exists(settings.VENUE_DATA_PATH):
+            logger.warning('Venue data {} not found - planning unavailable...'.format(settings.VENUE_DATA_PATH))
+            raise FileNotFoundError('Venue data {} not published yet...'.format(settings.VENUE_DATA_PATH))
+
+        mtime = os.path.getmtime(settings.VENUE_DATA_PATH)
+        if _planner is None or mtime != _planner_mtime:
+            venues = load_venue_data(settings.VENUE_DATA_PATH)
+
+            # matrix is memory-mapped so all worker processes share one copy
+            travel_model = None
+            if os.path.exists(settings.TRAVEL_MATRIX_PATH):
+                try:
+                    travel_model = TravelTimeMatrix(settings.TRAVEL_MATRIX_PATH, venues.coordinates)
+                except ValueError as e:
+                    # matrix not rebuilt for the new dataset yet - calculate travelling times on the fly
+                    logger.warning(str(e))
+
+            # no process pool inside django worker processes
+            _planner = Planner(venues, travel_model, max_workers=1)
+            _planner_mtime = mtime
+            _plan_cache.clear()
+    return _planner
+
+
+def build_trip_profile(user):
+    """Convert user inputs to trip profile used by the planning engine
+
+       Accommodations scraped from kayak do not have coordinates, so the profile has no hotel location and the
+       planner starts every day from the centre of the venues chosen (logged by the planner).
+    """
+    return TripProfile(user.departure_date, user.return_date, user.no_of_adults, user.no_of_children, user.budget)
+
+
+def start_path_plan(user, accom=None):
+    """Start planning the itinerary of the user and return (plan key, itinerary so far as a dictionary, done)
+
+       A first itinerary is ready straight away and keeps getting better in the background - poll it with
+       poll_path_plan(plan key). Finished itineraries are cached. Each plan is started once even if requested
+       several times at once, and outside of the sessions lock so polls of other plans are not held up.
+    """
+    planner = get_planner()
+    key = plan_cache_key(user, accom, planner.venues.version)
+
+    while True:
+        itinerary = _plan_cache.get(key)
+        if itinerary is not None:
+            return key, itinerary, True
+
+        with _sessions_lock:
+            session = _sessions.get(key)
+            starting = _starting.get(key) if session is None else None
+            if session is None and starting is None:
+                # this request starts the plan
+                _starting[key] = threading.Event()
+                break
+
+        if session is not None:
+            itinerary, version, done = session.get()
+            return key, itinerary.to_dict(), done
+
+        # another request is starting the same plan - wait for it and look again
+        starting.wait()
+
+    def finish(result, done):
+        # store finished itinerary in the cache so all processes can find it
+        if done:
+            _plan_cache.set(key, result.to_dict())
+            with _sessions_lock:
+                _sessions.pop(key, None)
+
+    try:
+        session = planner.plan_anytime(build_trip_profile(user), settings.PLAN_FIRST_DEADLINE,
+                                       settings.PLAN_TIME_LIMIT, callback=finish)
+
+        # publish the session - a plan done already is in the cache instead
+        with _sessions_lock:
+            itinerary, version, done = session.get()
+            if not done:
+                _sessions[key] = session
+    finally:
+        with _sessions_lock:
+            _starting.pop(key).set()
+
+    return key, itinerary.to_dict(), done
+
+
+def poll_path_plan(key):
+    """Return (itinerary so far as a dictionary, version, done) of a plan started, or None if not found"""
+    with _sessions_lock:
+        session = _sessions.get(key)
+
+    if session is not None:
+        itinerary, version, done = session.get()
+        return itinerary.to_dict(), version, done
+
+    # planning finished - possibly in another process
+    itinerary = _plan_cache.get(key)
+    if itinerary is not None:
+        return itinerary, None, True
+
+    return None
+
+
+def path_plan(user, accom=None):
+    """Plan itinerary of the user and return it as a dictionary
+
+       Itineraries are cached so refreshing the page or planning the same trip again returns straight away.
+    """
+    planner = get_planner()
+    key = plan_cache_key(user, accom, planner.venues.version)
+
+    itinerary = _plan_cache.get(key)
+    if itinerary is None:
+        itinerary = planner.plan(build_trip_profile(user)).to_dict()
+        _plan_cache.set(key, itinerary)
+
+    return itinerary
+
+
+def venues_near(venue_id, radius=None, limit=None):
+    """Names of up to limit other venues within radius (km) of the venue, nearest first - found with the spatial
+       index of the planner (defaults from settings NEARBY_VENUES_RADIUS and NEARBY_VENUES_LIMIT)
+    """
+    radius = settings.NEARBY_VENUES_RADIUS if radius is None else radius
+    limit = settings.NEARBY_VENUES_LIMIT if limit is None else limit
+
+    planner = get_planner()
+    indices, _ = planner.spatial_index.within_radius(planner.venues.coordinates[venue_id], radius)
+    return [planner.venues.names[i] for i in indices if i != venue_id][:limit]
+
+
+def add_nearby_venues(itinerary):
+    """Copy of the itinerary (dictionary) with the venues near each visit added - cached itineraries are shared"""
+    days = [dict(day, visits=[dict(visit, nearby=venues_near(visit['venue_id'])) for visit in day['visits']])
+            for day in itinerary['days']]
+    return dict(itinerary, days=days)
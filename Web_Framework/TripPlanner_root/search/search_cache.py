@@ -0,0 +1,87 @@
+"""Shares kayak search results between users
+
+   Results only depend on the kayak search url, so users searching the same flights or hotels on the same dates share
+   the results of one scrape while prices are fresh (FLIGHT_RESULTS_TTL / ACCOM_RESULTS_TTL seconds in the settings).
+   Users keep pointing at the results they were shown after they expire.
+"""
+
+import datetime
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import FlightInfo, AccomInfo, SearchResult
+from .FlightQuery import KayakFlight
+from .AccomQuery import KayakAccom
+
+# models storing the results and the user field pointing at them for each kind of search
+RESULT_MODELS = {SearchResult.FLIGHT: FlightInfo,
+                 SearchResult.ACCOM: AccomInfo}
+USER_FIELDS = {SearchResult.FLIGHT: 'flight_results',
+               SearchResult.ACCOM: 'accom_results'}
+
+
+def canonical_url(url):
+    """Normalise kayak url so the same search always has the same url (host case, query parameter order)"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+
+def search_key(url):
+    """Key of the search results of the url"""
+    return hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
+
+def search_url(kind, user):
+    """Kayak search url of the user - chrome is not started to build it"""
+    if kind == SearchResult.FLIGHT:
+        return KayakFlight(headless=True).flight_url_builder(user)
+    return KayakAccom(headless=True).accom_url_builder(user)
+
+
+def time_to_live(kind):
+    """Seconds results of a search are shared for"""
+    return settings.FLIGHT_RESULTS_TTL if kind == SearchResult.FLIGHT else settings.ACCOM_RESULTS_TTL
+
+
+def find_fresh_results(kind, url):
+    """Return latest results of the search url if still fresh, otherwise None"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=time_to_live(kind))
+    return SearchResult.objects.filter(kind=kind, key=search_key(url), created_at__gte=cutoff)\
+        .order_by('-created_at').first()
+
+
+def attach_fresh_results(user, kind, url=None):
+    """Point the user at fresh results of the same search done by someone else. Returns whether any were found"""
+    result_set = find_fresh_results(kind, url or search_url(kind, user))
+    if result_set is None:
+        return False
+
+    setattr(user, USER_FIELDS[kind], result_set)
+    user.save(update_fields=[USER_FIELDS[kind]])
+    return True
+
+
+def store_results(user, kind, url, results):
+    """Store results scraped for the user so they can be shared with other users"""
+    with transaction.atomic():
+        result_set = SearchResult.objects.create(kind=kind, key=search_key(url), url=url)
+        if kind == SearchResult.FLIGHT:
+            FlightInfo.objects.create_flights(user.pk, results, result_set)
+        else:
+            AccomInfo.objects.create_accoms(user.pk, results, result_set)
+
+        setattr(user, USER_FIELDS[kind], result_set)
+        user.save(update_fields=[USER_FIELDS[kind]])
+
+    return result_set
+
+
+def get_results(user, kind):
+    """Results shown to the user"""
+    result_set_id = getattr(user, '{}_id'.format(USER_FIELDS[kind]))
+    if result_set_id is None:
+        return RESULT_MODELS[kind].objects.none()
+    return RESULT_MODELS[kind].objects.filter(result_set_id=result_set_id).order_by('id')
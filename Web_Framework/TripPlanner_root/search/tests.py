@@ -1,3 +1,523 @@
-from django.test import TestCase
+import math
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from selenium.common.exceptions import TimeoutException
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cities_light.models import City, Country
+from .models import User, FlightInfo, AccomInfo, ScrapeJob, SearchResult
+from .models import FLIGHT_FIELDS, ACCOM_FIELDS
+from . import planning
+from .driver_pool import DriverPool
+from .AccomQuery import KayakAccom
+from .kayak_parser import parse_flight_results
+from .kayak_json import map_flight_results, map_accom_results
+from .iata import IataLookup
+from .planning import venues_near, add_nearby_venues, start_path_plan, poll_path_plan
+from planning_engine.venues import VenueData
+from planning_engine.planner import Planner
+from planning_engine.constants import STYLES
 
-# Create your tests here.
+
+class SearchQueryCountTests(TestCase):
+    """Pages should run a fixed number of queries however many results are listed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name='Singapore', code2='SG')
+        city = City.objects.create(name='Singapore', country=country)
+
+        url = 'https://www.kayak.co.uk'
+        cls.flights = SearchResult.objects.create(kind=SearchResult.FLIGHT, key='flights', url=url)
+        cls.accoms = SearchResult.objects.create(kind=SearchResult.ACCOM, key='accoms', url=url)
+        cls.user = User.objects.create(departure_date='2021-05-01', return_date='2021-05-04', departure_city=city,
+                                       destination_city=city, flight_results=cls.flights, accom_results=cls.accoms)
+
+        FlightInfo.objects.create_flights(cls.user.pk, [{field: None for field in FLIGHT_FIELDS}] * 20, cls.flights)
+        AccomInfo.objects.create_accoms(cls.user.pk, [{field: None for field in ACCOM_FIELDS}] * 20, cls.accoms)
+        cls.flight = FlightInfo.objects.filter(result_set=cls.flights).first()
+
+    def test_flight_page(self):
+        # user with cities, flights
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('flight', args=[self.user.pk]))
+        self.assertEqual(len(response.context['flight_list']), 20)
+
+    def test_accom_page(self):
+        # user with cities, flight exists, flight chosen saved, accommodations
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('accom', args=[self.user.pk, self.flight.pk]))
+        self.assertEqual(len(response.context['accom_list']), 20)
+
+        # flight chosen is only saved once
+        with self.assertNumQueries(2):
+            self.client.get(reverse('accom', args=[self.user.pk, self.flight.pk]))
+
+    def test_scrape_job_status(self):
+        job = ScrapeJob.objects.create(kind=ScrapeJob.FLIGHT, user_id=self.user.pk)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('scrape_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], ScrapeJob.QUEUED)
+
+    def test_enqueue_returns_job_queued(self):
+        job = ScrapeJob.objects.enqueue(ScrapeJob.ACCOM, self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(ScrapeJob.objects.enqueue(ScrapeJob.ACCOM, self.user.pk), job)
+
+    def test_enqueue_looks_again_under_lock(self):
+        # job queued by another request between the first look up and the lock is returned, not queued again
+        job = ScrapeJob.objects.create(kind=ScrapeJob.ACCOM, user_id=self.user.pk)
+        with mock.patch.object(ScrapeJob.objects, 'latest', side_effect=[None, job]):
+            self.assertEqual(ScrapeJob.objects.enqueue(ScrapeJob.ACCOM, self.user.pk), job)
+        self.assertEqual(ScrapeJob.objects.count(), 1)
+
+    def test_enqueue_queues_failed_job_again(self):
+        failed = ScrapeJob.objects.create(kind=ScrapeJob.ACCOM, user_id=self.user.pk, status=ScrapeJob.FAILED)
+        job = ScrapeJob.objects.enqueue(ScrapeJob.ACCOM, self.user.pk)
+        self.assertNotEqual(job, failed)
+        self.assertEqual(job.status, ScrapeJob.QUEUED)
+
+    def test_array_fields_round_trip(self):
+        # ArrayFields are stored as json text on the SQLite test database (see TripPlanner_site.test_runner)
+        flight_dict = {field: None for field in FLIGHT_FIELDS}
+        flight_dict['departure_logo_url'] = ['https://www.kayak.co.uk/sq.png', 'https://www.kayak.co.uk/ba.png']
+        result_set = SearchResult.objects.create(kind=SearchResult.FLIGHT, key='logos', url='https://www.kayak.co.uk')
+        FlightInfo.objects.create_flights(self.user.pk, [flight_dict], result_set)
+
+        flight = FlightInfo.objects.get(result_set=result_set)
+        self.assertEqual(flight.departure_logo_url, flight_dict['departure_logo_url'])
+        self.assertIsNone(flight.arrival_logo_url)
+
+    def test_bulk_create_batched_insert(self):
+        # one insert per batch of rows the database takes (all 50 rows in one on PostgreSQL) - not one per row
+        with CaptureQueriesContext(connection) as queries:
+            flights = FlightInfo.objects.create_flights(self.user.pk, [{field: None for field in FLIGHT_FIELDS}] * 50,
+                                                        self.flights)
+        fields = [x for x in FlightInfo._meta.concrete_fields if not x.primary_key]
+        batch_size = connection.ops.bulk_batch_size(fields, flights)
+        self.assertEqual(len([x for x in queries if x['sql'].startswith('INSERT')]), math.ceil(50 / batch_size))
+
+
+class NearbyVenuesTests(SimpleTestCase):
+    """Venues near each visit are found with the spatial index of the planner"""
+
+    def setUp(self):
+        # venues 0-2 within a few hundred metres of each other, venue 3 about 11 km away
+        coordinates = [(1.2900, 103.8500), (1.2910, 103.8500), (1.2930, 103.8500), (1.3900, 103.8500)]
+        venues = VenueData(['Merlion', 'Esplanade', 'Raffles', 'Zoo'], coordinates, [60] * 4, [np.nan] * 4,
+                           np.ones((4, len(STYLES))), np.zeros((4, 84)), version='test')
+        patcher = mock.patch('search.planning.get_planner', return_value=Planner(venues, max_workers=1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_venues_near(self):
+        self.assertEqual(venues_near(0, radius=1.0), ['Esplanade', 'Raffles'])
+        self.assertEqual(venues_near(0, radius=1.0, limit=1), ['Esplanade'])
+        self.assertEqual(venues_near(3, radius=1.0), [])
+
+    def test_add_nearby_venues_copies_itinerary(self):
+        itinerary = {'score': 1.0, 'days': [{'date': '2021-05-01', 'back_to_hotel': '18:00',
+                                             'visits': [{'name': 'Raffles', 'venue_id': 2}]}]}
+
+        with self.settings(NEARBY_VENUES_RADIUS=1.0, NEARBY_VENUES_LIMIT=3):
+            result = add_nearby_venues(itinerary)
+        self.assertEqual(result['days'][0]['visits'][0]['nearby'], ['Esplanade', 'Merlion'])
+        self.assertNotIn('nearby', itinerary['days'][0]['visits'][0])
+
+
+class StartPathPlanTests(SimpleTestCase):
+    """Plans are started once per key and outside of the sessions lock"""
+
+    def setUp(self):
+        self.planner = mock.Mock(venues=SimpleNamespace(version='test'))
+        self.planner.plan_anytime.side_effect = self.plan_anytime
+        for target, value in [('get_planner', mock.Mock(return_value=self.planner)),
+                              ('build_trip_profile', mock.Mock(side_effect=lambda user: user)),
+                              ('_sessions', {}), ('_starting', {})]:
+            patcher = mock.patch.object(planning, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def plan_anytime(profile, first_deadline, time_limit, callback):
+        # building the problem and the first itinerary takes a while
+        time.sleep(0.3)
+        itinerary = mock.Mock(to_dict=mock.Mock(return_value={'score': 1.0, 'days': []}))
+        return mock.Mock(get=mock.Mock(return_value=(itinerary, 1, False)))
+
+    @staticmethod
+    def user(start):
+        return SimpleNamespace(departure_date=start, return_date='2021-06-04', no_of_adults=2, no_of_children=0,
+                               budget='Medium', destination_city_id=1)
+
+    def test_same_plan_started_once(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(start_path_plan(self.user('2021-06-01'))))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.planner.plan_anytime.call_count, 1)
+        self.assertEqual(len({key for key, _, _ in results}), 1)
+        self.assertEqual(planning._starting, {})
+
+    def test_polls_not_blocked_while_plan_starts(self):
+        key, _, _ = start_path_plan(self.user('2021-06-01'))
+
+        thread = threading.Thread(target=start_path_plan, args=(self.user('2021-06-02'),))
+        thread.start()
+        time.sleep(0.05)
+
+        start = time.perf_counter()
+        self.assertEqual(poll_path_plan(key), ({'score': 1.0, 'days': []}, 1, False))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        thread.join()
+
+    def test_failed_start_can_be_retried(self):
+        self.planner.plan_anytime.side_effect = [ValueError('no venues'), self.plan_anytime(None, 0, 0, None)]
+
+        with self.assertRaises(ValueError):
+            start_path_plan(self.user('2021-06-01'))
+        self.assertEqual(planning._starting, {})
+        self.assertFalse(start_path_plan(self.user('2021-06-01'))[2])
+
+
+class FakeDriver:
+    """Webdriver standing in for chrome in the driver pool tests"""
+    def __init__(self, fail_get=False):
+        self.fail_get = fail_get
+        self.healthy = True
+        self.quit_called = False
+        self.window_handles = ['main']
+        self.switch_to = SimpleNamespace(window=lambda handle: None)
+
+    def get(self, url):
+        if self.fail_get:
+            raise RuntimeError('chrome crashed')
+
+    def find_element_by_xpath(self, xpath):
+        raise RuntimeError('no consent window')
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise RuntimeError('browser gone')
+        return 1
+
+    def close(self):
+        self.window_handles = self.window_handles[:-1]
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.drivers = []
+        self.fail_get = False
+
+        def create_driver(headless, capture):
+            self.drivers.append(FakeDriver(self.fail_get))
+            return self.drivers[-1]
+
+        for patcher in [mock.patch('search.driver_pool.create_driver', create_driver),
+                        mock.patch('search.driver_pool.time.sleep')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_lease_and_return(self):
+        pool = DriverPool(1)
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[0])
+            self.assertTrue(driver.consent_given)
+            self.assertEqual(pool.metrics()['in_use'], 1)
+            driver.window_handles.append('details')
+
+        # same driver lent out again with the extra window closed
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[0])
+            self.assertEqual(driver.window_handles, ['main'])
+        metrics = pool.metrics()
+        self.assertEqual((metrics['started'], metrics['leases'], metrics['idle']), (1, 2, 1))
+
+    def test_recycled_after_max_uses(self):
+        pool = DriverPool(1, max_uses=2)
+        for _ in range(2):
+            with pool.lease():
+                pass
+
+        self.assertTrue(self.drivers[0].quit_called)
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[1])
+        self.assertEqual(pool.metrics()['recycled'], 1)
+
+    def test_replaced_when_health_check_fails(self):
+        pool = DriverPool(1)
+        self.drivers[0].healthy = False
+
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[1])
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.metrics()['failed_checks'], 1)
+
+    def test_replaced_when_scrape_fails(self):
+        pool = DriverPool(1)
+        with self.assertRaises(ValueError):
+            with pool.lease():
+                raise ValueError('scrape failed')
+
+        self.assertTrue(self.drivers[0].quit_called)
+        self.assertEqual(pool.metrics()['errors'], 1)
+
+    def test_failed_start_quits_driver(self):
+        pool = DriverPool(1)
+        self.drivers[0].healthy = False
+        self.fail_get = True
+
+        with self.assertRaises(RuntimeError):
+            with pool.lease():
+                pass
+        # chrome started is closed and the slot is kept to start a driver on the next lease
+        self.assertTrue(self.drivers[1].quit_called)
+        metrics = pool.metrics()
+        self.assertEqual((metrics['failed_starts'], metrics['idle']), (1, 1))
+
+        self.fail_get = False
+        with pool.lease() as driver:
+            self.assertIs(driver, self.drivers[2])
+
+
+class SlowWindowDriver:
+    """Webdriver opening the details window after a few checks and loading the page a few checks later"""
+    def __init__(self, url, opens_after=2, loads_after=2):
+        self.url = url
+        self.opens_after = opens_after
+        self.loads_after = loads_after
+        self.windows = ['main']
+        self.current = 'main'
+        self.switch_to = SimpleNamespace(window=self._switch)
+
+    def _switch(self, handle):
+        self.current = handle
+
+    @property
+    def window_handles(self):
+        if self.opens_after is not None and len(self.windows) == 1:
+            self.opens_after -= 1
+            if self.opens_after < 0:
+                self.windows.append('details')
+        return list(self.windows)
+
+    @property
+    def current_url(self):
+        if self.current == 'main':
+            return 'https://www.kayak.co.uk/hotels'
+        self.loads_after -= 1
+        return self.url if self.loads_after < 0 else 'about:blank'
+
+    def close(self):
+        self.windows.remove(self.current)
+
+
+class DetailsUrlTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('selenium.webdriver.support.wait.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ele = mock.Mock()
+
+    def test_waits_for_window_and_page(self):
+        driver = SlowWindowDriver('https://www.kayak.co.uk/hotels/Raffles-Hotel')
+        url = KayakAccom(driver=driver)._get_details_url(self.ele)
+
+        self.assertEqual(url, 'https://www.kayak.co.uk/hotels/Raffles-Hotel')
+        self.assertEqual((driver.windows, driver.current), (['main'], 'main'))
+
+    def test_window_not_opened(self):
+        driver = SlowWindowDriver('https://www.kayak.co.uk/hotels/Raffles-Hotel', opens_after=None)
+        with mock.patch('search.AccomQuery.DETAILS_WINDOW_TIMEOUT', 0):
+            with self.assertRaises(TimeoutException):
+                KayakAccom(driver=driver)._get_details_url(self.ele)
+        self.assertEqual((driver.windows, driver.current), (['main'], 'main'))
+
+
+def flight_leg_html(depart, arrive, airports, stops, duration, carrier):
+    """Leg of a flight result as shown on the kayak results page"""
+    return """
+        <div class="section times">
+          <span class="depart-time base-time">{}</span> <span class="time-meridiem"></span>
+          <span class="arrival-time base-time">{}</span>
+          <span class="airport-name">{}</span> <span class="airport-name">{}</span>
+        </div>
+        <div class="section stops">{}</div>
+        <div class="section duration allow-multi-modal-icons"><div class="top">{}</div></div>
+        <div class="section stacked-carriers">
+          <div class="leg-carrier"><img alt="{} logo" src="/rimg/provider-logos/airlines/v/SQ.png"></div>
+        </div>""".format(depart, arrive, airports[0], airports[1], stops, duration, carrier)
+
+
+DIRECT = '<span class="stops-text">direct</span>'
+ONE_STOP = '<span class="stops-text stops-text-1">1 stop</span> <span class="js-layover">DXB</span>'
+
+# results page saved from kayak (trimmed) - the second result has no price and the third no link to book
+FLIGHT_RESULTS_PAGE = """<html><body><div id="searchResultsList">
+  <div class="resultWrapper"><div class="resultInner">
+    <ol class="flights">
+      <li class="flight with-gutter">{}</li>
+      <li class="flight ">{}</li>
+    </ol>
+    <span class="price-text">
+      £512
+    </span>
+    <a class="booking-link   " href="/book/flight?code=abc">View Deal</a>
+  </div></div>
+  <div class="resultWrapper"><div class="resultInner">
+    <ol class="flights"><li class="flight with-gutter">{}</li><li class="flight ">{}</li></ol>
+    <a class="booking-link" href="/book/flight?code=def">View Deal</a>
+  </div></div>
+  <div class="resultWrapper"><div class="resultInner">
+    <ol class="flights"><li class="flight with-gutter">{}</li><li class="flight ">{}</li></ol>
+    <span class="price-text">£498</span>
+  </div></div>
+</div></body></html>""".format(
+    flight_leg_html('10:00', '06:55', ['LHR', 'SIN'], DIRECT, '12h 55m', 'Singapore Airlines'),
+    flight_leg_html('09:20', '16:10', ['SIN', 'LHR'], ONE_STOP, '21h 50m', 'Emirates'),
+    *[flight_leg_html('10:00', '06:55', ['LHR', 'SIN'], DIRECT, '12h 55m', 'Singapore Airlines')] * 4)
+
+
+class KayakParserTests(SimpleTestCase):
+    def test_parse_flight_results(self):
+        flights = parse_flight_results(FLIGHT_RESULTS_PAGE, 'https://www.kayak.co.uk')
+
+        # results without a price or a booking link are skipped
+        self.assertEqual(len(flights), 1)
+        self.assertEqual(sorted(flights[0]), sorted(FLIGHT_FIELDS))
+        self.assertEqual(flights[0]['price_per_pas'], '£512')
+        self.assertEqual(flights[0]['booking_link'], 'https://www.kayak.co.uk/book/flight?code=abc')
+        self.assertEqual((flights[0]['departure_depart_time'], flights[0]['departure_arrival_time']),
+                         ('10:00', '06:55'))
+        self.assertEqual((flights[0]['departure_stop_number'], flights[0]['departure_layovers']), ('direct', ''))
+        self.assertEqual((flights[0]['arrival_stop_number'], flights[0]['arrival_layovers']), ('1 stop', 'DXB'))
+        self.assertEqual(flights[0]['arrival_duration'], '21h 50m')
+        self.assertEqual(flights[0]['departure_carrier'], 'Singapore Airlines')
+        self.assertEqual(flights[0]['arrival_logo_url'],
+                         ['https://www.kayak.co.uk/rimg/provider-logos/airlines/v/SQ.png'])
+        self.assertEqual((flights[0]['arrival_depart_airport'], flights[0]['arrival_arrival_airport']),
+                         ('SIN', 'LHR'))
+
+    def test_parse_flight_results_limit(self):
+        self.assertEqual(parse_flight_results(FLIGHT_RESULTS_PAGE, 'https://www.kayak.co.uk', flightlimit=0), [])
+
+
+# json responses polled by the kayak results page (trimmed) - legs and segments are spread over both responses, the
+# second result is an advert and the third has no price
+FLIGHT_PAYLOADS = [
+    {'status': 'first-phase',
+     'results': [],
+     'legs': {'leg1': {'departure': '2021-05-01T10:00:00', 'arrival': '2021-05-02T06:55:00', 'duration': 775,
+                       'segments': [{'id': 'seg1'}]}},
+     'segments': {'seg1': {'airline': 'SQ', 'origin': 'LHR', 'destination': 'SIN'}},
+     'airlines': {'SQ': {'name': 'Singapore Airlines', 'logoUrl': '/rimg/provider-logos/airlines/v/SQ.png'}}},
+    {'status': 'complete',
+     'results': [{'type': 'core', 'legs': [{'id': 'leg1'}, {'id': 'leg2'}],
+                  'bookingOptions': [{'displayPrice': '£512', 'bookingUrl': {'url': '/book/flight?code=abc'}}]},
+                 {'type': 'ad', 'adId': 'ad1'},
+                 {'type': 'core', 'legs': ['leg1', 'leg2'], 'bookingOptions': []}],
+     'legs': {'leg2': {'departure': '2021-05-10T09:20:00', 'arrival': '2021-05-10T16:10:00', 'duration': 1310,
+                       'segments': ['seg2', 'seg3']}},
+     'segments': {'seg2': {'airline': 'EK', 'origin': 'SIN', 'destination': 'DXB'},
+                  'seg3': {'airline': 'EK', 'origin': 'DXB', 'destination': 'LHR'}},
+     'airlines': {'EK': {'name': 'Emirates'}},
+     'airports': {'LHR': {'displayName': 'London Heathrow'}, 'SIN': {'displayName': 'Singapore Changi'}}}]
+
+ACCOM_PAYLOADS = [
+    {'status': 'complete',
+     'results': [{'localizedHotelName': 'Raffles Hotel', 'price': {'localizedPrice': '£650'}, 'stars': 5,
+                  'detailsUrl': '/hotels/Raffles-Hotel,Singapore-c22266-h27519-details'},
+                 {'localizedHotelName': 'Sold Out Inn', 'stars': 3},
+                 {'displayName': 'Hotel G', 'displayPrice': '£120'}]}]
+
+
+class KayakJsonTests(SimpleTestCase):
+    base_url = 'https://www.kayak.co.uk'
+
+    def test_map_flight_results(self):
+        flights = map_flight_results(FLIGHT_PAYLOADS, self.base_url)
+
+        self.assertEqual(len(flights), 1)
+        self.assertEqual(sorted(flights[0]), sorted(FLIGHT_FIELDS))
+        self.assertEqual(flights[0]['price_per_pas'], '£512')
+        self.assertEqual(flights[0]['booking_link'], 'https://www.kayak.co.uk/book/flight?code=abc')
+        self.assertEqual((flights[0]['departure_depart_time'], flights[0]['departure_arrival_time'],
+                          flights[0]['departure_duration']), ('10:00', '06:55', '12h 55m'))
+        self.assertEqual((flights[0]['departure_stop_number'], flights[0]['departure_layovers']), ('direct', ''))
+        self.assertEqual((flights[0]['arrival_stop_number'], flights[0]['arrival_layovers']), ('1 stop', 'DXB'))
+        self.assertEqual((flights[0]['departure_carrier'], flights[0]['arrival_carrier']),
+                         ('Singapore Airlines', 'Emirates'))
+        self.assertEqual(flights[0]['departure_logo_url'],
+                         ['https://www.kayak.co.uk/rimg/provider-logos/airlines/v/SQ.png'])
+        self.assertEqual(flights[0]['arrival_logo_url'], [])
+        self.assertEqual((flights[0]['departure_depart_airport'], flights[0]['arrival_arrival_airport']),
+                         ('London Heathrow', 'London Heathrow'))
+
+    def test_map_flight_results_not_recognised(self):
+        self.assertEqual(map_flight_results([{'error': 'session expired'}], self.base_url), [])
+
+    def test_map_accom_results(self):
+        accoms = map_accom_results(ACCOM_PAYLOADS, self.base_url)
+
+        # hotels without a price are skipped, details page url is removed before the details are added
+        self.assertEqual([x['hotel_name'] for x in accoms], ['Raffles Hotel', 'Hotel G'])
+        for accom in accoms:
+            self.assertEqual(sorted(accom), ['hotel_name', 'price', 'stars', 'url'])
+            self.assertTrue(set(accom) - {'url'} <= set(ACCOM_FIELDS))
+        self.assertEqual(accoms[0], {'hotel_name': 'Raffles Hotel', 'price': '£650', 'stars': '5',
+                                     'url': 'https://www.kayak.co.uk/hotels/Raffles-Hotel,Singapore-c22266-h27519-'
+                                            'details'})
+        self.assertEqual((accoms[1]['stars'], accoms[1]['url']), (None, None))
+        self.assertEqual(len(map_accom_results(ACCOM_PAYLOADS, self.base_url, acclimit=1)), 1)
+
+
+class IataLookupTests(SimpleTestCase):
+    def setUp(self):
+        # tiny index - Seletar (XSP) is nearer to central Singapore than Changi (SIN) but a much smaller airport
+        self.lookup = IataLookup({'singapore': ['SIN', 'XSP'], 'mumbai': ['BOM'], 'london': ['LHR', 'LGW'],
+                                  'sao paulo': ['GRU', 'CGH'], 'johor bahru': ['JHB']},
+                                 ['SIN', 'XSP', 'JHB', 'BOM', 'LHR'],
+                                 [(1.3502, 103.9944), (1.4169, 103.8680), (1.6413, 103.6697), (19.0887, 72.8679),
+                                  (51.4706, -0.4619)],
+                                 ['large_airport', 'medium_airport', 'medium_airport', 'large_airport',
+                                  'large_airport'])
+
+    def test_city_name(self):
+        self.assertEqual(self.lookup.codes('Singapore'), ['SIN', 'XSP'])
+        self.assertEqual(self.lookup.get_code('  SINGAPORE '), 'SIN')
+        self.assertEqual(self.lookup.codes('Atlantis'), [])
+
+    def test_alias(self):
+        self.assertEqual(self.lookup.get_code('Bombay'), 'BOM')
+
+    def test_fuzzy_match(self):
+        self.assertEqual(self.lookup.match_city('Singapre'), 'singapore')
+        self.assertIsNone(self.lookup.match_city('Sing'))
+
+    def test_metro_code(self):
+        self.assertEqual(self.lookup.get_code('London'), 'LON')
+        self.assertEqual(self.lookup.get_code('São Paulo'), 'SAO')
+
+    def test_nearest_airport_fallback(self):
+        # biggest airport near the city rather than the nearest one
+        self.assertEqual(self.lookup.get_code('Downtown Core', (1.2839, 103.8515)), 'SIN')
+        self.assertEqual(self.lookup.nearest(1.2839, 103.8515, 3), ['SIN', 'XSP', 'JHB'])
+        # no airport within the radius - nearest first
+        self.assertEqual(self.lookup.nearest(2.5, 103.0, 2), ['JHB', 'XSP'])
+
+    def test_no_airport_found(self):
+        with self.assertRaises(ValueError):
+            self.lookup.get_code('Atlantis')
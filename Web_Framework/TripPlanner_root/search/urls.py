@@ -10,6 +10,8 @@ urlpatterns = [
     path(r'flight-info/user-id-<pk>/', views.get_flightinfo, name='flight'),
     path(r'accom-info/user-id-<user_id>-flight-id-<flight_id>/', views.get_accominfo, name="accom"),
     path(r'itinerary/user-id-<user_id>-accom-id-<accom_id>/', views.get_path_planning, name="itinerary"),
+    path(r'itinerary/progress/<plan_key>/', views.get_itinerary_progress, name="itinerary_progress"),
+    path(r'scrape/job-id-<job_id>/', views.get_scrape_job_status, name="scrape_job_status"),
 ]
 
 urlpatterns += staticfiles_urlpatterns()
@@ -1,10 +1,11 @@
 from django.shortcuts import render, redirect
 from .forms import UserForm
-from .models import User, FlightInfo, AccomInfo
-from .FlightQuery import KayakFlight
-from .AccomQuery import KayakAccom
+from .models import User, FlightInfo, AccomInfo, ScrapeJob, SearchResult
+from .search_cache import attach_fresh_results, get_results
 from .tables import FlightInfoTable
-from django.http import Http404
+from .planning import start_path_plan, poll_path_plan, add_nearby_venues
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 import json
 
 def get_home(request):
@@ -36,66 +37,81 @@ def get_userinfo(request):
 def get_flightinfo(request, pk):
     """Call kayak scraper and show the results to the user for flights"""
 
-    # use primary key to retrive all user inputs from db
-    user = User.objects.get(pk=pk)
+    # use primary key to retrive all user inputs from db - cities are needed to build the kayak url
+    user = User.objects.select_related('departure_city', 'destination_city').get(pk=pk)
 
-    # check if user id present in flight info - if present don't need to scrap again
+    # check if user already has flights - if present don't need to scrap again
     # sometimes user accidentally clicked refresh but we do not want to scrap the same results again
-    flight = FlightInfo.objects.filter(user_id=pk)
+    # results of the same search done by another user recently are shown straight away
+    if user.flight_results_id is None and not attach_fresh_results(user, SearchResult.FLIGHT):
+        # scraping takes minutes - queue it for the scrape workers and show a page that waits for the results
+        job = ScrapeJob.objects.enqueue(ScrapeJob.FLIGHT, user.pk)
+        if job.status != ScrapeJob.DONE:
+            return render(request, 'scraping.html', {'job': job, 'title': 'Flights'})
+        user.refresh_from_db(fields=['flight_results'])
 
-    if not flight:
-        # establish kayak object
-        kayak = KayakFlight(headless=True)
-
-        # build url for kayak
-        results = kayak.scrap_flight_details(kayak.flight_url_builder(user), flightlimit=20)
-        print(results)
-
-        for x in results:
-            FlightInfo.objects.create_flight(pk, x)
-
-    return render(request, 'flight.html', {'flight_list': FlightInfo.objects.filter(user_id=pk)})
+    return render(request, 'flight.html', {'flight_list': get_results(user, SearchResult.FLIGHT), 'user': user})
 
 def get_accominfo(request, user_id, flight_id):
     """Call kayak scraper and show the results to the user for accommodation"""
 
     # use primary key to retrive all user inputs from db and store flight id chose by user
-    user = User.objects.get(pk=user_id)
-    if not FlightInfo.objects.filter(pk=flight_id):
-        raise Http404("Flight chose by user does not exist in database! Please restart the search session...")
-    user.flight_id = flight_id
-    user.save(update_fields=["flight_id"])
-
-    # check if user id present in accom info - if present don't need to scrap again
+    user = User.objects.select_related('departure_city', 'destination_city').get(pk=user_id)
+    if user.flight_id != int(flight_id):
+        if not FlightInfo.objects.filter(pk=flight_id).exists():
+            raise Http404("Flight chose by user does not exist in database! Please restart the search session...")
+        user.flight_id = flight_id
+        user.save(update_fields=["flight_id"])
+
+    # check if user already has accommodations - if present don't need to scrap again
     # sometimes user accidentally clicked refresh but we do not want to scrap the same results again
-    acc = AccomInfo.objects.filter(user_id=user_id)
+    # results of the same search done by another user recently are shown straight away
+    if user.accom_results_id is None and not attach_fresh_results(user, SearchResult.ACCOM):
+        # scraping takes minutes - queue it for the scrape workers and show a page that waits for the results
+        job = ScrapeJob.objects.enqueue(ScrapeJob.ACCOM, user.pk)
+        if job.status != ScrapeJob.DONE:
+            return render(request, 'scraping.html', {'job': job, 'title': 'Accommodations'})
+        user.refresh_from_db(fields=['accom_results'])
 
-    if not acc:
-        # establish kayak object
-        kayak = KayakAccom(headless=True)
-
-        # build url for kayak
-        results = kayak.get_accoms_for_user(user, True, acclimit=50, piclimit=20)
-        print(results)
-
-        # create accom model
-        for accom in results:
-            AccomInfo.objects.create_accom(user_id, accom)
-
-    return render(request, 'accom.html', {'accom_list': AccomInfo.objects.filter(user_id=user_id),
-                                          'user': User.objects.get(pk=user_id)})
+    return render(request, 'accom.html', {'accom_list': get_results(user, SearchResult.ACCOM), 'user': user})
 
 def get_path_planning(request, user_id, accom_id):
     """Call path planning algorithm to plan out the trip"""
 
     # use primary key to retrive all user inputs from db and store accom id chose by user
     user = User.objects.get(pk=user_id)
-    if not AccomInfo.objects.filter(pk=accom_id):
+    accom = AccomInfo.objects.filter(pk=accom_id).only('hotel_name', 'address').first()
+    if not accom:
         raise Http404("Accommodation chose by user does not exist in database! Please restart the search session...")
-    user.accom_id = accom_id
-    user.save(update_fields=["accom_id"])
-
-    # placeholder for path planning code
-    # itinerary = path_plan(user)
-
-    return render(request, 'itinerary.html')
\ No newline at end of file
+    if user.accom_id != int(accom_id):
+        user.accom_id = accom_id
+        user.save(update_fields=["accom_id"])
+
+    # plan itinerary based on user inputs - show first itinerary straight away and poll for better ones
+    try:
+        plan_key, itinerary, done = start_path_plan(user, accom)
+    except FileNotFoundError:
+        # venue data has not been published by the data wrangler yet
+        return render(request, 'itinerary.html', {'user': user, 'unavailable': True}, status=503)
+
+    return render(request, 'itinerary.html', {'itinerary': add_nearby_venues(itinerary), 'user': user,
+                                              'plan_key': plan_key, 'done': done})
+
+def get_itinerary_progress(request, plan_key):
+    """Return latest itinerary of the plan being improved in the background"""
+    result = poll_path_plan(plan_key)
+    if result is None:
+        raise Http404("Itinerary not found! Please restart the search session...")
+
+    itinerary, version, done = result
+    return JsonResponse({'version': version, 'done': done,
+                         'html': render_to_string('itinerary_days.html',
+                                                  {'itinerary': add_nearby_venues(itinerary)})})
+
+def get_scrape_job_status(request, job_id):
+    """Return status of a scrape job - pages waiting for results poll it"""
+    job = ScrapeJob.objects.filter(pk=job_id).only('status', 'error').first()
+    if job is None:
+        raise Http404("Search not found! Please restart the search session...")
+
+    return JsonResponse({'status': job.status, 'error': job.error})